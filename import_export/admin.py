@@ -1,4 +1,6 @@
+from collections import OrderedDict
 from datetime import datetime
+from io import TextIOWrapper
 
 import django
 from django.conf import settings
@@ -7,30 +9,50 @@ from django.contrib import admin, messages
 from django.contrib.admin.models import ADDITION, CHANGE, DELETION, LogEntry
 from django.contrib.auth import get_permission_codename
 from django.contrib.contenttypes.models import ContentType
-from django.core.exceptions import PermissionDenied
-from django.http import HttpResponse, HttpResponseRedirect
+from django.core import signing
+from django.core.exceptions import ImproperlyConfigured, PermissionDenied
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 from django.template.response import TemplateResponse
 from django.urls import reverse
 from django.utils.decorators import method_decorator
-from django.utils.encoding import force_text
+from django.utils.encoding import force_bytes, force_text
 from django.utils.module_loading import import_string
 from django.utils.translation import gettext_lazy as _
 from django.views.decorators.http import require_POST
 
+from tablib import Dataset
+
 from .formats.base_formats import DEFAULT_FORMATS
 from .forms import ConfirmImportForm, ExportForm, ImportForm, export_action_form_factory
+from .instance_loaders import (
+    BatchedInstanceLoader,
+    CachedInstanceLoader,
+    ModelInstanceLoader,
+    ResolvedInstanceLoader,
+)
+from .jobs import ThreadPoolJobRunner
+from .models import ImportJob
 from .resources import modelresource_factory
 from .results import RowResult
 from .signals import post_export, post_import
+from .streams import RowStream
 from .tmp_storages import TempFolderStorage
 
 SKIP_ADMIN_LOG = getattr(settings, 'IMPORT_EXPORT_SKIP_ADMIN_LOG', False)
 TMP_STORAGE_CLASS = getattr(settings, 'IMPORT_EXPORT_TMP_STORAGE_CLASS',
                             TempFolderStorage)
 
+JOB_RUNNER_CLASS = getattr(settings, 'IMPORT_EXPORT_JOB_RUNNER_CLASS',
+                           ThreadPoolJobRunner)
+
 if isinstance(TMP_STORAGE_CLASS, str):
     TMP_STORAGE_CLASS = import_string(TMP_STORAGE_CLASS)
 
+if isinstance(JOB_RUNNER_CLASS, str):
+    JOB_RUNNER_CLASS = import_string(JOB_RUNNER_CLASS)
+
 
 class ImportExportMixinBase:
     def get_model_info(self):
@@ -59,6 +81,18 @@ class ImportMixin(ImportExportMixinBase):
     skip_admin_log = None
     # storage class for saving temporary files
     tmp_storage_class = None
+    #: read the uploaded file row by row instead of loading it at once
+    stream_import = False
+    #: keep the instance keys of the dry run, and the dataset if it only
+    #: holds text and numbers, for the confirmed import, see
+    #: :meth:`get_resolved_instance_loader`
+    reuse_dry_run = False
+    #: template for import job status view
+    import_job_template_name = 'admin/import_export/import_job.html'
+    #: run confirmed imports as import jobs outside of the request
+    background_import = False
+    # job runner class for background imports
+    job_runner_class = None
 
     def get_skip_admin_log(self):
         if self.skip_admin_log is None:
@@ -72,6 +106,12 @@ class ImportMixin(ImportExportMixinBase):
         else:
             return self.tmp_storage_class
 
+    def get_job_runner_class(self):
+        if self.job_runner_class is None:
+            return JOB_RUNNER_CLASS
+        else:
+            return self.job_runner_class
+
     def has_import_permission(self, request):
         """
         Returns whether a request has import permission.
@@ -94,6 +134,9 @@ class ImportMixin(ImportExportMixinBase):
             url(r'^import/$',
                 self.admin_site.admin_view(self.import_action),
                 name='%s_%s_import' % info),
+            url(r'^import_job/(?P<job_id>\d+)/$',
+                self.admin_site.admin_view(self.import_job_status),
+                name='%s_%s_import_job' % info),
         ]
         return my_urls + urls
 
@@ -138,30 +181,148 @@ class ImportMixin(ImportExportMixinBase):
             input_format = import_formats[
                 int(confirm_form.cleaned_data['input_format'])
             ]()
-            tmp_storage = self.get_tmp_storage_class()(name=confirm_form.cleaned_data['import_file_name'])
-            data = tmp_storage.read(input_format.get_read_mode())
-            if not input_format.is_binary() and self.from_encoding:
-                data = force_text(data, self.from_encoding)
-            dataset = input_format.create_dataset(data)
-
-            result = self.process_dataset(dataset, confirm_form, request, *args, **kwargs)
+            if self.background_import:
+                job = ImportJob.objects.create(
+                    user=request.user if request.user.is_authenticated else None,
+                    content_type=ContentType.objects.get_for_model(self.model),
+                    file_name=confirm_form.cleaned_data['original_file_name'],
+                )
+                # the job runs once the response has been returned, so it
+                # gets the values it needs from the request instead of it
+                job_args = (job, confirm_form, input_format, request.user,
+                            self.get_import_resource_kwargs(request, *args, **kwargs),
+                            self.get_import_data_kwargs(request, *args, **kwargs))
+                job_runner = self.get_job_runner_class()()
+                # the job can only be loaded by other connections once committed
+                transaction.on_commit(
+                    lambda: job_runner.submit(job, self.run_import_job, *job_args))
+                url = reverse('admin:%s_%s_import_job' % self.get_model_info(),
+                              args=[job.pk], current_app=self.admin_site.name)
+                return HttpResponseRedirect(url)
+
+            def import_dataset(dataset, resolved_keys):
+                return self.process_dataset(dataset, confirm_form, request, *args,
+                                            resolved_keys=resolved_keys, **kwargs)
+
+            result = self.process_import_file(confirm_form, input_format, import_dataset)
+            return self.process_result(result, request)
 
+    def process_import_file(self, confirm_form, input_format, import_dataset):
+        """
+        Imports the confirmed file, or the dataset saved by the dry run, by
+        calling ``import_dataset(dataset, resolved_keys)`` and removes them
+        from the tmp storage, also if the import fails. Returns the import
+        result.
+        """
+        tmp_storage = self.get_tmp_storage_class()(name=confirm_form.cleaned_data['import_file_name'])
+        # custom confirm forms may not have the field
+        dry_run_file_name = confirm_form.cleaned_data.get('dry_run_file_name')
+        try:
+            dry_run = self.read_dry_run(dry_run_file_name)
+            resolved_keys = dry_run['keys'] if dry_run else None
+            if dry_run and dry_run['headers'] is not None:
+                dataset = Dataset(*dry_run['rows'], headers=dry_run['headers'])
+                return import_dataset(dataset, resolved_keys)
+            with self.open_import_file(tmp_storage, input_format) as in_stream:
+                dataset = self.create_import_dataset(in_stream, input_format)
+                return import_dataset(dataset, resolved_keys)
+        finally:
             tmp_storage.remove()
+            if dry_run_file_name:
+                self.get_tmp_storage_class()(name=dry_run_file_name).remove()
 
-            return self.process_result(result, request)
+    def run_import_job(self, job, confirm_form, input_format, user, resource_kwargs,
+                       import_data_kwargs):
+        """
+        Runs the confirmed import as ``job`` for ``user``, called by the job
+        runner. ``resource_kwargs`` and ``import_data_kwargs`` were prepared
+        from the request which has started the job.
+        """
+        def import_dataset(dataset, resolved_keys):
+            return self.import_dataset(dataset, confirm_form, user, resource_kwargs,
+                                       import_data_kwargs, resolved_keys=resolved_keys,
+                                       progress_callback=job.update_progress)
 
-    def process_dataset(self, dataset, confirm_form, request, *args, **kwargs):
+        result = self.process_import_file(confirm_form, input_format, import_dataset)
+        self.generate_user_log_entries(result, user)
+        post_import.send(sender=None, model=self.model)
+        return result
 
-        res_kwargs = self.get_import_resource_kwargs(request, *args, **kwargs)
-        resource = self.get_import_resource_class()(**res_kwargs)
+    def import_job_status(self, request, job_id, *args, **kwargs):
+        """
+        Shows status and progress of an import job.
+        """
+        if not self.has_import_permission(request):
+            raise PermissionDenied
+
+        # jobs of other users are not shown
+        job = get_object_or_404(ImportJob, pk=job_id, user=request.user,
+                                content_type=ContentType.objects.get_for_model(self.model))
+
+        context = self.get_import_context_data()
+        context.update(self.admin_site.each_context(request))
+
+        context['title'] = _("Import")
+        context['opts'] = self.model._meta
+        context['job'] = job
+        context['progress'] = job.get_progress()
+
+        request.current_app = self.admin_site.name
+        return TemplateResponse(request, [self.import_job_template_name],
+                                context)
+
+    def get_resolved_instance_loader(self, resource, dataset, resolved_keys=None):
+        """
+        Returns the instance loader which records the keys found by the dry
+        run when ``reuse_dry_run`` is set, and loads their instances by
+        primary key in the confirmed import, see
+        :class:`~import_export.instance_loaders.ResolvedInstanceLoader`.
+
+        The ``instance_loader_class`` of the resource is used if it is
+        derived from ``ResolvedInstanceLoader``. The other instance loaders
+        of this package are replaced by it, as they all look up instances
+        by ``import_id_fields``. Custom instance loaders can not be combined
+        with ``reuse_dry_run``.
+        """
+        loader_class = resource._meta.instance_loader_class
+        if not issubclass(loader_class, ResolvedInstanceLoader):
+            if loader_class not in (ModelInstanceLoader, CachedInstanceLoader,
+                                    BatchedInstanceLoader):
+                raise ImproperlyConfigured(
+                    "reuse_dry_run can not be combined with %s, derive it from "
+                    "ResolvedInstanceLoader instead." % loader_class.__name__)
+            loader_class = ResolvedInstanceLoader
+        return loader_class(resource, dataset, resolved_keys)
 
+    def process_dataset(self, dataset, confirm_form, request, *args, resolved_keys=None, **kwargs):
+
+        res_kwargs = self.get_import_resource_kwargs(request, *args, **kwargs)
         imp_kwargs = self.get_import_data_kwargs(request, *args, **kwargs)
+        return self.import_dataset(dataset, confirm_form, request.user, res_kwargs, imp_kwargs,
+                                   resolved_keys=resolved_keys)
+
+    def import_dataset(self, dataset, confirm_form, user, resource_kwargs, import_data_kwargs,
+                       resolved_keys=None, progress_callback=None):
+        """
+        Imports the confirmed ``dataset`` for ``user`` without using the
+        request, which import jobs do not have.
+        """
+        resource = self.get_import_resource_class()(**resource_kwargs)
+
+        instance_loader = None
+        if resolved_keys is not None:
+            instance_loader = self.get_resolved_instance_loader(resource, dataset, resolved_keys)
+
         return resource.import_data(dataset,
                                     dry_run=False,
                                     raise_errors=True,
+                                    instance_loader=instance_loader,
+                                    progress_callback=progress_callback,
+                                    # nobody looks at the rows of the confirmed import
+                                    collect_diff=False,
                                     file_name=confirm_form.cleaned_data['original_file_name'],
-                                    user=request.user,
-                                    **imp_kwargs)
+                                    user=user,
+                                    **import_data_kwargs)
 
     def process_result(self, result, request):
         self.generate_log_entries(result, request)
@@ -173,6 +334,12 @@ class ImportMixin(ImportExportMixinBase):
         return HttpResponseRedirect(url)
 
     def generate_log_entries(self, result, request):
+        self.generate_user_log_entries(result, request.user)
+
+    def generate_user_log_entries(self, result, user):
+        """
+        Adds ``LogEntry`` objects of ``user`` for the imported rows.
+        """
         if not self.get_skip_admin_log():
             # Add imported objects to LogEntry
             logentry_map = {
@@ -184,7 +351,7 @@ class ImportMixin(ImportExportMixinBase):
             for row in result:
                 if row.import_type != row.IMPORT_TYPE_ERROR and row.import_type != row.IMPORT_TYPE_SKIP:
                     LogEntry.objects.log_action(
-                        user_id=request.user.pk,
+                        user_id=user.pk,
                         content_type_id=content_type_id,
                         object_id=row.object_id,
                         object_repr=row.object_repr,
@@ -249,13 +416,74 @@ class ImportMixin(ImportExportMixinBase):
 
     def write_to_tmp_storage(self, import_file, input_format):
         tmp_storage = self.get_tmp_storage_class()()
-        data = bytes()
-        for chunk in import_file.chunks():
-            data += chunk
+        tmp_storage.save_chunks(import_file.chunks(), input_format.get_read_mode())
+        return tmp_storage
 
-        tmp_storage.save(data, input_format.get_read_mode())
+    def save_dry_run(self, headers, rows, resolved_keys):
+        """
+        Saves headers and rows of the dataset as they were read from the
+        file and the instance keys resolved by the dry run to a new tmp
+        storage, which is returned. The data are signed and saved as JSON.
+
+        Rows of a :class:`~import_export.streams.RowStream` (``headers`` is
+        ``None``) and rows with values which JSON does not keep, e.g. dates
+        read from a spreadsheet, are not saved, the file is read again
+        instead.
+        """
+        json_types = (str, int, float, type(None))
+        if headers is not None and not all(
+                isinstance(value, json_types)
+                for row in [headers] + rows for value in row):
+            headers = rows = None
+        dry_run = {
+            'headers': headers,
+            'rows': rows,
+            # keys and primary keys of ResolvedInstanceLoader are text
+            'keys': [[list(key), force_text(pk)] for key, pk in resolved_keys.items()],
+        }
+        data = signing.dumps(dry_run, salt='import_export.dry_run', compress=True)
+        tmp_storage = self.get_tmp_storage_class()()
+        tmp_storage.save(force_bytes(data), 'wb')
         return tmp_storage
 
+    def read_dry_run(self, name):
+        """
+        Returns data saved by ``save_dry_run()`` or ``None`` if there are
+        none or their signature does not match.
+        """
+        if not name:
+            return None
+        data = self.get_tmp_storage_class()(name=name).read('rb')
+        try:
+            dry_run = signing.loads(force_text(data), salt='import_export.dry_run')
+        except signing.BadSignature:
+            return None
+        dry_run['keys'] = OrderedDict((tuple(key), pk) for key, pk in dry_run['keys'])
+        return dry_run
+
+    def open_import_file(self, tmp_storage, input_format):
+        """
+        Returns file object reading the saved import file, decoded with
+        ``from_encoding`` for text formats.
+        """
+        in_stream = tmp_storage.open_stream()
+        if not input_format.is_binary():
+            # csv.reader of a row stream handles line endings itself, quoted
+            # values may contain newlines which must not be translated
+            newline = '' if self.stream_import else None
+            in_stream = TextIOWrapper(in_stream, encoding=self.from_encoding, newline=newline)
+        return in_stream
+
+    def create_import_dataset(self, in_stream, input_format):
+        """
+        Returns dataset read from ``in_stream``, or a
+        :class:`~import_export.streams.RowStream` reading it lazily if
+        ``stream_import`` is set.
+        """
+        if self.stream_import:
+            return input_format.create_row_stream(in_stream)
+        return input_format.create_dataset(in_stream.read())
+
     def import_action(self, request, *args, **kwargs):
         """
         Perform a dry_run of the import to make sure the import will not
@@ -286,28 +514,39 @@ class ImportMixin(ImportExportMixinBase):
             tmp_storage = self.write_to_tmp_storage(import_file, input_format)
 
             # then read the file, using the proper format-specific mode
-            # warning, big files may exceed memory
+            in_stream = self.open_import_file(tmp_storage, input_format)
             try:
-                data = tmp_storage.read(input_format.get_read_mode())
-                if not input_format.is_binary() and self.from_encoding:
-                    data = force_text(data, self.from_encoding)
-                dataset = input_format.create_dataset(data)
-            except UnicodeDecodeError as e:
-                return HttpResponse(_(u"<h1>Imported file has a wrong encoding: %s</h1>" % e))
-            except Exception as e:
-                return HttpResponse(_(u"<h1>%s encountered while trying to read file: %s</h1>" % (type(e).__name__, import_file.name)))
-
-            # prepare kwargs for import data, if needed
-            res_kwargs = self.get_import_resource_kwargs(request, form=form, *args, **kwargs)
-            resource = self.get_import_resource_class()(**res_kwargs)
-
-            # prepare additional kwargs for import_data, if needed
-            imp_kwargs = self.get_import_data_kwargs(request, form=form, *args, **kwargs)
-            result = resource.import_data(dataset, dry_run=True,
-                                          raise_errors=False,
-                                          file_name=import_file.name,
-                                          user=request.user,
-                                          **imp_kwargs)
+                try:
+                    dataset = self.create_import_dataset(in_stream, input_format)
+                except UnicodeDecodeError as e:
+                    return HttpResponse(_(u"<h1>Imported file has a wrong encoding: %s</h1>" % e))
+                except Exception as e:
+                    return HttpResponse(_(u"<h1>%s encountered while trying to read file: %s</h1>" % (type(e).__name__, import_file.name)))
+
+                # prepare kwargs for import data, if needed
+                res_kwargs = self.get_import_resource_kwargs(request, form=form, *args, **kwargs)
+                resource = self.get_import_resource_class()(**res_kwargs)
+
+                # prepare additional kwargs for import_data, if needed
+                imp_kwargs = self.get_import_data_kwargs(request, form=form, *args, **kwargs)
+                instance_loader = headers = rows = None
+                if self.reuse_dry_run:
+                    instance_loader = self.get_resolved_instance_loader(resource, dataset)
+                    if not isinstance(dataset, RowStream):
+                        # copy the dataset as read, before_import() may alter it
+                        headers, rows = list(dataset.headers), [list(row) for row in dataset]
+                try:
+                    result = resource.import_data(dataset, dry_run=True,
+                                                  raise_errors=False,
+                                                  file_name=import_file.name,
+                                                  user=request.user,
+                                                  instance_loader=instance_loader,
+                                                  **imp_kwargs)
+                except UnicodeDecodeError as e:
+                    # a row stream decodes the file while it is imported
+                    return HttpResponse(_(u"<h1>Imported file has a wrong encoding: %s</h1>" % e))
+            finally:
+                in_stream.close()
 
             context['result'] = result
 
@@ -317,6 +556,10 @@ class ImportMixin(ImportExportMixinBase):
                     'original_file_name': import_file.name,
                     'input_format': form.cleaned_data['input_format'],
                 }
+                if self.reuse_dry_run:
+                    dry_run_storage = self.save_dry_run(headers, rows,
+                                                        instance_loader.found_keys)
+                    initial['dry_run_file_name'] = dry_run_storage.name
                 confirm_form = self.get_confirm_import_form()
                 initial = self.get_form_kwargs(form=form, **initial)
                 context['confirm_form'] = confirm_form(initial=initial)
@@ -359,6 +602,9 @@ class ExportMixin(ImportExportMixinBase):
     formats = DEFAULT_FORMATS
     #: export data encoding
     to_encoding = "utf-8"
+    #: stream formats which support it instead of building the whole file,
+    #: ``get_export_data`` is not called for streamed exports
+    stream_export = False
 
     def get_urls(self):
         urls = super().get_urls()
@@ -459,6 +705,42 @@ class ExportMixin(ImportExportMixinBase):
         export_data = file_format.export_data(data)
         return export_data
 
+    def get_export_stream(self, file_format, queryset, *args, **kwargs):
+        """
+        Returns iterator of chunks of file_format representation for given
+        queryset, chunks of text formats are encoded with ``to_encoding``.
+        """
+        request = kwargs.pop("request")
+        if not self.has_export_permission(request):
+            raise PermissionDenied
+
+        resource_class = self.get_export_resource_class()
+        resource = resource_class(**self.get_export_resource_kwargs(request))
+        rows = resource.export_iter(queryset, *args, **kwargs)
+        export_stream = file_format.export_stream(resource.get_export_headers(), rows)
+        if file_format.is_binary():
+            return export_stream
+        # chunks are encoded once the response is read
+        encoding = self.to_encoding
+        return (chunk.encode(encoding) for chunk in export_stream)
+
+    def get_export_response(self, file_format, queryset, request):
+        """
+        Returns response with file_format representation for given queryset,
+        streamed when the format supports it and ``stream_export`` is set.
+        """
+        content_type = file_format.get_content_type()
+        if self.stream_export and file_format.can_stream_export():
+            export_data = self.get_export_stream(file_format, queryset, request=request)
+            response = StreamingHttpResponse(export_data, content_type=content_type)
+        else:
+            export_data = self.get_export_data(file_format, queryset, request=request)
+            response = HttpResponse(export_data, content_type=content_type)
+        response['Content-Disposition'] = 'attachment; filename=%s' % (
+            self.get_export_filename(file_format),
+        )
+        return response
+
     def get_export_context_data(self, **kwargs):
         return self.get_context_data(**kwargs)
 
@@ -477,12 +759,7 @@ class ExportMixin(ImportExportMixinBase):
             ]()
 
             queryset = self.get_export_queryset(request)
-            export_data = self.get_export_data(file_format, queryset, request=request)
-            content_type = file_format.get_content_type()
-            response = HttpResponse(export_data, content_type=content_type)
-            response['Content-Disposition'] = 'attachment; filename=%s' % (
-                self.get_export_filename(file_format),
-            )
+            response = self.get_export_response(file_format, queryset, request)
 
             post_export.send(sender=None, model=self.model)
             return response
@@ -554,13 +831,7 @@ class ExportActionMixin(ExportMixin):
             formats = self.get_export_formats()
             file_format = formats[int(export_format)]()
 
-            export_data = self.get_export_data(file_format, queryset, request=request)
-            content_type = file_format.get_content_type()
-            response = HttpResponse(export_data, content_type=content_type)
-            response['Content-Disposition'] = 'attachment; filename=%s' % (
-                self.get_export_filename(file_format),
-            )
-            return response
+            return self.get_export_response(file_format, queryset, request)
     export_admin_action.short_description = _(
         'Export selected %(verbose_name_plural)s')
 
@@ -1,9 +1,11 @@
 from __future__ import unicode_literals
 from django.conf import settings
 import logging
-from decimal import Decimal
+from collections import OrderedDict, namedtuple
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
 from django.contrib.contenttypes.models import ContentType
-from django.db import DatabaseError
+from django.db import DatabaseError, connections
 from django.utils import translation
 from faker.providers import currency
 from parler.utils.context import switch_language
@@ -39,6 +41,69 @@ CarouselImages = get_model('catalog', 'CarouselImages')
 logger = logging.getLogger(__name__)
 
 
+def get_prefetched_index(obj, name, key):
+    """
+    Returns a dictionary of objects of relation ``name`` prefetched for
+    ``obj``, grouped into lists by ``key(related_obj)``, or ``None`` if the
+    relation was not prefetched. The dictionary is built once per object.
+    """
+    prefetched = getattr(obj, '_prefetched_objects_cache', {}).get(name)
+    if prefetched is None:
+        return None
+    indexes = obj.__dict__.setdefault('_import_export_indexes', {})
+    if name not in indexes:
+        index = {}
+        for related in prefetched:
+            index.setdefault(key(related), []).append(related)
+        indexes[name] = index
+    return indexes[name]
+
+
+PriceSpec = namedtuple('PriceSpec', 'currency tax_ratio price_level_id')
+""" Currency code, tax ratio and price level id of a price column. """
+
+AttributeSpec = namedtuple('AttributeSpec', 'group_id is_active')
+""" Option group id and active state of an attribute column. """
+
+
+@lru_cache(maxsize=None)
+def parse_price_spec(attribute):
+    """
+    Returns the :data:`PriceSpec` of a price field ``attribute``, whose
+    parts are separated by ``__``. The last part is the currency code and
+    the one before it the tax ratio. If ``attribute`` contains
+    ``price_lvl``, the tax ratio is the fifth part from the end and the
+    fourth contains the price level id in parentheses.
+    Raises ``ValueError`` if ``attribute`` is malformed.
+    """
+    tmp = attribute.split('__')
+    try:
+        if 'price_lvl' in attribute:
+            price_level_id = int(tmp[-4].partition('(')[-1].rpartition(')')[0])
+            tax_ratio = tmp[-5]
+        else:
+            price_level_id = None
+            tax_ratio = tmp[-2]
+        return PriceSpec(tmp[-1], Decimal(tax_ratio), price_level_id)
+    except (IndexError, ValueError, InvalidOperation):
+        raise ValueError('Invalid price column "{}"'.format(attribute))
+
+
+@lru_cache(maxsize=None)
+def parse_attribute_spec(attribute):
+    """
+    Returns the :data:`AttributeSpec` of an attribute field ``attribute``,
+    whose second part contains the group id in parentheses and
+    ``notactive`` for inactive groups.
+    Raises ``ValueError`` if ``attribute`` is malformed.
+    """
+    tmp = attribute.split('__')
+    try:
+        group_id = int(tmp[1].partition('(')[-1].rpartition(')')[0])
+    except (IndexError, ValueError):
+        raise ValueError('Invalid attribute column "{}"'.format(attribute))
+    return AttributeSpec(group_id, 'notactive' not in tmp[1])
+
 
 class Field:
     """
@@ -65,6 +130,14 @@ class Field:
     """
     empty_values = [None, '']
 
+    #: Lookups passed to ``prefetch_related_objects()`` for each chunk of
+    #: exported objects so that the field can be rendered from memory.
+    prefetch_lookups = ()
+
+    #: Values which ``save()`` has handed to a writer and which are not
+    #: written yet, see :meth:`~import_export.fields.Field.set_pending_value`.
+    pending_values = None
+
     def __init__(self, attribute=None, column_name=None, widget=None,
                  default=NOT_PROVIDED, readonly=False, saves_null_values=True):
         self.attribute = attribute
@@ -152,6 +225,28 @@ class Field:
                     else:
                         getattr(obj, attrs[-1]).set(cleaned)
 
+    def set_pending_value(self, obj, value):
+        """
+        Records ``value`` which ``save()`` has handed to a writer for
+        ``obj``, so that ``get_value()`` returns it until the writer is
+        flushed. ``skip_row`` then sees the change of a row whose values
+        are written in bulk.
+        """
+        if self.pending_values is None:
+            self.pending_values = {}
+        # model instances without primary key can not be hashed
+        self.pending_values[id(obj)] = (obj, value)
+
+    def get_pending_value(self, obj):
+        """
+        Returns value recorded by ``set_pending_value()`` for ``obj`` or
+        ``NOT_PROVIDED``.
+        """
+        pending_obj, value = (self.pending_values or {}).get(id(obj), (None, None))
+        if pending_obj is not obj:
+            return NOT_PROVIDED
+        return value
+
     def export(self, obj):
         """
         Returns value from the provided object converted to export
@@ -162,13 +257,150 @@ class Field:
             return ""
         return self.widget.render(value, obj)
 
+    def before_import(self, resource):
+        """
+        Called once before the rows of a dataset are imported by
+        ``resource``. Override to set up import-scoped state, shared state
+        can be kept in ``resource.import_cache``. Called again with an empty
+        ``import_cache`` when a savepoint batch of rows has been rolled
+        back, see ``ResourceOptions.savepoint_batch_size``, so state
+        collected for rows must not outlive a batch in that case. Does
+        nothing by default.
+        """
+        pass
+
+    def flush(self):
+        """
+        Writes values collected by :meth:`~import_export.fields.Field.save`
+        to the database. Called after each batch of rows when the resource
+        uses bulk mode. Does nothing by default.
+        """
+        pass
+
+    def after_import(self):
+        """
+        Called once after all rows of a dataset have been imported, before
+        ``Resource.after_import``. Errors are reported like errors of
+        ``Resource.after_import``. Does nothing by default.
+        """
+        pass
+
+
+class TranslationWriter:
+    """
+    Collects translated values of many objects and writes them when
+    flushed, with one select of their existing translations, one
+    ``bulk_create()`` and one ``bulk_update()``, instead of loading and
+    saving a translation per value.
+
+    :param translation_model: Translations model of the translated objects.
+    """
+
+    def __init__(self, translation_model):
+        self.translation_model = translation_model
+        self.entries = []
+        self.slugs = {}
+
+    def add(self, obj, language, name, value):
+        self.entries.append((obj, language, name, value))
+
+    def slug_exists(self, language, slug):
+        """
+        Returns ``True`` if ``slug`` is used by a translation in ``language``
+        or has been added for it since. Slugs of a language are loaded with
+        a single query on first use.
+        """
+        if language not in self.slugs:
+            self.slugs[language] = set(self.translation_model.objects.filter(
+                language_code=language).values_list('slug', flat=True))
+        return slug in self.slugs[language]
+
+    def add_slug(self, language, slug):
+        if language in self.slugs:
+            self.slugs[language].add(slug)
+
+    def flush(self):
+        entries, self.entries = self.entries, []
+        values = OrderedDict()
+        for obj, language, name, value in entries:
+            if obj.pk is None:
+                # its row was skipped or has failed, rows whose object was
+                # not saved otherwise are reported by Resource.save_bulk()
+                continue
+            values.setdefault((obj.pk, language), {})[name] = value
+        if not values:
+            return
+
+        translations = self.translation_model.objects.filter(
+            master_id__in={key[0] for key in values},
+            language_code__in={key[1] for key in values},
+        )
+        existing = {(t.master_id, t.language_code): t for t in translations}
+
+        to_create = []
+        to_update = []
+        update_fields = set()
+        for (pk, language), field_values in values.items():
+            translation_obj = existing.get((pk, language))
+            if translation_obj is None:
+                to_create.append(self.translation_model(
+                    master_id=pk, language_code=language, **field_values))
+                continue
+            changed = [name for name, value in field_values.items()
+                       if getattr(translation_obj, name) != value]
+            for name in changed:
+                setattr(translation_obj, name, field_values[name])
+            if changed:
+                update_fields.update(changed)
+                to_update.append(translation_obj)
+
+        if to_create:
+            self.translation_model.objects.bulk_create(to_create)
+        if to_update:
+            queryset = self.translation_model.objects.all()
+            if hasattr(queryset, 'bulk_update'):
+                queryset.bulk_update(to_update, sorted(update_fields))
+            else:
+                for translation_obj in to_update:
+                    translation_obj.save()
+
 
 class TranslatableField(Field):
+    """
+    Field for a translated attribute of the object, its attribute is the
+    name of the translated field followed by ``_`` and the language code.
+
+    When the resource uses bulk mode, the translated values of a batch are
+    written by a :class:`~import_export.fields.TranslationWriter` shared by
+    all translatable columns of the translations model, and slugs are
+    checked against the slugs it has loaded.
+    """
+    writer = None
+
+    def before_import(self, resource):
+        if resource._meta.use_bulk and not self.readonly:
+            translation_model = resource._meta.model.translations.field.model
+            self.writer = resource.import_cache.setdefault(
+                ('translation_writer', translation_model), TranslationWriter(translation_model))
+
+    def flush(self):
+        self.pending_values = None
+        if self.writer is not None:
+            self.writer.flush()
+
+    def after_import(self):
+        self.pending_values = None
+        self.writer = None
+
     def get_value(self, obj):
 
         if self.attribute is None:
             return None
 
+        value = self.get_pending_value(obj)
+        if value is not NOT_PROVIDED:
+            return value
+
         tmp = self.attribute.split('_')
         attr_name = "_".join(tmp[:-1])
         attr_language = tmp[-1]
@@ -205,34 +437,228 @@ class TranslatableField(Field):
             with switch_language(obj, attr_language):
                 translation.activate(attr_language)
                 field = obj._meta.model.translations.field.model._meta.get_field(attr_name)
+                value = self.clean(data)
+                if field.blank and not field.null and not field.is_relation:
+                    if value is None:
+                        value = ''
+                elif attr_name == 'slug' and not obj.get_slug and self.slug_exists(attr_language, value):
+                    raise ValueError(
+                        'ERROR: in item: "{}" - Slug: "{}" ALREADY EXISTS. Slug has to be UNIQUE!'.format(obj.name,
+                                                                                                        value))
+
+                if self.writer is not None:
+                    # written together with the rest of the batch
+                    self.writer.add(obj, attr_language, attr_name, value)
+                    self.set_pending_value(obj, value)
+                    if attr_name == 'slug':
+                        self.writer.add_slug(attr_language, value)
+                    return
+
                 translation_model = obj.translations.filter(language_code=attr_language).first()
                 if not translation_model:
                     translation_model = obj
-                if field.blank and not field.null and not field.is_relation:
-                    if self.clean(data) is None:
-                        setattr(translation_model, attr_name, '')
-                    else:
-                        setattr(translation_model, attr_name, self.clean(data))
-                else:
-                    if attr_name == 'slug' and not obj.get_slug and Product.objects.translated(slug=self.clean(data)).exists():
-                        raise ValueError(
-                            'ERROR: in item: "{}" - Slug: "{}" ALREADY EXISTS. Slug has to be UNIQUE!'.format(obj.name,
-                                                                                                            self.clean(data)))
-                    setattr(translation_model, attr_name, self.clean(data))
+                setattr(translation_model, attr_name, value)
                 if type(translation_model) is not type(obj):
                     translation_model.save()
 
+    def slug_exists(self, language, slug):
+        if self.writer is not None:
+            return self.writer.slug_exists(language, slug)
+        return Product.objects.translated(slug=slug).exists()
+
+class PriceLookups:
+    """
+    Import-scoped cache of the reference data used by price fields.
+
+    Currencies, tax ratios and price levels are each loaded with a single
+    query on first use and kept until the import has finished.
+    """
+
+    def __init__(self):
+        self.currencies = None
+        self.tax_ratios = None
+        self.price_levels = None
+        self.content_types = {}
+
+    def get_currency(self, code):
+        if self.currencies is None:
+            self.currencies = {c.code: c for c in Currency.objects.all()}
+        try:
+            return self.currencies[code]
+        except KeyError:
+            raise Currency.DoesNotExist('Currency "{}" does not exist'.format(code))
+
+    def get_tax_ratio(self, percentage):
+        if self.tax_ratios is None:
+            self.tax_ratios = {t.percentage: t for t in TaxRatio.objects.all()}
+        try:
+            return self.tax_ratios[percentage]
+        except KeyError:
+            raise TaxRatio.DoesNotExist('Tax ratio "{}" does not exist'.format(percentage))
+
+    def get_price_level(self, pk):
+        if self.price_levels is None:
+            self.price_levels = {p.pk: p for p in PriceLevel.objects.all()}
+        try:
+            return self.price_levels[pk]
+        except KeyError:
+            raise PriceLevel.DoesNotExist('Price level "{}" does not exist'.format(pk))
+
+    def get_content_type_id(self, obj):
+        model = type(obj)
+        if model not in self.content_types:
+            self.content_types[model] = ContentType.objects.get_for_model(obj).id
+        return self.content_types[model]
+
+
+class PriceWriter:
+    """
+    Collects prices of many objects and writes them with a few bulk
+    queries when flushed, instead of one ``update_or_create()`` per value.
+
+    Prices are written with ``bulk_create()`` and ``bulk_update()``, so
+    ``save()`` of the price model is not called and no ``pre_save`` or
+    ``post_save`` signals are sent for them. Resources which rely on those
+    must not use bulk mode.
+
+    :param manager: Manager of the price model.
+
+    :param key_fields: Names of the foreign keys which, together with the
+        related object, identify a price.
+    """
+
+    def __init__(self, manager, key_fields):
+        self.manager = manager
+        self.key_fields = key_fields
+        self.entries = []
+
+    def add(self, obj, content_type_id, value, **lookups):
+        self.entries.append((obj, content_type_id, value, lookups))
+
+    def flush(self):
+        entries, self.entries = self.entries, []
+        values = OrderedDict()
+        for obj, content_type_id, value, lookups in entries:
+            if obj.pk is None:
+                # object was not saved, e.g. its row was skipped
+                continue
+            key = (content_type_id, obj.pk) + tuple(
+                getattr(lookups[name], 'pk', None) for name in self.key_fields)
+            values[key] = value
+        if not values:
+            return
+
+        existing = {}
+        prices = self.manager.filter(
+            content_type_id__in={key[0] for key in values},
+            object_id__in={key[1] for key in values},
+        )
+        for price in prices:
+            key = (price.content_type_id, price.object_id) + tuple(
+                getattr(price, '%s_id' % name) for name in self.key_fields)
+            existing[key] = price
+
+        to_create = []
+        to_update = []
+        for key, value in values.items():
+            price = existing.get(key)
+            if price is None:
+                price = self.manager.model(content_type_id=key[0], object_id=key[1], **{
+                    '%s_id' % name: pk for name, pk in zip(self.key_fields, key[2:])
+                })
+                price._price_excluding_tax = value
+                to_create.append(price)
+            elif price._price_excluding_tax != value:
+                price._price_excluding_tax = value
+                to_update.append(price)
+
+        if to_create:
+            self.manager.bulk_create(to_create)
+        if to_update:
+            if hasattr(self.manager, 'bulk_update'):
+                self.manager.bulk_update(to_update, ['_price_excluding_tax'])
+            else:
+                for price in to_update:
+                    price.save()
+
+
 class PriceField(Field):
+    """
+    Field for a price of the object in a given currency, tax ratio and
+    optionally price level.
+
+    Reference data is looked up in an import-scoped
+    :class:`~import_export.fields.PriceLookups` cache. When the resource
+    uses bulk mode, prices are collected and written per batch by a
+    :class:`~import_export.fields.PriceWriter`.
+    """
+    lookups = None
+    writer = None
+    prefetch_lookups = ('prices__currency', 'prices__tax_ratio')
+
+    def get_writer(self):
+        return PriceWriter(Price.not_nullable, ('currency', 'tax_ratio', 'price_level'))
+
+    @property
+    def spec(self):
+        """
+        :data:`PriceSpec` parsed from the attribute of the field.
+        """
+        return parse_price_spec(self.attribute)
+
+    @property
+    def currency(self):
+        return self.spec.currency
+
+    @property
+    def tax_ratio(self):
+        return self.spec.tax_ratio
+
+    @property
+    def price_level_id(self):
+        return self.spec.price_level_id
+
+    def before_import(self, resource):
+        # a malformed column fails the import before its first row
+        parse_price_spec(self.attribute)
+        self.lookups = resource.import_cache.setdefault('price_lookups', PriceLookups())
+        if resource._meta.use_bulk:
+            self.writer = resource.import_cache.setdefault(
+                ('price_writer', type(self)), self.get_writer())
+
+    def flush(self):
+        self.pending_values = None
+        if self.writer is not None:
+            self.writer.flush()
+
+    def after_import(self):
+        self.pending_values = None
+        self.lookups = None
+        self.writer = None
+
+    def get_lookups(self):
+        if self.lookups is None:
+            return PriceLookups()
+        return self.lookups
+
     def get_value(self, obj):
 
         if self.attribute is None:
             return None
 
-        tmp = self.attribute.split('__')
-        if 'price_lvl' in self.attribute:
-            attr_currency = tmp[-1]
-            attr_price_lvl_id = int(tmp[-4].partition('(')[-1].rpartition(')')[0])
-            attr_tax_ratio = tmp[-5]
+        value = self.get_pending_value(obj)
+        if value is not NOT_PROVIDED:
+            return value
+
+        attr_currency, attr_tax_ratio, attr_price_lvl_id = self.spec
+
+        index = get_prefetched_index(obj, 'prices', lambda price: (
+            price.currency.code, price.tax_ratio.percentage, price.price_level_id))
+        if index is not None:
+            prices = index.get((attr_currency, attr_tax_ratio, attr_price_lvl_id))
+            return prices[0]._price_excluding_tax if prices else None
+
+        if attr_price_lvl_id is not None:
             try:
                 price_obj = obj.prices.get(currency__code=attr_currency, tax_ratio__percentage=attr_tax_ratio, price_level_id=attr_price_lvl_id)
                 value = price_obj._price_excluding_tax
@@ -240,9 +666,6 @@ class PriceField(Field):
             except (ValueError, ObjectDoesNotExist):
                 return None
         else:
-            attr_currency = tmp[-1]
-            attr_tax_ratio = tmp[-2]
-
             try:
                 price_obj = obj.prices.get(currency__code=attr_currency, tax_ratio__percentage=attr_tax_ratio, price_level=None)
                 value = price_obj._price_excluding_tax
@@ -251,48 +674,63 @@ class PriceField(Field):
                 return None
 
     def save(self, obj, data, is_m2m=False):
-        tmp = self.attribute.split('__')
-        is_price_lvl = False
-        attr_price_lvl_id = None
-        if 'price_lvl' in self.attribute:
-            is_price_lvl = True
-            attr_currency = tmp[-1]
-            attr_price_lvl_id = int(tmp[-4].partition('(')[-1].rpartition(')')[0])
-            attr_tax_ratio = tmp[-5]
-        else:
-            attr_currency = tmp[-1]
-            attr_tax_ratio = tmp[-2]
-
-        attr_tax_ratio = Decimal(attr_tax_ratio)
+        attr_currency, attr_tax_ratio, attr_price_lvl_id = self.spec
         value = self.clean(data)
 
         if value is '' or value is None:
             return
         else:
             value = round(Decimal(value), 5)
-            related_object_type = ContentType.objects.get_for_model(obj)
+            lookups = self.get_lookups()
+            content_type_id = lookups.get_content_type_id(obj)
+            currency = lookups.get_currency(attr_currency)
+            tax_ratio = lookups.get_tax_ratio(attr_tax_ratio)
+            price_level = None
+            if attr_price_lvl_id is not None:
+                price_level = lookups.get_price_level(attr_price_lvl_id)
+
+            if self.writer is not None:
+                # written together with the rest of the batch
+                self.writer.add(obj, content_type_id, value, currency=currency,
+                                tax_ratio=tax_ratio, price_level=price_level)
+                self.set_pending_value(obj, value)
+                return
 
             if not obj.id:
                 obj.save()
             price, created = Price.not_nullable.update_or_create(
-                content_type_id=related_object_type.id,
+                content_type_id=content_type_id,
                 object_id=obj.id,
-                currency=Currency.objects.get(code=attr_currency),
-                tax_ratio=TaxRatio.objects.get(percentage=attr_tax_ratio),
-                price_level=PriceLevel.objects.get(pk=attr_price_lvl_id) if is_price_lvl else None,
+                currency=currency,
+                tax_ratio=tax_ratio,
+                price_level=price_level,
                 defaults={'_price_excluding_tax': value}
             )
 
 
 class OldPriceField(PriceField):
+    prefetch_lookups = ('old_prices__currency', 'old_prices__tax_ratio')
+
+    def get_writer(self):
+        return PriceWriter(OldPrice.objects, ('currency', 'tax_ratio'))
+
     def get_value(self, obj):
 
         if self.attribute is None:
             return None
 
-        tmp = self.attribute.split('__')
-        attr_currency = tmp[-1]
-        attr_tax_ratio = tmp[-5] if 'price_lvl' in self.attribute else tmp[-2]
+        value = self.get_pending_value(obj)
+        if value is not NOT_PROVIDED:
+            return value
+
+        attr_currency, attr_tax_ratio = self.currency, self.tax_ratio
+
+        index = get_prefetched_index(obj, 'old_prices', lambda price: (
+            price.currency.code, price.tax_ratio.percentage))
+        if index is not None:
+            prices = index.get((attr_currency, attr_tax_ratio))
+            return prices[0].price_excluding_tax() if prices else None
+
         try:
             price_obj = obj.old_prices.get(currency__code=attr_currency, tax_ratio__percentage=attr_tax_ratio)
             value = price_obj.price_excluding_tax()
@@ -301,52 +739,338 @@ class OldPriceField(PriceField):
             return None
 
     def save(self, obj, data, is_m2m=False):
-        tmp = self.attribute.split('__')
-        attr_currency = tmp[-1]
-        attr_tax_ratio = tmp[-5] if 'price_lvl' in self.attribute else tmp[-2]
-
-        attr_tax_ratio = Decimal(attr_tax_ratio)
+        attr_currency, attr_tax_ratio = self.currency, self.tax_ratio
         value = self.clean(data)
 
         if value is '' or value is None:
             return
         else:
             value = Decimal(value)
-            related_object_type = ContentType.objects.get_for_model(obj)
+            lookups = self.get_lookups()
+            content_type_id = lookups.get_content_type_id(obj)
+            currency = lookups.get_currency(attr_currency)
+            tax_ratio = lookups.get_tax_ratio(attr_tax_ratio)
+
+            if self.writer is not None:
+                # written together with the rest of the batch
+                self.writer.add(obj, content_type_id, value, currency=currency,
+                                tax_ratio=tax_ratio)
+                self.set_pending_value(obj, value)
+                return
 
             price, created = OldPrice.objects.update_or_create(
-                content_type_id=related_object_type.id,
+                content_type_id=content_type_id,
                 object_id=obj.id,
-                currency=Currency.objects.get(code=attr_currency),
-                tax_ratio=TaxRatio.objects.get(percentage=attr_tax_ratio),
+                currency=currency,
+                tax_ratio=tax_ratio,
                 defaults={'_price_excluding_tax': value}
             )
 
 
+class CarouselImageWriter:
+    """
+    Collects the carousel images of many objects and syncs them when
+    flushed, with one select, one ``bulk_create()`` of the new images and
+    one delete of the removed ones, instead of clearing and re-adding all
+    images of every object.
+
+    Images are created in the order of their cell, so that their primary
+    keys follow it. An object keeps the images which start its cell in the
+    order of their primary keys, the other images are deleted and the rest
+    of the cell is created again after them.
+    """
+
+    def __init__(self):
+        self.entries = []
+
+    def add(self, obj, images):
+        self.entries.append((obj, images))
+
+    def flush(self):
+        entries, self.entries = self.entries, []
+        values = OrderedDict()
+        for obj, images in entries:
+            if obj.pk is None:
+                # its row was skipped or has failed, rows whose object was
+                # not saved otherwise are reported by Resource.save_bulk()
+                continue
+            content_type_id = ContentType.objects.get_for_model(obj).id
+            # if an object was imported several times the last row wins
+            values[(content_type_id, obj.pk)] = list(OrderedDict.fromkeys(
+                str(image) for image in images))
+        if not values:
+            return
+
+        existing = {}
+        carousel_images = CarouselImages.objects.filter(
+            content_type_id__in={key[0] for key in values},
+            object_id__in={key[1] for key in values},
+        ).order_by('pk').values_list('pk', 'content_type_id', 'object_id', 'image')
+        for pk, content_type_id, object_id, image in carousel_images:
+            key = (content_type_id, object_id)
+            if key in values:
+                existing.setdefault(key, []).append((pk, image))
+
+        to_delete = []
+        to_create = []
+        for key, images in values.items():
+            kept = 0
+            for pk, image in existing.get(key, ()):
+                if kept < len(images) and image == images[kept]:
+                    kept += 1
+                else:
+                    to_delete.append(pk)
+            to_create.extend(
+                CarouselImages(content_type_id=key[0], object_id=key[1], image=image)
+                for image in images[kept:])
+
+        if to_delete:
+            CarouselImages.objects.filter(pk__in=to_delete).delete()
+        if to_create:
+            CarouselImages.objects.bulk_create(to_create)
+
+
 class CarouselImageField(Field):
+    """
+    Field for the carousel images of the object.
+
+    Only images which were added, removed or moved are written, in the
+    order of the cell, by a
+    :class:`~import_export.fields.CarouselImageWriter` which collects the
+    images of a whole batch when the resource uses bulk mode.
+    """
+    writer = None
+
+    def before_import(self, resource):
+        if resource._meta.use_bulk:
+            self.writer = resource.import_cache.setdefault('carousel_image_writer', CarouselImageWriter())
+
+    def flush(self):
+        self.pending_values = None
+        if self.writer is not None:
+            self.writer.flush()
+
+    def after_import(self):
+        self.pending_values = None
+        self.writer = None
+
+    def get_value(self, obj):
+        value = self.get_pending_value(obj)
+        if value is not NOT_PROVIDED:
+            return value
+        return super().get_value(obj)
 
     def save(self, obj, data, is_m2m=False):
-        values = self.clean(data)
-        obj.carousel_images.clear()
-        for image in values:
-            related_object_type = ContentType.objects.get_for_model(obj)
+        images = self.clean(data) or []
 
-            carousel_image = CarouselImages(
-                content_type_id=related_object_type.id,
-                object_id=obj.id,
-                image=image
-            )
-            obj.carousel_images.add(carousel_image, bulk=False)
+        if self.writer is not None:
+            # written together with the rest of the batch
+            self.writer.add(obj, images)
+            self.set_pending_value(obj, images)
+            return
+
+        if not obj.pk:
+            obj.save()
+        writer = CarouselImageWriter()
+        writer.add(obj, images)
+        writer.flush()
+
+
+class AttributeLookups:
+    """
+    Import-scoped resolver of the attribute option groups and options used
+    by attribute fields.
+
+    Groups are loaded with a single query on first use. Options are loaded
+    with a single query per product class and kept by group and name until
+    the import has finished, missing options are created in bulk.
+    """
+
+    def __init__(self):
+        self.groups = None
+        self.options = {}
+
+    def get_group(self, pk, is_active):
+        if self.groups is None:
+            self.groups = {(g.pk, g.is_active): g for g in AttributeOptionGroup.objects.all()}
+        try:
+            return self.groups[(pk, is_active)]
+        except KeyError:
+            raise AttributeOptionGroup.DoesNotExist(
+                'Attribute option group "{}" does not exist'.format(pk))
+
+    def get_options(self, product_class_id):
+        """
+        Returns dictionary of the options of a product class by group id and
+        name, in any of their languages.
+        """
+        if product_class_id not in self.options:
+            options = {}
+            queryset = AttributeOption.objects.filter(
+                product_class_id=product_class_id).prefetch_related('translations').order_by('pk')
+            for option in queryset:
+                for option_translation in option.translations.all():
+                    options.setdefault((option.group_id, option_translation.name), option)
+            self.options[product_class_id] = options
+        return self.options[product_class_id]
+
+    def get_or_create_options(self, product_class_id, group, names):
+        """
+        Returns the options of ``group`` named ``names``, options which do
+        not exist yet are created.
+        """
+        options = self.get_options(product_class_id)
+        missing = [name for name in OrderedDict.fromkeys(names)
+                   if (group.pk, name) not in options]
+        if missing:
+            new_options = [AttributeOption(product_class_id=product_class_id, group=group, name=name)
+                           for name in missing]
+            self.create_options(new_options, missing)
+            for name, option in zip(missing, new_options):
+                options[(group.pk, name)] = option
+        return [options[(group.pk, name)] for name in names]
+
+    def create_options(self, options, names):
+        """
+        Saves new ``options`` together with their translated ``names`` with
+        two bulk inserts, if the database returns the ids of inserted rows.
+        """
+        if not connections[AttributeOption.objects.db].features.can_return_ids_from_bulk_insert:
+            for option in options:
+                option.save()
+            return
+        AttributeOption.objects.bulk_create(options)
+        translation_model = AttributeOption._parler_meta.root_model
+        translation_model.objects.bulk_create([
+            translation_model(master_id=option.pk, language_code=option.get_current_language(),
+                              name=name)
+            for option, name in zip(options, names)
+        ])
+
+
+class AttributeWriter:
+    """
+    Collects the attribute options of many products and syncs their
+    ``AttributeOptionGroupValue`` rows when flushed, with one select, one
+    bulk insert of the missing values and one delete of the stale ones.
+    """
+
+    def __init__(self):
+        self.entries = []
+
+    def add(self, obj, group, options):
+        self.entries.append((obj, group, options))
+
+    def flush(self):
+        entries, self.entries = self.entries, []
+        values = OrderedDict()
+        for obj, group, options in entries:
+            if obj.pk is None:
+                # object was not saved, e.g. its row was skipped
+                continue
+            # if a product was imported several times the last row wins
+            values[(obj.pk, group.pk)] = OrderedDict((option.pk, None) for option in options)
+        if not values:
+            return
+
+        existing = {}
+        to_delete = []
+        group_values = AttributeOptionGroupValue.objects.filter(
+            product_id__in={key[0] for key in values},
+            group_id__in={key[1] for key in values},
+        ).values_list('pk', 'product_id', 'group_id', 'value_id')
+        for pk, product_id, group_id, value_id in group_values:
+            key = (product_id, group_id)
+            if key not in values:
+                continue
+            current = existing.setdefault(key, {})
+            if value_id in current or value_id not in values[key]:
+                to_delete.append(pk)
+            else:
+                current[value_id] = pk
+
+        to_create = []
+        for key, value_ids in values.items():
+            current = existing.get(key, {})
+            to_create.extend(
+                AttributeOptionGroupValue(product_id=key[0], group_id=key[1], value_id=value_id)
+                for value_id in value_ids if value_id not in current)
+
+        if to_delete:
+            AttributeOptionGroupValue.objects.filter(pk__in=to_delete).delete()
+        if to_create:
+            AttributeOptionGroupValue.objects.bulk_create(to_create)
 
 
 class AttributeField(Field):
+    """
+    Field for the values of an attribute option group of a product,
+    separated by ``;``.
+
+    Groups and options are resolved by an import-scoped
+    :class:`~import_export.fields.AttributeLookups`. The values of a
+    product are synced by an :class:`~import_export.fields.AttributeWriter`,
+    which collects the values of a whole batch when the resource uses bulk
+    mode.
+    """
+    lookups = None
+    writer = None
+    prefetch_lookups = ('option_values__value__translations', )
+
+    @property
+    def spec(self):
+        """
+        :data:`AttributeSpec` parsed from the attribute of the field.
+        """
+        return parse_attribute_spec(self.attribute)
+
+    @property
+    def group_id(self):
+        return self.spec.group_id
+
+    @property
+    def is_active(self):
+        return self.spec.is_active
+
+    def before_import(self, resource):
+        # a malformed column fails the import before its first row
+        parse_attribute_spec(self.attribute)
+        self.lookups = resource.import_cache.setdefault('attribute_lookups', AttributeLookups())
+        if resource._meta.use_bulk:
+            self.writer = resource.import_cache.setdefault('attribute_writer', AttributeWriter())
+
+    def flush(self):
+        self.pending_values = None
+        if self.writer is not None:
+            self.writer.flush()
+
+    def after_import(self):
+        self.pending_values = None
+        self.lookups = None
+        self.writer = None
+
+    def get_lookups(self):
+        if self.lookups is None:
+            return AttributeLookups()
+        return self.lookups
+
     def get_value(self, obj):
 
         if self.attribute is None or obj.is_parent:
             return None
 
-        tmp = self.attribute.split('__')
-        attr_id = int(tmp[1].partition('(')[-1].rpartition(')')[0])
+        value = self.get_pending_value(obj)
+        if value is not NOT_PROVIDED:
+            return value
+
+        attr_id = self.group_id
+
+        index = get_prefetched_index(obj, 'option_values', lambda att: att.group_id)
+        if index is not None:
+            att_values = index.get(attr_id)
+            if not att_values:
+                return None
+            return ';'.join([att.value.name for att in att_values])
 
         att_value = obj.option_values.filter(group_id=attr_id)
 
@@ -360,45 +1084,146 @@ class AttributeField(Field):
 
     def save(self, obj, data, is_m2m=False):
         if not self.readonly:
-            tmp = self.attribute.split('__')
-            attr_id = int(tmp[1].partition('(')[-1].rpartition(')')[0])
-            is_active = False if 'notactive' in tmp[1] else True
             value = self.clean(data)
-            group = AttributeOptionGroup.objects.get(id=attr_id, is_active=is_active)
+            lookups = self.get_lookups()
+            group = lookups.get_group(*self.spec)
 
             if value is '' or value is None:
-                # delete old aogvs for this group
-                AttributeOptionGroupValue.objects.filter(product=obj, group=group).delete()
+                # old values of this group are deleted
+                names = []
+                options = []
+            else:
+                names = [name.strip() for name in str(value).strip().split(';')]
+                options = lookups.get_or_create_options(obj.product_class_id, group, names)
+
+            if self.writer is not None:
+                # written together with the rest of the batch
+                self.writer.add(obj, group, options)
+                self.set_pending_value(obj, ';'.join(names) or None)
                 return
 
-            values = str(value).strip().split(';')
-
-            exclude_delete = []
-            for value in values:
-                value = value.strip()
-                attr_option = AttributeOption.objects.filter(product_class=obj.product_class, group=group, translations__name=value)
-                if attr_option.count() == 0:
-                    attr_option = AttributeOption(
-                        product_class=obj.product_class,
-                        group=group,
-                        name=value
-                    )
-                    attr_option.save()
-                else:
-                    attr_option = attr_option.first()
+            if not obj.pk:
+                obj.save()
+            writer = AttributeWriter()
+            writer.add(obj, group, options)
+            writer.flush()
+
+
+class TreePlacement:
+    """
+    Import-scoped stage which moves existing products under the parents
+    assigned to them by parent fields.
+
+    Parents are resolved by their slug in the first language of
+    ``settings.LANGUAGES`` from a map of all slugs, which is loaded with a
+    single query on first use. Moves are grouped by parent: a parent and
+    the products to move under it are loaded with a single query, products
+    which already are children of their parent are not moved, and the
+    parent is reused for all of its moves instead of being looked up for
+    every row. Treebeard still moves every product on its own. If it fails
+    to move a product, the tree is fixed once and the failed moves are
+    retried.
+    """
 
-                attr, created = AttributeOptionGroupValue.objects.update_or_create(
-                    product=obj,
-                    group=group,
-                    value=attr_option,
-                )
-                exclude_delete.append(attr.id)
+    def __init__(self):
+        self.language = settings.LANGUAGES[0][0]
+        self.parent_ids = None
+        self.moves = OrderedDict()
 
-            # delete old aogvs for this group, except new values
-            AttributeOptionGroupValue.objects.filter(product=obj, group=group).exclude(id__in=exclude_delete).delete()
+    def get_parent_id(self, slug):
+        """
+        Returns the id of the product with ``slug`` or ``None``.
+        """
+        if self.parent_ids is None:
+            translation_model = Product.translations.field.model
+            self.parent_ids = {}
+            slugs = translation_model.objects.filter(
+                language_code=self.language).order_by('master_id').values_list('slug', 'master_id')
+            for parent_slug, master_id in slugs:
+                self.parent_ids.setdefault(parent_slug, master_id)
+        if slug not in self.parent_ids:
+            # the parent may have been created by the import
+            parent = Product.objects.translated(self.language, slug=slug).first()
+            if parent is None:
+                return None
+            self.parent_ids[slug] = parent.pk
+        return self.parent_ids[slug]
+
+    def add(self, obj, parent_id):
+        # if a product was imported several times the last row wins
+        self.moves[obj.pk] = parent_id
+
+    def apply(self):
+        moves, self.moves = self.moves, OrderedDict()
+        groups = OrderedDict()
+        for child_id, parent_id in moves.items():
+            groups.setdefault(parent_id, []).append(child_id)
+
+        failed = []
+        for parent_id, child_ids in groups.items():
+            # paths of the nodes change with every move, nodes of a group
+            # are loaded once the moves of the groups before it are done
+            nodes = Product.objects.in_bulk([parent_id] + child_ids)
+            parent = nodes.get(parent_id)
+            if parent is None:
+                continue
+            moved_paths = []
+            for child_id in child_ids:
+                child = nodes.get(child_id)
+                if child is None:
+                    continue
+                if any(child.path.startswith(path) for path in moved_paths):
+                    # it was moved along with one of its ancestors
+                    child = Product.objects.get(pk=child_id)
+                if child.depth == parent.depth + 1 and child.path.startswith(parent.path):
+                    continue
+                path = child.path
+                try:
+                    self.move(child, parent)
+                except AttributeError:
+                    failed.append((child_id, parent_id))
+                else:
+                    moved_paths.append(path)
+        if failed:
+            # because TreeBeard
+            Product.fix_tree()
+            for child_id, parent_id in failed:
+                nodes = Product.objects.in_bulk([child_id, parent_id])
+                self.move(nodes[child_id], nodes[parent_id])
+
+    def move(self, child, parent):
+        numchild = parent.numchild
+        child.move(parent, 'last-child')
+        # treebeard only updates the count of children in the database,
+        # the next move under the same parent reads it from the node
+        parent.numchild = numchild + 1
 
 
 class ParentField(Field):
+    """
+    Field for the parent of a product, identified by its slug in the
+    first language of ``settings.LANGUAGES``.
+
+    New products are added to their parent when they are saved. Existing
+    products are moved right away, so that a failed move fails its own
+    row. When the resource uses bulk mode, moves are collected by an
+    import-scoped :class:`~import_export.fields.TreePlacement` and applied
+    when the batch of rows is flushed, after the products are written.
+    """
+    placement = None
+    defer_moves = False
+
+    def before_import(self, resource):
+        self.placement = resource.import_cache.setdefault('tree_placement', TreePlacement())
+        self.defer_moves = resource._meta.use_bulk
+
+    def flush(self):
+        if self.placement is not None:
+            self.placement.apply()
+
+    def after_import(self):
+        self.placement = None
+
     def get_value(self, obj):
 
         try:
@@ -426,31 +1251,25 @@ class ParentField(Field):
             if obj.is_parent or value is '' or value is None:
                 if obj.id is None:
                     obj.add_root(instance=obj)
-                else:
+                return
+
+            placement = self.placement
+            if placement is None:
+                placement = TreePlacement()
+            with switch_language(obj, placement.language):
+                translation.activate(placement.language)
+
+                parent_id = placement.get_parent_id(value)
+                if parent_id is None:
+                    raise ValueError('ERROR: in product: "{}" - Parent slug: "{}" DOES NOT EXIST'.format(obj.name, value))
+
+                if obj.id is None or obj.is_root():
+                    obj.id = None
+                    Product.objects.get(pk=parent_id).add_child(instance=obj)
                     return
-            else:
-                for lang_short, lang_long in settings.LANGUAGES:
-                    with switch_language(obj, lang_short):
-                        translation.activate(lang_short)
-
-                        parent_obj = None
-                        try:
-                            parent_obj = Product.objects.translated(slug=value).first()
-                        except Exception as e:
-                            raise ValueError('ERROR: in product: "{}" - Parent slug: "{}" DOES NOT EXIST'.format(obj.name, value))
-
-                        if obj not in parent_obj.get_children():
-                            if obj.get_parent() is None:
-                                obj.id = None
-                                parent_obj.add_child(instance=obj)
-                            else:
-                                try:
-                                    obj.move(Product.objects.translated(slug=value).first(), 'last-child')
-                                    obj = Product.objects.get(pk=obj.id)
-                                except AttributeError:
-                                    # because TreeBeard
-                                    Product.fix_tree()
-                                    obj.move(Product.objects.translated(slug=value).first(), 'last-child')
-                        # return after FIRST language in settings.LANGUAGES
-                        return
 
+                placement.add(obj, parent_id)
+                if placement is not self.placement or not self.defer_moves:
+                    placement.apply()
+                    # the row saves the product after its fields
+                    obj.refresh_from_db(fields=['path', 'depth', 'numchild'])
@@ -0,0 +1,86 @@
+from django.contrib.contenttypes.models import ContentType
+
+from .models import RowFingerprint
+from .streams import LookaheadCache
+from .utils import chunked
+
+
+class FingerprintStore(LookaheadCache):
+    """
+    Fingerprints of the rows a resource has last imported, keyed by import
+    id, see ``ResourceOptions.use_fingerprints``.
+
+    Fingerprints are loaded in batches of ``batch_size`` import ids of the
+    rows which follow the current one in the dataset. Changed fingerprints
+    are kept until :meth:`flush` writes them, which the resource only calls
+    once the whole import has succeeded, so that rows of a failed import
+    are not skipped as unchanged next time.
+    """
+
+    def __init__(self, resource, dataset=None):
+        self.resource = resource
+        self.dataset = dataset
+        self.content_type = ContentType.objects.get_for_model(resource._meta.model)
+        self.changed = {}
+        self.deleted = set()
+        self.init_cache()
+
+    def get_queryset(self):
+        return RowFingerprint.objects.filter(content_type=self.content_type)
+
+    def get_row_key(self, row):
+        import_id = self.resource.get_row_import_id(row)
+        if import_id is None:
+            return None
+        return import_id, None
+
+    def load_batch(self, import_id):
+        """
+        Loads fingerprints of ``import_id`` and of the next import ids in
+        the dataset which are not cached yet.
+        """
+        import_ids = self.get_batch(import_id)
+        import_ids.update(self.get_queryset().filter(
+            import_id__in=list(import_ids)).values_list('import_id', 'fingerprint'))
+        self.cache.update(import_ids)
+        self.trim_cache()
+
+    def get(self, import_id):
+        """
+        Returns fingerprint of the row last imported with ``import_id`` or
+        ``None``.
+        """
+        if import_id in self.changed:
+            return self.changed[import_id]
+        if import_id in self.deleted:
+            return None
+        if import_id not in self.cache:
+            self.load_batch(import_id)
+        return self.cache.get(import_id)
+
+    def set(self, import_id, fingerprint):
+        self.deleted.discard(import_id)
+        self.changed[import_id] = fingerprint
+
+    def delete(self, import_id):
+        self.changed.pop(import_id, None)
+        self.deleted.add(import_id)
+
+    def flush(self):
+        """
+        Writes changed and deleted fingerprints to the database.
+        """
+        stale = list(self.changed) + list(self.deleted)
+        for import_ids in chunked(stale, self.batch_size):
+            self.get_queryset().filter(import_id__in=import_ids).delete()
+        RowFingerprint.objects.bulk_create([
+            RowFingerprint(content_type=self.content_type, import_id=import_id,
+                           fingerprint=fingerprint)
+            for import_id, fingerprint in self.changed.items()
+        ], batch_size=self.batch_size)
+        for import_id in self.deleted:
+            self.cache[import_id] = None
+        self.cache.update(self.changed)
+        self.trim_cache()
+        self.changed = {}
+        self.deleted = set()
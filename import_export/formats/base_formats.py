@@ -1,6 +1,11 @@
+import csv
 import tablib
+import tempfile
 import warnings
 from importlib import import_module
+from io import BytesIO
+
+from ..streams import RowStream
 
 try:
     from tablib.compat import xlrd
@@ -42,12 +47,33 @@ class Format:
         """
         raise NotImplementedError()
 
+    def create_row_stream(self, in_stream, **kwargs):
+        """
+        Create :class:`~import_export.streams.RowStream` from given string
+        or file object.
+
+        Default implementation reads the whole dataset with
+        :meth:`create_dataset`, formats which can read rows lazily
+        override it.
+        """
+        if hasattr(in_stream, 'read'):
+            in_stream = in_stream.read()
+        dataset = self.create_dataset(in_stream, **kwargs)
+        return RowStream(dataset.headers or [], dataset)
+
     def export_data(self, dataset, **kwargs):
         """
         Returns format representation for given dataset.
         """
         raise NotImplementedError()
 
+    def export_stream(self, headers, rows, **kwargs):
+        """
+        Returns iterator of chunks of format representation for given
+        headers and iterable of rows.
+        """
+        raise NotImplementedError()
+
     def is_binary(self):
         """
         Returns if this format is binary.
@@ -77,6 +103,35 @@ class Format:
     def can_export(self):
         return False
 
+    def can_stream_export(self):
+        """
+        Returns if this format implements ``export_stream``.
+        """
+        return False
+
+
+class Echo:
+    """
+    File-like object which returns written value instead of storing it.
+    """
+
+    def write(self, value):
+        return value
+
+
+def iter_lines(text):
+    """
+    Yields lines of ``text`` including line endings without copying the
+    whole text like ``str.splitlines()`` does.
+    """
+    start = 0
+    while start < len(text):
+        end = text.find('\n', start) + 1
+        if not end:
+            end = len(text)
+        yield text[start:end]
+        start = end
+
 
 class TablibFormat(Format):
     TABLIB_MODULE = None
@@ -126,7 +181,38 @@ class TextFormat(TablibFormat):
         return False
 
 
-class CSV(TextFormat):
+class DelimitedTextFormat(TextFormat):
+    """
+    Text format with delimiter separated values which can be exported
+    row by row.
+    """
+    DELIMITER = ','
+    #: number of rows written to a single chunk of ``export_stream``
+    STREAM_CHUNK_ROWS = 500
+
+    def create_row_stream(self, in_stream, **kwargs):
+        if isinstance(in_stream, str):
+            in_stream = iter_lines(in_stream)
+        reader = csv.reader(in_stream, delimiter=self.DELIMITER)
+        headers = next(reader, [])
+        return RowStream(headers, (row for row in reader if row))
+
+    def export_stream(self, headers, rows, **kwargs):
+        writer = csv.writer(Echo(), delimiter=self.DELIMITER)
+        chunk = [writer.writerow(headers)]
+        for row in rows:
+            chunk.append(writer.writerow(row))
+            if len(chunk) >= self.STREAM_CHUNK_ROWS:
+                yield ''.join(chunk)
+                chunk = []
+        if chunk:
+            yield ''.join(chunk)
+
+    def can_stream_export(self):
+        return True
+
+
+class CSV(DelimitedTextFormat):
     TABLIB_MODULE = 'tablib.formats._csv'
     CONTENT_TYPE = 'text/csv'
 
@@ -145,8 +231,9 @@ class YAML(TextFormat):
     CONTENT_TYPE = 'text/yaml'
 
 
-class TSV(TextFormat):
+class TSV(DelimitedTextFormat):
     TABLIB_MODULE = 'tablib.formats._tsv'
+    DELIMITER = '\t'
     CONTENT_TYPE = 'text/tab-separated-values'
 
     def create_dataset(self, in_stream, **kwargs):
@@ -184,14 +271,60 @@ class XLS(TablibFormat):
             dataset.append(sheet.row_values(i))
         return dataset
 
+    def create_row_stream(self, in_stream, **kwargs):
+        """
+        Create row stream from first sheet. The workbook itself is always
+        loaded into memory by xlrd.
+        """
+        assert XLS_IMPORT
+        if hasattr(in_stream, 'read'):
+            in_stream = in_stream.read()
+        xls_book = xlrd.open_workbook(file_contents=in_stream)
+        sheet = xls_book.sheets()[0]
+        if not sheet.nrows:
+            return RowStream([], [])
+        rows = (sheet.row_values(i) for i in range(1, sheet.nrows))
+        return RowStream(sheet.row_values(0), rows)
+
 
 class XLSX(TablibFormat):
     TABLIB_MODULE = 'tablib.formats._xlsx'
     CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    #: size in bytes of chunks returned by ``export_stream``
+    STREAM_CHUNK_SIZE = 64 * 1024
 
     def can_import(self):
         return XLSX_IMPORT
 
+    def can_stream_export(self):
+        return XLSX_IMPORT
+
+    def export_stream(self, headers, rows, **kwargs):
+        """
+        Writes rows to a write-only workbook, which does not keep written
+        rows in memory, saves it to a temporary file and returns the file
+        in chunks. The headers are bold like in ``export_data``.
+        """
+        assert XLSX_IMPORT
+        book = openpyxl.Workbook(write_only=True)
+        sheet = book.create_sheet()
+        bold = openpyxl.styles.Font(bold=True)
+        header_cells = []
+        for header in headers:
+            cell = openpyxl.cell.WriteOnlyCell(sheet, value=header)
+            cell.font = bold
+            header_cells.append(cell)
+        sheet.append(header_cells)
+        for row in rows:
+            sheet.append(row)
+        with tempfile.TemporaryFile() as tmp_file:
+            book.save(tmp_file)
+            tmp_file.seek(0)
+            chunk = tmp_file.read(self.STREAM_CHUNK_SIZE)
+            while chunk:
+                yield chunk
+                chunk = tmp_file.read(self.STREAM_CHUNK_SIZE)
+
     def create_dataset(self, in_stream):
         """
         Create dataset from first sheet.
@@ -212,6 +345,19 @@ class XLSX(TablibFormat):
             dataset.append(row_values)
         return dataset
 
+    def create_row_stream(self, in_stream, **kwargs):
+        """
+        Create row stream from first sheet, rows are read lazily from a
+        read-only workbook.
+        """
+        assert XLSX_IMPORT
+        if not hasattr(in_stream, 'read'):
+            in_stream = BytesIO(in_stream)
+        xlsx_book = openpyxl.load_workbook(in_stream, read_only=True)
+        rows = xlsx_book.active.rows
+        headers = [cell.value for cell in next(rows, [])]
+        return RowStream(headers, ([cell.value for cell in row] for row in rows))
+
 
 #: These are the default formats for import and export. Whether they can be
 #: used or not is depending on their implementation in the tablib library.
@@ -29,12 +29,18 @@ class ConfirmImportForm(forms.Form):
     import_file_name = forms.CharField(widget=forms.HiddenInput())
     original_file_name = forms.CharField(widget=forms.HiddenInput())
     input_format = forms.CharField(widget=forms.HiddenInput())
+    dry_run_file_name = forms.CharField(widget=forms.HiddenInput(), required=False)
 
     def clean_import_file_name(self):
         data = self.cleaned_data['import_file_name']
         data = os.path.basename(data)
         return data
 
+    def clean_dry_run_file_name(self):
+        data = self.cleaned_data['dry_run_file_name']
+        data = os.path.basename(data)
+        return data
+
 
 class ExportForm(forms.Form):
     file_format = forms.ChoiceField(
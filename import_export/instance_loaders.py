@@ -1,4 +1,13 @@
 import re
+from collections import OrderedDict
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+from django.utils.encoding import force_text
+
+from .streams import LookaheadCache, RowStream
+
 
 class BaseInstanceLoader:
     """
@@ -12,6 +21,14 @@ class BaseInstanceLoader:
     def get_instance(self, row):
         raise NotImplementedError
 
+    def clear_cache(self, rows=None):
+        """
+        Forgets instances loaded for ``rows``, or for all rows if ``rows``
+        is ``None``, e.g. after the rows have been rolled back. Does nothing
+        by default.
+        """
+        pass
+
 
 class ModelInstanceLoader(BaseInstanceLoader):
     """
@@ -56,18 +73,209 @@ class CachedInstanceLoader(ModelInstanceLoader):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
+        if isinstance(self.dataset, RowStream):
+            raise ValueError("CachedInstanceLoader can not read a RowStream, "
+                             "use BatchedInstanceLoader instead.")
+
         pk_field_name = self.resource.get_import_id_fields()[0]
         self.pk_field = self.resource.fields[pk_field_name]
+        self.load_instances()
 
-        ids = [self.pk_field.clean(row) for row in self.dataset.dict]
+    def load_instances(self, rows=None):
+        """
+        Loads the instances of ``rows``, or of all rows of the dataset if
+        ``rows`` is ``None``.
+        """
+        if rows is None:
+            rows = self.dataset.dict
+            self.all_instances = {}
+        ids = [self.pk_field.clean(row) for row in rows]
+        for pk in ids:
+            self.all_instances.pop(pk, None)
         qs = self.get_queryset().filter(**{
             "%s__in" % self.pk_field.attribute: ids
             })
 
-        self.all_instances = {
+        self.all_instances.update({
             self.pk_field.get_value(instance): instance
             for instance in qs
-        }
+        })
 
     def get_instance(self, row):
         return self.all_instances.get(self.pk_field.clean(row))
+
+    def clear_cache(self, rows=None):
+        self.load_instances(rows)
+
+
+class BatchedInstanceLoader(LookaheadCache, ModelInstanceLoader):
+    """
+    Loads model instances in batches of ``batch_size`` keys while the
+    dataset is imported, so that only ``len(dataset) / batch_size`` queries
+    are made.
+
+    Unlike :class:`CachedInstanceLoader`, this instance loader works with
+    any number of ``import_id_fields`` and with
+    :class:`~import_export.streams.RowStream` datasets. Loaded instances
+    are kept in a cache which never holds more than ``cache_size`` entries,
+    keyed by the tuple of ``import_id_fields`` values rendered by their
+    widgets, so that the values cleaned from a row and the values of a
+    loaded instance give the same key.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.id_fields = [self.resource.fields[f]
+                          for f in self.resource.get_import_id_fields()]
+        self.init_cache()
+
+    def get_values(self, row):
+        """
+        Returns tuple of cleaned ``import_id_fields`` values for ``row``
+        or ``None`` if any of them is empty.
+        """
+        values = tuple(field.clean(row) for field in self.id_fields)
+        if any(value in (None, '') for value in values):
+            return None
+        return values
+
+    def make_key(self, values):
+        """
+        Returns the cache key of a tuple of ``import_id_fields`` values.
+        """
+        return tuple(field.widget.render(value)
+                     for field, value in zip(self.id_fields, values))
+
+    def get_key(self, row):
+        """
+        Returns the cache key of ``row`` or ``None`` if any of its
+        ``import_id_fields`` values is empty.
+        """
+        values = self.get_values(row)
+        if values is None:
+            return None
+        return self.make_key(values)
+
+    def get_row_key(self, row):
+        """
+        Returns tuple of the key and the cleaned values of ``row``, or
+        ``None``.
+        """
+        values = self.get_values(row)
+        if values is None:
+            return None
+        return self.make_key(values), values
+
+    def get_instance_key(self, instance):
+        return self.make_key([field.get_value(instance) for field in self.id_fields])
+
+    def get_lookup(self, values):
+        return Q(**{field.attribute: value
+                    for field, value in zip(self.id_fields, values)})
+
+    def get_batch_lookup(self, batch):
+        """
+        Returns ``Q`` object matching any of the keys of ``batch``, a
+        dictionary of the cleaned values by key.
+        """
+        if len(self.id_fields) == 1:
+            return Q(**{
+                "%s__in" % self.id_fields[0].attribute: [v[0] for v in batch.values()]
+            })
+        return reduce(or_, [self.get_lookup(values) for values in batch.values()])
+
+    def get_batch_queryset(self, batch):
+        """
+        Returns queryset of instances matching any of the keys of
+        ``batch``, a dictionary of the cleaned values by key.
+        """
+        return self.get_queryset().filter(self.get_batch_lookup(batch))
+
+    def load_batch(self, key, values):
+        """
+        Loads ``key`` together with the next keys in the dataset which are
+        not cached yet.
+        """
+        batch = self.get_batch(key, values)
+        instances = OrderedDict((batch_key, None) for batch_key in batch)
+        for instance in self.get_batch_queryset(batch):
+            instances[self.get_instance_key(instance)] = instance
+        self.cache.update(instances)
+        self.trim_cache()
+
+    def get_instance(self, row):
+        values = self.get_values(row)
+        if values is None:
+            return super().get_instance(row)
+        key = self.make_key(values)
+        if key not in self.cache:
+            self.load_batch(key, values)
+        instance = self.cache.get(key)
+        if instance is None:
+            # the row may create the instance, look it up again next time
+            self.cache.pop(key, None)
+        return instance
+
+    def clear_cache(self, rows=None):
+        if rows is None:
+            self.cache.clear()
+            return
+        for row in rows:
+            try:
+                key = self.get_key(row)
+            except Exception:
+                # the row has failed, it has no cached instance
+                continue
+            self.cache.pop(key, None)
+
+
+class ResolvedInstanceLoader(BatchedInstanceLoader):
+    """
+    Batched instance loader which remembers the primary keys of the
+    instances it has found in ``found_keys``.
+
+    When it is given ``resolved_keys`` found by an earlier import of the
+    same dataset, e.g. by the dry run in the admin, the instances of these
+    keys are loaded by primary key. Keys which had no instance are looked
+    up by their ``import_id_fields`` again, in the same query, as their
+    instances may have been created since.
+
+    Keys are tuples of text and primary keys are text in ``found_keys``,
+    so that they can be saved as JSON.
+    """
+
+    def __init__(self, resource, dataset=None, resolved_keys=None):
+        super().__init__(resource, dataset)
+        self.resolved_keys = resolved_keys
+        if resolved_keys is not None:
+            self.resolved_pks = {force_text(pk): key for key, pk in resolved_keys.items()}
+        self.found_keys = OrderedDict()
+
+    def make_key(self, values):
+        return tuple(force_text(value) for value in super().make_key(values))
+
+    def get_instance_key(self, instance):
+        if self.resolved_keys is not None:
+            key = self.resolved_pks.get(force_text(instance.pk))
+            if key is not None:
+                return key
+        return super().get_instance_key(instance)
+
+    def get_batch_lookup(self, batch):
+        if self.resolved_keys is None:
+            return super().get_batch_lookup(batch)
+        lookup = Q(pk__in=[self.resolved_keys[key] for key in batch
+                           if key in self.resolved_keys])
+        new = OrderedDict((key, values) for key, values in batch.items()
+                          if key not in self.resolved_keys)
+        if new:
+            lookup |= super().get_batch_lookup(new)
+        return lookup
+
+    def get_instance(self, row):
+        instance = super().get_instance(row)
+        if instance is not None:
+            key = self.get_key(row)
+            if key is not None:
+                self.found_keys[key] = force_text(instance.pk)
+        return instance
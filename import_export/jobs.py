@@ -0,0 +1,76 @@
+import logging
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class BaseJobRunner:
+    """
+    Base class of job runners, which run
+    :class:`~import_export.models.ImportJob` imports outside of the request
+    which has started them.
+    """
+
+    def submit(self, job, func, *args, **kwargs):
+        """
+        Schedules ``func(*args, **kwargs)``, which returns the import
+        ``Result``, to run as ``job``.
+        """
+        raise NotImplementedError
+
+    def run(self, job, func, *args, **kwargs):
+        """
+        Runs ``func`` and records its outcome on ``job``.
+        """
+        job.start()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            logger.debug(e, exc_info=e)
+            job.fail(traceback.format_exc())
+        else:
+            job.finish(result)
+
+
+class SynchronousJobRunner(BaseJobRunner):
+    """
+    Runs jobs right away in the current thread.
+    """
+
+    def submit(self, job, func, *args, **kwargs):
+        self.run(job, func, *args, **kwargs)
+
+
+class ThreadPoolJobRunner(BaseJobRunner):
+    """
+    Runs jobs in a pool of ``max_workers`` threads of the current process.
+
+    Jobs which are queued or running when the process exits are lost and
+    stay pending or running.
+    """
+    max_workers = 2
+
+    _executor = None
+    _lock = Lock()
+
+    @classmethod
+    def get_executor(cls):
+        with cls._lock:
+            # every subclass has its own pool
+            if cls.__dict__.get('_executor') is None:
+                cls._executor = ThreadPoolExecutor(max_workers=cls.max_workers)
+            return cls._executor
+
+    def submit(self, job, func, *args, **kwargs):
+        return self.get_executor().submit(self.run_in_thread, job, func, *args, **kwargs)
+
+    def run_in_thread(self, job, func, *args, **kwargs):
+        try:
+            self.run(job, func, *args, **kwargs)
+        finally:
+            # the connections of a pool thread are never closed otherwise
+            connections.close_all()
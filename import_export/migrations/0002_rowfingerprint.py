@@ -0,0 +1,32 @@
+# Generated by Django 2.1.15 on 2026-10-16 20:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('import_export', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RowFingerprint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('import_id', models.CharField(max_length=40, verbose_name='import id')),
+                ('fingerprint', models.CharField(max_length=40, verbose_name='fingerprint')),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.ContentType', verbose_name='content type')),
+            ],
+            options={
+                'verbose_name': 'row fingerprint',
+                'verbose_name_plural': 'row fingerprints',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='rowfingerprint',
+            unique_together={('content_type', 'import_id')},
+        ),
+    ]
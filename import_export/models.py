@@ -0,0 +1,139 @@
+import json
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+class ImportJob(models.Model):
+    """
+    Import of a file which runs outside of the request which has started
+    it, see :doc:`api_jobs`.
+
+    The import runs in a transaction, so its progress is kept in the cache
+    while it is running and saved to the job once it has finished. The
+    default cache has to be shared by all server processes to show the
+    progress of a running job.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_FINISHED = 'finished'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = (
+        (STATUS_PENDING, _('Pending')),
+        (STATUS_RUNNING, _('Running')),
+        (STATUS_FINISHED, _('Finished')),
+        (STATUS_FAILED, _('Failed')),
+    )
+
+    #: number of rows between progress updates
+    progress_interval = 100
+    PROGRESS_CACHE_PREFIX = 'django-import-export-job-'
+    PROGRESS_CACHE_LIFETIME = 86400
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True,
+                             on_delete=models.SET_NULL, verbose_name=_('user'))
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE,
+                                     verbose_name=_('content type'))
+    file_name = models.CharField(_('file name'), max_length=255)
+    status = models.CharField(_('status'), max_length=20, choices=STATUS_CHOICES,
+                              default=STATUS_PENDING)
+    total_rows = models.PositiveIntegerField(_('total rows'), null=True, blank=True)
+    processed_rows = models.PositiveIntegerField(_('processed rows'), default=0)
+    totals = models.TextField(_('totals'), blank=True)
+    error = models.TextField(_('error'), blank=True)
+    created = models.DateTimeField(_('created'), auto_now_add=True)
+    finished = models.DateTimeField(_('finished'), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('import job')
+        verbose_name_plural = _('import jobs')
+        ordering = ('-created',)
+
+    def __str__(self):
+        return self.file_name
+
+    def is_done(self):
+        return self.status in (self.STATUS_FINISHED, self.STATUS_FAILED)
+
+    def get_totals(self):
+        """
+        Returns dictionary of row counts by ``RowResult`` import type.
+        """
+        return json.loads(self.totals) if self.totals else {}
+
+    def get_progress_cache_key(self):
+        return self.PROGRESS_CACHE_PREFIX + str(self.pk)
+
+    def get_progress(self):
+        """
+        Returns dictionary with ``processed_rows``, ``total_rows`` and
+        ``totals`` of the job.
+        """
+        if self.status == self.STATUS_RUNNING:
+            progress = cache.get(self.get_progress_cache_key())
+            if progress is not None:
+                return progress
+        return {
+            'processed_rows': self.processed_rows,
+            'total_rows': self.total_rows,
+            'totals': self.get_totals(),
+        }
+
+    def set_result(self, result):
+        self.total_rows = result.total_rows
+        self.processed_rows = sum(result.totals.values())
+        self.totals = json.dumps(result.totals)
+
+    def start(self):
+        self.status = self.STATUS_RUNNING
+        self.save(update_fields=['status'])
+
+    def update_progress(self, result, row_number):
+        """
+        Progress callback of ``Resource.import_data``.
+        """
+        if row_number % self.progress_interval == 0:
+            cache.set(self.get_progress_cache_key(), {
+                'processed_rows': row_number,
+                'total_rows': result.total_rows or None,
+                'totals': dict(result.totals),
+            }, self.PROGRESS_CACHE_LIFETIME)
+
+    def finish(self, result):
+        self.set_result(result)
+        self.status = self.STATUS_FINISHED
+        self.finished = timezone.now()
+        self.save()
+        cache.delete(self.get_progress_cache_key())
+
+    def fail(self, error):
+        self.status = self.STATUS_FAILED
+        self.error = error
+        self.finished = timezone.now()
+        self.save()
+        cache.delete(self.get_progress_cache_key())
+
+
+class RowFingerprint(models.Model):
+    """
+    Hash of the row an object was last imported from, which lets unchanged
+    rows be skipped, see ``ResourceOptions.use_fingerprints``.
+    """
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE,
+                                     verbose_name=_('content type'))
+    #: hash of the ``import_id_fields`` values of the row
+    import_id = models.CharField(_('import id'), max_length=40)
+    fingerprint = models.CharField(_('fingerprint'), max_length=40)
+
+    class Meta:
+        verbose_name = _('row fingerprint')
+        verbose_name_plural = _('row fingerprints')
+        unique_together = (('content_type', 'import_id'),)
+
+    def __str__(self):
+        return self.fingerprint
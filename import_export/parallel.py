@@ -0,0 +1,252 @@
+import logging
+import multiprocessing
+import time
+import traceback
+from multiprocessing.connection import wait
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.transaction import set_rollback
+from tablib import Dataset
+
+from .streams import RowStream
+from .utils import atomic_if_using_transaction
+
+logger = logging.getLogger(__name__)
+
+
+class ParallelImport:
+    """
+    Imports a dataset in ``workers`` processes, see the ``workers``
+    argument of ``Resource.import_data``.
+
+    Rows are partitioned by the hash of their import id, so that all rows
+    of an instance are imported by the same worker. Rows without import id
+    are spread evenly. Every worker is a forked process which imports its
+    partition with ``import_data_inner`` using its own database connection
+    and transaction. The transactions are committed only once all workers
+    have finished without errors.
+
+    The ``before_import`` and ``after_import`` hooks are called by every
+    worker for its partition.
+
+    A finished worker keeps its transaction open until all workers have
+    finished, so another worker may wait for a lock it holds, e.g. when
+    both create the same related object. Workers report their progress
+    after every row, at most ten times per ``timeout``. A worker
+    which has not reported progress for ``timeout`` seconds is taken as
+    stalled and terminated, and all transactions are rolled back, so
+    ``timeout`` has to be longer than the import of any single row or bulk
+    batch takes.
+
+    Import-scoped caches such as
+    :class:`~import_export.fields.AttributeLookups` are not shared between
+    workers. Two workers which both miss the same attribute option each
+    create it, so options should exist before a catalog is imported with
+    workers.
+    """
+    start_method = 'fork'
+    timeout = 300
+
+    def __init__(self, resource, workers):
+        self.resource = resource
+        self.workers = workers
+
+    def get_partition(self, row_number, row):
+        """
+        Returns the index of the worker which imports ``row``.
+        """
+        try:
+            import_id = self.resource.get_row_import_id(row)
+        except Exception:
+            # the error is reported when the row itself is imported
+            import_id = None
+        if import_id is None:
+            return row_number % self.workers
+        return int(import_id[:8], 16) % self.workers
+
+    def partition(self, dataset):
+        """
+        Splits ``dataset`` into one dataset per worker.
+
+        Returns a list of tuples of dataset and the list of numbers which
+        its rows have in ``dataset``.
+        """
+        partitions = [(Dataset(headers=dataset.headers), []) for i in range(self.workers)]
+        for i, row in enumerate(dataset.dict, 1):
+            part, row_numbers = partitions[self.get_partition(i, row)]
+            part.append(list(row.values()))
+            row_numbers.append(i)
+        return [(part, row_numbers) for part, row_numbers in partitions if row_numbers]
+
+    def import_data(self, dataset, dry_run, raise_errors, using_transactions,
+                    collect_failed_rows, **kwargs):
+        if isinstance(dataset, RowStream):
+            raise ValueError("A RowStream can not be imported with workers, "
+                             "create a Dataset instead.")
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            raise ImproperlyConfigured("An import with workers can not run "
+                                       "inside of a transaction.")
+
+        partitions = self.partition(dataset)
+        context = multiprocessing.get_context(self.start_method)
+        # forked workers must not share the connections of this process
+        connections.close_all()
+        workers = []
+        for part, row_numbers in partitions:
+            conn, worker_conn = context.Pipe()
+            process = context.Process(target=self.run_worker, args=(
+                part, worker_conn, dry_run, raise_errors, using_transactions,
+                collect_failed_rows), kwargs=kwargs)
+            process.start()
+            worker_conn.close()
+            workers.append((process, conn))
+
+        try:
+            outcomes = self.receive_outcomes(workers)
+            errors = [error for part_result, error in outcomes if error is not None]
+            commit = not errors and not any(part_result.has_errors()
+                                            for part_result, error in outcomes)
+            for (process, conn), (part_result, error) in zip(workers, outcomes):
+                if error is None:
+                    # a failed worker has already rolled back
+                    conn.send(commit)
+        finally:
+            for process, conn in workers:
+                conn.close()
+                process.join()
+
+        if errors and raise_errors:
+            raise errors[0].error
+
+        result = self.resource.get_result_class()()
+        result.diff_headers = self.resource.get_diff_headers()
+        result.total_rows = len(dataset)
+        if collect_failed_rows:
+            result.add_dataset_headers(dataset.headers)
+        for error in errors:
+            result.append_base_error(error)
+        self.merge(result, [(part_result, row_numbers)
+                            for (part_result, error), (part, row_numbers)
+                            in zip(outcomes, partitions)
+                            if part_result is not None])
+        return result
+
+    def receive_outcomes(self, workers):
+        """
+        Returns the tuples of result and error sent by ``workers`` in their
+        order. Workers which have not reported progress for ``timeout``
+        seconds are terminated and get an error.
+        """
+        outcomes = [None] * len(workers)
+        pending = {conn: index for index, (process, conn) in enumerate(workers)}
+        last_seen = dict.fromkeys(pending, time.monotonic())
+        while pending:
+            deadline = min(last_seen[conn] for conn in pending) + self.timeout
+            for conn in wait(list(pending), max(deadline - time.monotonic(), 0)):
+                message = self.receive(conn)
+                if message is None:
+                    # the worker has imported another row
+                    last_seen[conn] = time.monotonic()
+                else:
+                    outcomes[pending.pop(conn)] = message
+            now = time.monotonic()
+            for conn in [conn for conn in pending if now - last_seen[conn] >= self.timeout]:
+                index = pending.pop(conn)
+                workers[index][0].terminate()
+                error = TimeoutError("Worker has not imported a row for %s seconds, it may "
+                                     "wait for a lock held by another worker." % self.timeout)
+                outcomes[index] = (None, self.resource.get_error_result_class()(error))
+        return outcomes
+
+    def receive(self, conn):
+        """
+        Returns the tuple of result and error sent by a worker through
+        ``conn``, or ``None`` if the worker has reported progress.
+        """
+        try:
+            return conn.recv()
+        except EOFError as e:
+            # the worker has exited without sending, e.g. it was killed
+            logger.debug(e, exc_info=e)
+            error = RuntimeError("Worker exited without sending its result.")
+            return None, self.resource.get_error_result_class()(error, traceback.format_exc())
+
+    def run_worker(self, dataset, conn, dry_run, raise_errors, using_transactions,
+                   collect_failed_rows, **kwargs):
+        """
+        Imports ``dataset`` in the worker process, sends its progress and
+        its result or error through ``conn`` and waits for the decision
+        whether to commit.
+        """
+        last_sent = [time.monotonic()]
+
+        def send_progress(result, row_number):
+            now = time.monotonic()
+            if now - last_sent[0] >= self.timeout / 10:
+                conn.send(None)
+                last_sent[0] = now
+
+        try:
+            with atomic_if_using_transaction(using_transactions):
+                try:
+                    result = self.resource.import_data_inner(
+                        dataset, dry_run, raise_errors, using_transactions,
+                        collect_failed_rows, progress_callback=send_progress, **kwargs)
+                except Exception as e:
+                    logger.debug(e, exc_info=e)
+                    self.send_error(conn, e, traceback.format_exc())
+                    if using_transactions:
+                        set_rollback(True)
+                    return
+                try:
+                    conn.send((result, None))
+                except Exception as e:
+                    # the result could not be pickled
+                    logger.debug(e, exc_info=e)
+                    self.send_error(conn, e, traceback.format_exc())
+                    if using_transactions:
+                        set_rollback(True)
+                    return
+                if not conn.recv() and using_transactions:
+                    set_rollback(True)
+        finally:
+            conn.close()
+            connections.close_all()
+
+    def send_error(self, conn, error, tb_info):
+        error_class = self.resource.get_error_result_class()
+        try:
+            conn.send((None, error_class(error, tb_info)))
+        except Exception:
+            # the exception could not be pickled
+            conn.send((None, error_class(Exception(str(error)), tb_info)))
+
+    def merge(self, result, partition_results):
+        """
+        Adds the results of the partitions to ``result`` in the order of the
+        rows in the dataset. ``partition_results`` is a list of tuples of
+        the result of a partition and the numbers of its rows.
+        """
+        rows = []
+        failed_rows = []
+        for part_result, row_numbers in partition_results:
+            result.base_errors.extend(part_result.base_errors)
+            for import_type, count in part_result.totals.items():
+                result.totals[import_type] += count
+            failed = iter(part_result.failed_dataset)
+            for row_result in part_result.rows:
+                if row_result.number is not None:
+                    row_result.number = row_numbers[row_result.number - 1]
+                rows.append(row_result)
+                if (row_result.errors or row_result.validation_error) and \
+                        part_result.failed_dataset.height:
+                    failed_rows.append((row_result.number, next(failed)))
+            for invalid_row in part_result.invalid_rows:
+                invalid_row.number = row_numbers[invalid_row.number - 1]
+                result.invalid_rows.append(invalid_row)
+
+        result.rows.extend(sorted(rows, key=lambda row_result: row_result.number or 0))
+        result.invalid_rows.sort(key=lambda invalid_row: invalid_row.number)
+        for number, values in sorted(failed_rows, key=lambda item: item[0] or 0):
+            result.failed_dataset.append(values)
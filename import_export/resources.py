@@ -1,34 +1,43 @@
 import functools
+import hashlib
+import json
 import logging
 import tablib
 import traceback
 from collections import OrderedDict
 from copy import deepcopy
+from operator import attrgetter, itemgetter
 
 from diff_match_patch import diff_match_patch
 
 from django.conf import settings
-from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.core.exceptions import ImproperlyConfigured, ObjectDoesNotExist, ValidationError
 from django.core.management.color import no_style
 from django.db import DEFAULT_DB_ALIAS, connections
-from django.db.models.fields import FieldDoesNotExist
+from django.db.models import prefetch_related_objects
+from django.db.models.fields import NOT_PROVIDED, FieldDoesNotExist
 from django.db.models.fields.related import ForeignObjectRel
-from django.db.models.query import QuerySet
+from django.db.models.manager import Manager
+from django.db.models.query import ModelIterable, QuerySet
 from django.db.transaction import (
     TransactionManagementError,
     atomic,
     savepoint,
     savepoint_commit,
-    savepoint_rollback
+    savepoint_rollback,
+    set_rollback
 )
 from django.utils.encoding import force_text
 from django.utils.safestring import mark_safe
 
 from . import widgets
 from .fields import Field, PriceField, AttributeField, ParentField
+from .fingerprints import FingerprintStore
 from .instance_loaders import ModelInstanceLoader
+from .parallel import ParallelImport
 from .results import Error, Result, RowResult
-from .utils import atomic_if_using_transaction
+from .streams import RowStream
+from .utils import atomic_if_using_transaction, chunked
 
 logger = logging.getLogger(__name__)
 # Set default logging handler to avoid "No handler found" warnings.
@@ -116,6 +125,61 @@ class ResourceOptions:
     The default value is False.
     """
 
+    use_bulk = False
+    """
+    Controls whether import operations should be performed in bulk. By
+    default, an object's ``save()`` method is called for each row in a
+    dataset. When bulk is enabled, new, changed and deleted instances are
+    collected and written with ``bulk_create()``, ``bulk_update()`` and a
+    single ``delete()`` query per batch. Many-to-many fields are saved
+    after the batch they belong to has been written. On databases which do
+    not return the primary keys of rows inserted in bulk, such as SQLite
+    and MySQL, new instances are saved one by one. The default value is
+    False.
+    """
+
+    batch_size = 1000
+    """
+    Controls how many instances are collected before they are written to
+    the database when ``use_bulk`` is enabled. The default value is 1000.
+    """
+
+    export_chunk_size = 2000
+    """
+    Controls how many objects are exported together. Relations listed in
+    ``prefetch_lookups`` of export fields are prefetched once per chunk.
+    The default value is 2000.
+    """
+
+    export_keyset_pagination = False
+    """
+    Controls whether exported querysets are read in pages of
+    ``export_chunk_size`` objects, each page selecting the objects with a
+    primary key greater than the last one of the previous page, instead of
+    iterating over a single query. Querysets which are ordered by other
+    fields than the primary key, sliced or combined are iterated over as
+    usual. The default value is False.
+    """
+
+    use_fingerprints = False
+    """
+    Controls if a fingerprint (hash) of every imported row is stored per
+    model and import id, so that rows which did not change since they were
+    last imported are skipped before their instance is loaded. Changes made
+    to the objects other than by the import are not detected. The default
+    value is False.
+    """
+
+    savepoint_batch_size = None
+    """
+    Controls how many rows are imported under a single savepoint when
+    transactions are used. By default, every row is imported under its own
+    savepoint. If a row of a batch fails, the batch is rolled back and
+    imported again with a savepoint per row, so that only the failed row is
+    rolled back. Ignored when ``use_bulk`` is enabled. The default value is
+    None.
+    """
+
 
 class DeclarativeMetaclass(type):
 
@@ -176,8 +240,13 @@ class Diff:
         for v1, v2 in zip(self.left, self.right):
             if v1 != v2 and self.new:
                 v1 = ""
-            diff = dmp.diff_main(force_text(v1), force_text(v2))
-            dmp.diff_cleanupSemantic(diff)
+            v1, v2 = force_text(v1), force_text(v2)
+            if v1 == v2:
+                # nothing to diff, render the value as diff_main() would
+                diff = [(dmp.DIFF_EQUAL, v1)] if v1 else []
+            else:
+                diff = dmp.diff_main(v1, v2)
+                dmp.diff_cleanupSemantic(diff)
             html = dmp.diff_prettyHtml(diff)
             html = mark_safe(html)
             data.append(html)
@@ -187,6 +256,319 @@ class Diff:
         return [resource.export_field(f, instance) if instance else "" for f in resource.get_user_visible_fields()]
 
 
+class ImportPlan:
+    """
+    Import fields of a resource grouped by how they are imported, which is
+    worked out once instead of for every row, see
+    :meth:`~import_export.resources.Resource.get_import_plan`.
+
+    ``instance_fields`` lists the fields set by ``import_obj`` in import
+    order as tuples of field and setter, ``m2m_fields`` the fields saved by
+    ``save_m2m`` and ``custom_fields`` the price, attribute and parent
+    fields. Fields which use ``Field.save`` and ``Field.clean`` as they are
+    get a setter which calls the ``clean`` method of their widget directly,
+    the setter of other fields is ``None``.
+    """
+
+    def __init__(self, resource):
+        self.fields = resource.get_import_fields()
+        self.column_names = sorted(field.column_name for field in self.fields)
+        self.instance_fields = []
+        self.m2m_fields = []
+        self.custom_fields = []
+        # an overridden import_field() has to be called for every field
+        compile_setters = type(resource).import_field is Resource.import_field
+        for field in self.fields:
+            if isinstance(field.widget, widgets.ManyToManyWidget):
+                self.m2m_fields.append(field)
+                continue
+            if isinstance(field, (PriceField, AttributeField, ParentField)):
+                self.custom_fields.append(field)
+            setter = self.compile_setter(field) if compile_setters else None
+            self.instance_fields.append((field, setter))
+
+    @staticmethod
+    def compile_setter(field):
+        """
+        Returns a function which sets the cleaned value of ``field`` on an
+        instance like ``Field.save`` does, or ``None`` if ``field`` has to
+        be saved by ``Field.save``.
+        """
+        if (type(field).save is not Field.save or type(field).clean is not Field.clean or
+                not field.attribute or '__' in field.attribute or field.attribute == 'id'):
+            return None
+        if field.readonly:
+            return lambda obj, data: None
+
+        column_name = field.column_name
+        attribute = field.attribute
+        clean = field.widget.clean
+        default = field.default
+        empty_values = field.empty_values
+        saves_null_values = field.saves_null_values
+
+        def setter(obj, data):
+            value = clean(data[column_name], row=data)
+            if default is not NOT_PROVIDED and value in empty_values:
+                value = default() if callable(default) else default
+            if value is not None or saves_null_values:
+                setattr(obj, attribute, value)
+        return setter
+
+
+class ExportPlan:
+    """
+    Export fields of a resource with the function which exports each of
+    them, worked out once per export instead of for every cell, see
+    :meth:`~import_export.resources.Resource.get_export_plan`.
+
+    ``exporters`` holds a callable per field in ``fields`` which returns
+    the exported value of an object: the ``dehydrate_<field name>`` method
+    of the resource, or, for fields which use ``Field.get_value`` and
+    ``Field.export`` as they are, a function which follows the attribute
+    path of the field and calls the ``render`` method of its widget
+    directly. Other fields are exported with ``Field.export``.
+
+    If every field is exported from the value of a model field, possibly
+    across forward relations, and rendered by a widget which does not use
+    the object, ``value_paths`` lists the lookups with which
+    :meth:`export_values` reads the values with ``values_list()`` instead
+    of loading objects. Otherwise it is ``None``.
+    """
+
+    #: widget render methods which only use the value
+    value_renderers = (
+        widgets.Widget.render,
+        widgets.NumberWidget.render,
+        widgets.CharWidget.render,
+        widgets.BooleanWidget.render,
+        widgets.DateWidget.render,
+        widgets.DateTimeWidget.render,
+        widgets.TimeWidget.render,
+        widgets.DurationWidget.render,
+        widgets.SimpleArrayWidget.render,
+        widgets.JSONWidget.render,
+    )
+
+    def __init__(self, resource, fields=None):
+        self.fields = resource.get_export_fields() if fields is None else fields
+        self.exporters = []
+        self.value_paths = None
+        self.value_columns = None
+        if type(resource).export_field is not Resource.export_field:
+            # an overridden export_field() has to be called for every cell
+            self.exporters = [functools.partial(resource.export_field, field)
+                              for field in self.fields]
+            return
+        field_names = {}
+        for name, field in resource.fields.items():
+            # get_field_name() returns the first name of a field
+            field_names.setdefault(field, name)
+        model = getattr(resource._meta, 'model', None)
+        value_columns = [] if model is not None else None
+        for field in self.fields:
+            if field not in field_names:
+                # raises the error of get_field_name() for every object
+                self.exporters.append(functools.partial(resource.export_field, field))
+                value_columns = None
+                continue
+            method = getattr(resource, 'dehydrate_%s' % field_names[field], None)
+            self.exporters.append(method or self.compile_exporter(field))
+            if value_columns is not None:
+                column = None if method else self.compile_value_column(model, field)
+                if column is None:
+                    value_columns = None
+                else:
+                    value_columns.append(column)
+        if value_columns is not None:
+            self.value_paths = []
+            self.value_columns = []
+            for path, render in value_columns:
+                if path not in self.value_paths:
+                    self.value_paths.append(path)
+                self.value_columns.append((self.value_paths.index(path), render))
+
+    @staticmethod
+    def compile_exporter(field):
+        """
+        Returns a function which exports ``field`` of an object like
+        ``Field.export`` does.
+        """
+        if type(field).get_value is not Field.get_value or type(field).export is not Field.export:
+            return field.export
+        if field.attribute is None:
+            return lambda obj: ""
+
+        attrs = field.attribute.split('__')
+        render = field.widget.render
+
+        def exporter(obj):
+            value = obj
+            for attr in attrs:
+                try:
+                    value = getattr(value, attr, None)
+                except (ValueError, ObjectDoesNotExist):
+                    return ""
+                if value is None:
+                    return ""
+            if callable(value) and not isinstance(value, Manager):
+                value = value()
+                if value is None:
+                    return ""
+            return render(value, obj)
+        return exporter
+
+    @classmethod
+    def compile_value_column(cls, model, field):
+        """
+        Returns a tuple of the ``values_list()`` lookup of ``field`` and a
+        function which renders the looked up value like ``Field.export``
+        does, or ``None`` if the field has to be exported from the object.
+        """
+        if type(field).get_value is not Field.get_value or type(field).export is not Field.export:
+            return None
+        if not field.attribute:
+            return None
+        widget = field.widget
+        attrs = field.attribute.split('__')
+        if isinstance(widget, widgets.ForeignKeyWidget):
+            if type(widget).render is not widgets.ForeignKeyWidget.render:
+                return None
+            # the widget renders a field of the related object as it is
+            path_fields = cls.resolve_path(model, attrs, relation=True)
+            if path_fields is None:
+                return None
+            target_fields = cls.resolve_path(path_fields[-1].related_model,
+                                             widget.field.split('__'))
+            if target_fields is None or any(f.null for f in target_fields):
+                # a missing value would be rendered as None instead of ""
+                return None
+            path = '%s__%s' % (field.attribute, widget.field)
+            return path, lambda value: "" if value is None else value
+
+        if type(widget).render not in cls.value_renderers:
+            return None
+        if cls.resolve_path(model, attrs) is None:
+            return None
+        render = widget.render
+        return field.attribute, lambda value: "" if value is None else render(value)
+
+    @staticmethod
+    def resolve_path(model, attrs, relation=False):
+        """
+        Returns the list of model fields which ``attrs`` lead through
+        forward relations of ``model``, or ``None`` if the last one is not
+        a concrete field. The last field has to be a relation if
+        ``relation`` is set.
+        """
+        path_fields = []
+        for i, attr in enumerate(attrs):
+            if model is None:
+                return None
+            if attr == 'pk':
+                model_field = model._meta.pk
+            else:
+                try:
+                    model_field = model._meta.get_field(attr)
+                except FieldDoesNotExist:
+                    return None
+            if not model_field.concrete or model_field.many_to_many:
+                return None
+            path_fields.append(model_field)
+            if i < len(attrs) - 1 or relation:
+                if not (model_field.many_to_one or model_field.one_to_one):
+                    return None
+                model = model_field.related_model
+            elif model_field.is_relation:
+                # rendered from the related object
+                return None
+        return path_fields
+
+    def can_export_values(self, queryset):
+        """
+        Returns ``True`` if the rows of ``queryset`` can be exported from
+        ``values_list()``.
+        """
+        return (self.value_paths is not None and
+                isinstance(queryset, QuerySet) and
+                issubclass(queryset._iterable_class, ModelIterable) and
+                not queryset.query.distinct and
+                not queryset.query.combinator)
+
+    def export(self, obj):
+        """
+        Returns the list of exported values of ``obj``.
+        """
+        return [exporter(obj) for exporter in self.exporters]
+
+    def export_values(self, queryset):
+        """
+        Yields the exported rows of ``queryset`` without loading objects,
+        see ``value_paths``.
+        """
+        return self.render_values(queryset.values_list(*self.value_paths).iterator())
+
+    def render_values(self, rows):
+        """
+        Yields the exported rows of ``rows``, tuples which start with the
+        values of ``value_paths``.
+        """
+        for values in rows:
+            yield [render(values[i]) for i, render in self.value_columns]
+
+
+class InstanceSnapshot:
+    """
+    Values of the import fields of an instance taken before a row is
+    imported into it, which
+    :meth:`~import_export.resources.Resource.skip_row` compares with the
+    imported instance instead of a deep copy of the instance.
+
+    Many-to-many fields are recorded as sets of primary keys, unless ``m2m``
+    is ``False``.
+    """
+
+    def __init__(self, resource, instance, m2m=True):
+        self.pk = instance.pk
+        self.values = {}
+        for field in resource.get_import_plan().fields:
+            if m2m or not self.is_m2m_field(field):
+                self.values[field.column_name] = self.get_field_value(field, instance)
+
+    @staticmethod
+    def is_m2m_field(field):
+        return isinstance(field.widget, widgets.ManyToManyWidget)
+
+    @classmethod
+    def get_field_value(cls, field, instance):
+        """
+        Returns value of ``field`` for ``instance`` as it is recorded in a
+        snapshot.
+        """
+        if cls.is_m2m_field(field):
+            if instance.pk is None:
+                return set()
+            queryset = field.get_value(instance).all()
+            if queryset._result_cache is not None:
+                # the relation was prefetched
+                return {obj.pk for obj in queryset}
+            return set(queryset.values_list('pk', flat=True))
+        return field.get_value(instance)
+
+    def has_value(self, field):
+        return field.column_name in self.values
+
+    def get_value(self, field):
+        return self.values[field.column_name]
+
+    def is_changed(self, field, instance):
+        """
+        Returns ``True`` if the value of ``field`` of ``instance`` differs
+        from the recorded one.
+        """
+        return self.get_value(field) != self.get_field_value(field, instance)
+
+
 class Resource(metaclass=DeclarativeMetaclass):
     """
     Resource defines how objects are mapped to their import and export
@@ -201,6 +583,26 @@ class Resource(metaclass=DeclarativeMetaclass):
         # cls.fields.
         self.fields = deepcopy(self.fields)
 
+        # Instances collected for bulk operations, see ``use_bulk``.
+        self.create_instances = []
+        self.update_instances = []
+        self.delete_instances = []
+        self.bulk_pending = []
+
+        # Import-scoped state shared by fields, see ``Field.before_import``.
+        self.import_cache = {}
+
+        # Results of the rows written by the next bulk operations, which
+        # are only final once their batch has been written.
+        self.bulk_row_results = []
+
+        # Fingerprints of imported rows, see ``use_fingerprints``.
+        self.fingerprints = None
+
+        # Compiled by get_import_plan() and get_export_plan().
+        self.import_plan = None
+        self.export_plan = None
+
     @classmethod
     def get_result_class(self):
         """
@@ -229,6 +631,13 @@ class Resource(metaclass=DeclarativeMetaclass):
         """
         return Diff
 
+    @classmethod
+    def get_parallel_import_class(self):
+        """
+        Returns the class used to import a dataset with several workers.
+        """
+        return ParallelImport
+
     def get_use_transactions(self):
         if self._meta.use_transactions is None:
             return USE_TRANSACTIONS
@@ -304,10 +713,17 @@ class Resource(metaclass=DeclarativeMetaclass):
         Takes care of saving the object to the database.
 
         Keep in mind that this is done by calling ``instance.save()``, so
-        objects are not created in bulk!
+        objects are not created in bulk unless ``use_bulk`` is enabled. In
+        that case the instance is only collected here and written later by
+        :meth:`~import_export.resources.Resource.save_bulk`.
         """
         self.before_save_instance(instance, using_transactions, dry_run)
-        if not using_transactions and dry_run:
+        if self._meta.use_bulk:
+            if instance._state.adding:
+                self.create_instances.append(instance)
+            else:
+                self.update_instances.append(instance)
+        elif not using_transactions and dry_run:
             # we don't have transactions and we want to do a dry_run
             pass
         else:
@@ -329,9 +745,14 @@ class Resource(metaclass=DeclarativeMetaclass):
     def delete_instance(self, instance, using_transactions=True, dry_run=False):
         """
         Calls :meth:`instance.delete` as long as ``dry_run`` is not set.
+
+        If ``use_bulk`` is enabled, the instance is collected and deleted
+        together with the rest of its batch.
         """
         self.before_delete_instance(instance, dry_run)
-        if not using_transactions and dry_run:
+        if self._meta.use_bulk:
+            self.delete_instances.append(instance)
+        elif not using_transactions and dry_run:
             # we don't have transactions and we want to do a dry_run
             pass
         else:
@@ -350,6 +771,143 @@ class Resource(metaclass=DeclarativeMetaclass):
         """
         pass
 
+    def get_bulk_update_fields(self):
+        """
+        Returns names of the model fields written by ``bulk_update()``.
+
+        Defaults to the concrete, non primary key model fields set by the
+        import fields, so that columns changed in the database since an
+        instance was loaded, e.g. ``numchild`` of a treebeard node, are not
+        written back. Override to add fields which are set elsewhere, e.g.
+        in ``before_save_instance()``.
+        """
+        opts = self._meta.model._meta
+        names = []
+        for field in self.get_import_plan().fields:
+            if field.readonly or not field.attribute or '__' in field.attribute:
+                continue
+            try:
+                model_field = opts.get_field(field.attribute)
+            except FieldDoesNotExist:
+                continue
+            if (model_field.concrete and not model_field.primary_key and
+                    not model_field.many_to_many and model_field.name not in names):
+                names.append(model_field.name)
+        return names
+
+    def bulk_create(self, using_transactions, dry_run, batch_size=None):
+        """
+        Creates collected instances by calling ``bulk_create()``.
+
+        Databases which do not return the primary keys of rows inserted in
+        bulk, e.g. SQLite and MySQL, would leave the instances without
+        primary key, so that their many-to-many fields and the values
+        written by fields could not be saved. The instances are saved one
+        by one there.
+        """
+        if self.create_instances and not (not using_transactions and dry_run):
+            manager = self._meta.model.objects
+            if connections[manager.db].features.can_return_ids_from_bulk_insert:
+                manager.bulk_create(self.create_instances, batch_size=batch_size)
+            else:
+                for instance in self.create_instances:
+                    instance.save()
+        self.create_instances = []
+
+    def bulk_update(self, using_transactions, dry_run, batch_size=None):
+        """
+        Updates the fields returned by :meth:`get_bulk_update_fields` of
+        collected instances by calling ``bulk_update()``.
+
+        ``bulk_update()`` is only available since Django 2.2, on older
+        versions instances are saved one by one.
+        """
+        if self.update_instances and not (not using_transactions and dry_run):
+            # if the same object was imported several times the last row wins
+            instances = list(OrderedDict(
+                (instance.pk, instance) for instance in self.update_instances
+            ).values())
+            update_fields = self.get_bulk_update_fields()
+            queryset = self._meta.model.objects.all()
+            if not update_fields:
+                # only values written by fields have changed
+                pass
+            elif hasattr(queryset, 'bulk_update'):
+                queryset.bulk_update(instances, update_fields, batch_size=batch_size)
+            else:
+                for instance in instances:
+                    instance.save(update_fields=update_fields)
+        self.update_instances = []
+
+    def bulk_delete(self, using_transactions, dry_run):
+        """
+        Deletes collected instances with a single ``delete()`` query.
+        """
+        if self.delete_instances and not (not using_transactions and dry_run):
+            pks = [instance.pk for instance in self.delete_instances]
+            self._meta.model.objects.filter(pk__in=pks).delete()
+        self.delete_instances = []
+
+    def save_bulk(self, result, using_transactions, dry_run, raise_errors):
+        """
+        Writes all instances collected since the last call to the database
+        and saves many-to-many fields of created and updated instances.
+
+        Errors are reported as base errors of ``result`` because they can
+        not be attributed to a single row. The rows of the batch, which
+        were not written, are reported as errors as well. Rows whose new
+        instance is still not saved afterwards, e.g. because ``bulk_create``
+        was overridden, are reported as errors, because the values which
+        fields collected for it are dropped.
+        """
+        pending = self.bulk_pending
+        self.bulk_pending = []
+        row_results = self.bulk_row_results
+        self.bulk_row_results = []
+        unsaved = []
+        try:
+            with atomic_if_using_transaction(using_transactions):
+                batch_size = self._meta.batch_size
+                self.bulk_create(using_transactions, dry_run, batch_size)
+                self.bulk_update(using_transactions, dry_run, batch_size)
+                self.bulk_delete(using_transactions, dry_run)
+                for instance, row, row_result in pending:
+                    if instance.pk is None and not (not using_transactions and dry_run):
+                        unsaved.append(row_result)
+                        continue
+                    self.save_m2m(instance, row, using_transactions, dry_run)
+                    row_result.object_id = instance.pk
+                for field in self.get_import_plan().fields:
+                    field.flush()
+            for row_result in unsaved:
+                error = self.get_error_result_class()(ValueError(
+                    '"{}" was not saved, its values were dropped'.format(row_result.object_repr)))
+                result.totals[row_result.import_type] -= 1
+                row_result.import_type = RowResult.IMPORT_TYPE_ERROR
+                row_result.errors.append(error)
+                result.increment_row_result_total(row_result)
+            if self.fingerprints is not None and not dry_run:
+                for row_result in row_results:
+                    if row_result.import_id is not None:
+                        self.save_fingerprint(row_result)
+        except Exception as e:
+            self.create_instances = []
+            self.update_instances = []
+            self.delete_instances = []
+            logger.debug(e, exc_info=e)
+            tb_info = traceback.format_exc()
+            error = self.get_error_result_class()(e, tb_info)
+            result.append_base_error(error)
+            for row_result in row_results:
+                result.totals[row_result.import_type] -= 1
+                row_result.import_type = RowResult.IMPORT_TYPE_ERROR
+                row_result.errors.append(error)
+                result.increment_row_result_total(row_result)
+            if raise_errors:
+                raise
+        if unsaved and raise_errors:
+            raise unsaved[0].errors[-1].error
+
     def import_field(self, field, obj, data, is_m2m=False):
         """
         Calls :meth:`import_export.fields.Field.save` if ``Field.attribute``
@@ -361,6 +919,15 @@ class Resource(metaclass=DeclarativeMetaclass):
     def get_import_fields(self):
         return self.get_fields()
 
+    def get_import_plan(self):
+        """
+        Returns the :class:`ImportPlan` of the import fields, which is
+        compiled on first use and again whenever a dataset is imported.
+        """
+        if self.import_plan is None:
+            self.import_plan = ImportPlan(self)
+        return self.import_plan
+
     def import_obj(self, obj, data, dry_run):
         """
         Traverses every field in this Resource and calls
@@ -369,11 +936,12 @@ class Resource(metaclass=DeclarativeMetaclass):
         one of more fields, those errors are captured and reraised as a single,
         multi-field ValidationError."""
         errors = {}
-        for field in self.get_import_fields():
-            if isinstance(field.widget, widgets.ManyToManyWidget):
-                continue
+        for field, setter in self.get_import_plan().instance_fields:
             try:
-                self.import_field(field, obj, data)
+                if setter is None:
+                    self.import_field(field, obj, data)
+                elif field.column_name in data:
+                    setter(obj, data)
             except ValueError as e:
                 errors[field.attribute] = ValidationError(
                     force_text(e), code="invalid")
@@ -391,9 +959,7 @@ class Resource(metaclass=DeclarativeMetaclass):
             # we don't have transactions and we want to do a dry_run
             pass
         else:
-            for field in self.get_import_fields():
-                if not isinstance(field.widget, widgets.ManyToManyWidget):
-                    continue
+            for field in self.get_import_plan().m2m_fields:
                 self.import_field(field, obj, data, True)
 
     def save_custom_fields(self, obj, data, using_transactions, dry_run):
@@ -401,9 +967,7 @@ class Resource(metaclass=DeclarativeMetaclass):
             # we don't have transactions and we want to do a dry_run
             pass
         else:
-            for field in self.get_import_fields():
-                if not isinstance(field, (PriceField, AttributeField, ParentField)):
-                    continue
+            for field in self.get_import_plan().custom_fields:
                 field.save(obj, data)
 
     def for_delete(self, row, instance):
@@ -415,10 +979,55 @@ class Resource(metaclass=DeclarativeMetaclass):
         """
         return False
 
+    def get_row_import_id(self, row):
+        """
+        Returns hash of the cleaned ``import_id_fields`` values of ``row``
+        under which its fingerprint is stored, or ``None`` if any of them is
+        empty. Values are rendered by the widgets of their fields, so that
+        e.g. a foreign key is identified by its lookup field rather than by
+        the text of the related object.
+        """
+        id_fields = [self.fields[f] for f in self.get_import_id_fields()]
+        values = [field.clean(row) for field in id_fields]
+        if any(value in (None, '') for value in values):
+            return None
+        data = json.dumps([force_text(field.widget.render(value))
+                           for field, value in zip(id_fields, values)])
+        return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+    def get_row_fingerprint(self, row):
+        """
+        Returns hash of the values of ``row`` and of the names of the import
+        fields, so that it changes when either of them does.
+        """
+        data = json.dumps([
+            self.get_import_plan().column_names,
+            sorted(row.items()),
+        ], default=str)
+        return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+    def get_snapshot(self, instance):
+        """
+        Returns :class:`InstanceSnapshot` of ``instance`` which is passed to
+        ``skip_row`` as ``original``.
+        """
+        return InstanceSnapshot(self, instance)
+
+    def needs_snapshot(self):
+        """
+        Returns ``True`` if ``skip_row`` needs a snapshot of the instance,
+        i.e. if ``skip_unchanged`` is set or ``skip_row`` is overridden.
+        """
+        return (self._meta.skip_unchanged or
+                type(self).skip_row is not Resource.skip_row)
+
     def skip_row(self, instance, original):
         """
         Returns ``True`` if ``row`` importing should be skipped.
 
+        ``original`` is an :class:`InstanceSnapshot` of the import field
+        values of ``instance`` taken before the row was imported.
+
         Default implementation returns ``False`` unless skip_unchanged == True.
         Override this method to handle skipping rows meeting certain
         conditions.
@@ -433,15 +1042,9 @@ class Resource(metaclass=DeclarativeMetaclass):
         """
         if not self._meta.skip_unchanged:
             return False
-        for field in self.get_import_fields():
-            try:
-                # For fields that are models.fields.related.ManyRelatedManager
-                # we need to compare the results
-                if list(field.get_value(instance).all()) != list(field.get_value(original).all()):
-                    return False
-            except AttributeError:
-                if field.get_value(instance) != field.get_value(original):
-                    return False
+        for field in self.get_import_plan().fields:
+            if original.has_value(field) and original.is_changed(field, instance):
+                return False
         return True
 
     def get_diff_headers(self):
@@ -480,7 +1083,8 @@ class Resource(metaclass=DeclarativeMetaclass):
         """
         pass
 
-    def import_row(self, row, instance_loader, using_transactions=True, dry_run=False, row_number=None, **kwargs):
+    def import_row(self, row, instance_loader, using_transactions=True, dry_run=False, row_number=None,
+                   collect_diff=True, **kwargs):
         """
         Imports data from ``tablib.Dataset``. Refer to :doc:`import_workflow`
         for a more complete description of the whole import process.
@@ -494,10 +1098,24 @@ class Resource(metaclass=DeclarativeMetaclass):
 
         :param dry_run: If ``dry_run`` is set, or error occurs, transaction
             will be rolled back.
+
+        :param collect_diff: If ``collect_diff`` is not set, no diff of the
+            instance is made and ``row_result.diff`` is ``None``.
         """
         row_result = self.get_row_result_class()()
+        row_result.number = row_number
         try:
             self.before_import_row(row, **kwargs)
+            import_id = None
+            if self.fingerprints is not None:
+                import_id = self.get_row_import_id(row)
+            if import_id is not None:
+                fingerprint = self.get_row_fingerprint(row)
+                if self.fingerprints.get(import_id) == fingerprint:
+                    # the row did not change since it was last imported
+                    row_result.import_type = RowResult.IMPORT_TYPE_SKIP
+                    self.after_import_row(row, row_result, **kwargs)
+                    return row_result
             instance, new = self.get_or_init_instance(instance_loader, row)
             self.after_import_instance(instance, new, **kwargs)
             if new:
@@ -505,15 +1123,16 @@ class Resource(metaclass=DeclarativeMetaclass):
             else:
                 row_result.import_type = RowResult.IMPORT_TYPE_UPDATE
             row_result.new_record = new
-            original = deepcopy(instance)
-            diff = self.get_diff_class()(self, original, new)
+            original = self.get_snapshot(instance) if self.needs_snapshot() else None
+            # the instance is not changed until import_obj()
+            diff = self.get_diff_class()(self, instance, new) if collect_diff else None
             if self.for_delete(row, instance):
                 if new:
                     row_result.import_type = RowResult.IMPORT_TYPE_SKIP
-                    diff.compare_with(self, None, dry_run)
                 else:
                     row_result.import_type = RowResult.IMPORT_TYPE_DELETE
                     self.delete_instance(instance, using_transactions, dry_run)
+                if diff is not None:
                     diff.compare_with(self, None, dry_run)
             else:
                 import_validation_errors = {}
@@ -529,13 +1148,24 @@ class Resource(metaclass=DeclarativeMetaclass):
                 else:
                     self.validate_instance(instance, import_validation_errors)
                     self.save_instance(instance, using_transactions, dry_run)
-                    self.save_m2m(instance, row, using_transactions, dry_run)
+                    if self._meta.use_bulk:
+                        # m2m fields need a primary key, see save_bulk()
+                        self.bulk_pending.append((instance, row, row_result))
+                    else:
+                        self.save_m2m(instance, row, using_transactions, dry_run)
                     # Add object info to RowResult for LogEntry
                     row_result.object_id = instance.pk
                     row_result.object_repr = force_text(instance)
-                diff.compare_with(self, instance, dry_run)
+                if diff is not None:
+                    diff.compare_with(self, instance, dry_run)
 
-            row_result.diff = diff.as_html()
+            if import_id is not None:
+                # saved once the row is no longer rolled back with its batch
+                row_result.import_id = import_id
+                row_result.fingerprint = fingerprint
+
+            # rendered to HTML when row_result.diff is read
+            row_result.diff = diff
             self.after_import_row(row, row_result, **kwargs)
 
         except ValidationError as e:
@@ -557,12 +1187,15 @@ class Resource(metaclass=DeclarativeMetaclass):
         return row_result
 
     def import_data(self, dataset, dry_run=False, raise_errors=False,
-                    use_transactions=None, collect_failed_rows=False, **kwargs):
+                    use_transactions=None, collect_failed_rows=False,
+                    instance_loader=None, progress_callback=None, collect_diff=True,
+                    workers=None, **kwargs):
         """
         Imports data from ``tablib.Dataset``. Refer to :doc:`import_workflow`
         for a more complete description of the whole import process.
 
-        :param dataset: A ``tablib.Dataset``
+        :param dataset: A ``tablib.Dataset`` or a
+            :class:`~import_export.streams.RowStream` which is read row by row
 
         :param raise_errors: Whether errors should be printed to the end user
             or raised regularly.
@@ -575,6 +1208,22 @@ class Resource(metaclass=DeclarativeMetaclass):
 
         :param dry_run: If ``dry_run`` is set, or an error occurs, if a transaction
             is being used, it will be rolled back.
+
+        :param instance_loader: Instance loader to use instead of the one
+            created from ``instance_loader_class``, e.g. a
+            :class:`~import_export.instance_loaders.ResolvedInstanceLoader`.
+
+        :param progress_callback: Callable which is called with the result
+            and the number of the row after every imported row.
+
+        :param collect_diff: If ``False``, rows are imported without making
+            a diff of the instances, which is only needed to show the rows.
+
+        :param workers: If greater than 1, the dataset is partitioned by
+            import id and imported by this number of worker processes, see
+            :class:`~import_export.parallel.ParallelImport`. The
+            ``instance_loader`` and ``progress_callback`` arguments are not
+            used then.
         """
 
         if use_transactions is None:
@@ -588,19 +1237,101 @@ class Resource(metaclass=DeclarativeMetaclass):
 
         using_transactions = (use_transactions or dry_run) and supports_transactions
 
+        if workers is not None and workers > 1:
+            parallel_import = self.get_parallel_import_class()(self, workers)
+            return parallel_import.import_data(dataset, dry_run, raise_errors, using_transactions,
+                                               collect_failed_rows, collect_diff=collect_diff,
+                                               **kwargs)
+
         with atomic_if_using_transaction(using_transactions):
-            return self.import_data_inner(dataset, dry_run, raise_errors, using_transactions, collect_failed_rows, **kwargs)
+            return self.import_data_inner(dataset, dry_run, raise_errors, using_transactions, collect_failed_rows,
+                                          instance_loader=instance_loader,
+                                          progress_callback=progress_callback,
+                                          collect_diff=collect_diff, **kwargs)
+
+    def import_rows(self, dataset, instance_loader, using_transactions, dry_run, **kwargs):
+        """
+        Imports the rows of ``dataset`` and yields tuples of row number, row
+        and ``RowResult``.
+
+        Every row is imported under its own savepoint, or under a savepoint
+        per batch of rows if ``savepoint_batch_size`` is set. A batch in
+        which a row fails is rolled back and imported again row by row,
+        after ``import_cache`` has been cleared and ``before_import()`` of
+        the fields has been called again.
+        """
+        batch_size = self._meta.savepoint_batch_size
+        if not batch_size or not using_transactions or self._meta.use_bulk:
+            for i, row in enumerate(dataset.dict, 1):
+                with atomic_if_using_transaction(using_transactions):
+                    row_result = self.import_row(row, instance_loader,
+                                                 using_transactions=using_transactions,
+                                                 dry_run=dry_run, row_number=i, **kwargs)
+                yield i, row, row_result
+            return
+
+        for batch in chunked(enumerate(dataset.dict, 1), batch_size):
+            row_results = self.import_batch(batch, instance_loader, dry_run, **kwargs)
+            if row_results is None:
+                # instances and import-scoped state loaded or collected by
+                # the rolled back batch are stale
+                instance_loader.clear_cache([row for i, row in batch])
+                self.import_cache = {}
+                for field in self.import_plan.fields:
+                    field.before_import(self)
+                row_results = []
+                for i, row in batch:
+                    with atomic():
+                        row_results.append(self.import_row(row, instance_loader,
+                                                           using_transactions=True,
+                                                           dry_run=dry_run, row_number=i,
+                                                           **kwargs))
+            for (i, row), row_result in zip(batch, row_results):
+                yield i, row, row_result
+
+    def import_batch(self, batch, instance_loader, dry_run, **kwargs):
+        """
+        Imports ``batch``, a list of row numbers and rows, under a single
+        savepoint.
+
+        Returns the list of ``RowResult`` of the rows, or ``None`` if a row
+        has failed and the batch was rolled back.
+        """
+        row_results = []
+        with atomic():
+            for i, row in batch:
+                row_result = self.import_row(row, instance_loader, using_transactions=True,
+                                             dry_run=dry_run, row_number=i, **kwargs)
+                if row_result.errors:
+                    set_rollback(True)
+                    return None
+                row_results.append(row_result)
+        return row_results
+
+    def save_fingerprint(self, row_result):
+        """
+        Records the fingerprint of a successfully imported row.
+        """
+        if row_result.errors or row_result.validation_error:
+            return
+        if row_result.import_type == RowResult.IMPORT_TYPE_DELETE:
+            self.fingerprints.delete(row_result.import_id)
+        else:
+            self.fingerprints.set(row_result.import_id, row_result.fingerprint)
 
-    def import_data_inner(self, dataset, dry_run, raise_errors, using_transactions, collect_failed_rows, **kwargs):
+    def import_data_inner(self, dataset, dry_run, raise_errors, using_transactions, collect_failed_rows,
+                          instance_loader=None, progress_callback=None, collect_diff=True, **kwargs):
         result = self.get_result_class()()
         result.diff_headers = self.get_diff_headers()
-        result.total_rows = len(dataset)
+        if not isinstance(dataset, RowStream):
+            result.total_rows = len(dataset)
 
         if using_transactions:
             # when transactions are used we want to create/update/delete object
             # as transaction will be rolled back if dry_run is set
             sp1 = savepoint()
 
+        self.import_cache = {}
         try:
             with atomic_if_using_transaction(using_transactions):
                 self.before_import(dataset, using_transactions, dry_run, **kwargs)
@@ -611,24 +1342,41 @@ class Resource(metaclass=DeclarativeMetaclass):
             if raise_errors:
                 raise
 
-        instance_loader = self._meta.instance_loader_class(self, dataset)
+        try:
+            with atomic_if_using_transaction(using_transactions):
+                # fields may have been changed since the last import
+                self.import_plan = ImportPlan(self)
+                for field in self.import_plan.fields:
+                    field.before_import(self)
+        except Exception as e:
+            logger.debug(e, exc_info=e)
+            tb_info = traceback.format_exc()
+            result.append_base_error(self.get_error_result_class()(e, tb_info))
+            if raise_errors:
+                raise
+            # rows are not imported without the import-scoped state of fields
+            self.import_cache = {}
+            if using_transactions:
+                savepoint_rollback(sp1)
+            return result
+
+        if instance_loader is None:
+            instance_loader = self._meta.instance_loader_class(self, dataset)
 
         # Update the total in case the dataset was altered by before_import()
-        result.total_rows = len(dataset)
+        if not isinstance(dataset, RowStream):
+            result.total_rows = len(dataset)
 
         if collect_failed_rows:
             result.add_dataset_headers(dataset.headers)
 
-        for i, row in enumerate(dataset.dict, 1):
-            with atomic_if_using_transaction(using_transactions):
-                row_result = self.import_row(
-                    row,
-                    instance_loader,
-                    using_transactions=using_transactions,
-                    dry_run=dry_run,
-                    row_number=i,
-                    **kwargs
-                )
+        self.fingerprints = None
+        if self._meta.use_fingerprints:
+            self.fingerprints = FingerprintStore(self, dataset)
+
+        rows = self.import_rows(dataset, instance_loader, using_transactions, dry_run,
+                                collect_diff=collect_diff, **kwargs)
+        for i, row, row_result in rows:
             result.increment_row_result_total(row_result)
 
             if row_result.errors:
@@ -646,15 +1394,54 @@ class Resource(metaclass=DeclarativeMetaclass):
                     self._meta.report_skipped):
                 result.append_row_result(row_result)
 
-        try:
-            with atomic_if_using_transaction(using_transactions):
-                self.after_import(dataset, result, using_transactions, dry_run, **kwargs)
-        except Exception as e:
-            logger.debug(e, exc_info=e)
-            tb_info = traceback.format_exc()
-            result.append_base_error(self.get_error_result_class()(e, tb_info))
-            if raise_errors:
-                raise
+            if self._meta.use_bulk and row_result.import_type in (RowResult.IMPORT_TYPE_NEW,
+                                                                  RowResult.IMPORT_TYPE_UPDATE,
+                                                                  RowResult.IMPORT_TYPE_DELETE):
+                # final once the batch of the row has been written
+                self.bulk_row_results.append(row_result)
+            elif row_result.import_id is not None and not dry_run:
+                self.save_fingerprint(row_result)
+
+            if self._meta.use_bulk:
+                collected = (len(self.create_instances) +
+                             len(self.update_instances) +
+                             len(self.delete_instances))
+                if collected >= self._meta.batch_size:
+                    self.save_bulk(result, using_transactions, dry_run, raise_errors)
+
+            if progress_callback is not None:
+                progress_callback(result, i)
+
+        if self._meta.use_bulk:
+            self.save_bulk(result, using_transactions, dry_run, raise_errors)
+
+        if isinstance(dataset, RowStream):
+            # the length of a row stream is known once it has been read
+            result.total_rows = dataset.count
+
+        # a failing hook does not keep the others from running
+        hooks = [field.after_import for field in self.import_plan.fields]
+        hooks.append(functools.partial(self.after_import, dataset, result,
+                                       using_transactions, dry_run, **kwargs))
+        for hook in hooks:
+            try:
+                with atomic_if_using_transaction(using_transactions):
+                    hook()
+            except Exception as e:
+                logger.debug(e, exc_info=e)
+                tb_info = traceback.format_exc()
+                result.append_base_error(self.get_error_result_class()(e, tb_info))
+                if raise_errors:
+                    raise
+
+        self.import_cache = {}
+
+        if self.fingerprints is not None:
+            # rows which failed must not be skipped as unchanged next time,
+            # written under the savepoint of the import when it is committed
+            if not dry_run and not result.has_errors():
+                self.fingerprints.flush()
+            self.fingerprints = None
 
         if using_transactions:
             if dry_run or result.has_errors():
@@ -690,8 +1477,17 @@ class Resource(metaclass=DeclarativeMetaclass):
     def get_export_fields(self):
         return self.get_fields()
 
+    def get_export_plan(self):
+        """
+        Returns the :class:`ExportPlan` of the export fields, which is
+        compiled on first use and again whenever an export starts.
+        """
+        if self.export_plan is None:
+            self.export_plan = ExportPlan(self)
+        return self.export_plan
+
     def export_resource(self, obj):
-        return [self.export_field(field, obj) for field in self.get_export_fields()]
+        return self.get_export_plan().export(obj)
 
     def get_export_headers(self):
         headers = [
@@ -701,6 +1497,117 @@ class Resource(metaclass=DeclarativeMetaclass):
     def get_user_visible_fields(self):
         return self.get_fields()
 
+    def get_export_prefetch_lookups(self):
+        """
+        Returns lookups prefetched for each chunk of exported objects,
+        collected from ``prefetch_lookups`` of export fields.
+        """
+        lookups = []
+        for field in self.get_export_fields():
+            for lookup in field.prefetch_lookups:
+                if lookup not in lookups:
+                    lookups.append(lookup)
+        return lookups
+
+    def get_export_select_related(self):
+        """
+        Returns relations selected together with the exported objects.
+        None by default.
+        """
+        return []
+
+    def iter_export_objects(self, queryset):
+        """
+        Yields the objects of ``queryset`` to export, selecting the export
+        select related relations and prefetching the export prefetch
+        lookups for each chunk of objects.
+        """
+        if isinstance(queryset, QuerySet):
+            select_related = self.get_export_select_related()
+            if (select_related and not queryset.query.combinator and
+                    issubclass(queryset._iterable_class, ModelIterable)):
+                queryset = queryset.select_related(*select_related)
+            if self._meta.export_keyset_pagination and self.can_paginate_by_pk(queryset):
+                chunks = self.iter_export_pages(queryset)
+            else:
+                # Iterate without the queryset cache, to avoid wasting memory
+                # when exporting large datasets.
+                chunks = chunked(queryset.iterator(), self._meta.export_chunk_size)
+        else:
+            chunks = chunked(queryset, self._meta.export_chunk_size)
+        prefetch_lookups = self.get_export_prefetch_lookups()
+        for chunk in chunks:
+            if prefetch_lookups:
+                prefetch_related_objects(chunk, *prefetch_lookups)
+            yield from chunk
+
+    @staticmethod
+    def can_paginate_by_pk(queryset):
+        """
+        Returns ``True`` if ``queryset`` can be read in primary key pages
+        without changing the objects or their order.
+        """
+        query = queryset.query
+        if (query.combinator or query.low_mark or query.high_mark is not None or
+                not issubclass(queryset._iterable_class, ModelIterable)):
+            return False
+        pk_names = ('pk', queryset.model._meta.pk.name)
+        ordering = tuple(query.order_by)
+        if not ordering:
+            # unordered, unless ordered by the default ordering of the model
+            return not (query.default_ordering and queryset.model._meta.ordering)
+        return (len(ordering) == 1 and isinstance(ordering[0], str) and
+                ordering[0].lstrip('-') in pk_names)
+
+    def iter_export_pages(self, queryset, value_paths=None):
+        """
+        Yields lists of up to ``export_chunk_size`` objects of ``queryset``,
+        each read by a query which starts after the primary key of the last
+        object of the previous page.
+
+        If ``value_paths`` is given, the pages are lists of tuples of the
+        values of ``value_paths`` followed by the primary key, read with
+        ``values_list()``.
+        """
+        ordering = tuple(queryset.query.order_by)
+        descending = bool(ordering) and ordering[0].startswith('-')
+        queryset = queryset.order_by('-pk' if descending else 'pk')
+        lookup = 'pk__lt' if descending else 'pk__gt'
+        if value_paths is None:
+            get_pk = attrgetter('pk')
+        else:
+            queryset = queryset.values_list(*value_paths, 'pk')
+            get_pk = itemgetter(-1)
+        page_size = self._meta.export_chunk_size
+        page = list(queryset[:page_size])
+        while page:
+            yield page
+            if len(page) < page_size:
+                break
+            page = list(queryset.filter(**{lookup: get_pk(page[-1])})[:page_size])
+
+    def iter_export_rows(self, queryset):
+        """
+        Yields the exported rows of ``queryset``.
+
+        When the export plan allows it, the rows are read with
+        ``values_list()`` and no objects are loaded, see
+        :class:`ExportPlan`. The values are read in pages as well when
+        ``export_keyset_pagination`` is enabled.
+        """
+        plan = self.get_export_plan()
+        if (type(self).export_resource is Resource.export_resource and
+                type(self).iter_export_objects is Resource.iter_export_objects and
+                plan.can_export_values(queryset)):
+            if self._meta.export_keyset_pagination and self.can_paginate_by_pk(queryset):
+                for page in self.iter_export_pages(queryset, plan.value_paths):
+                    yield from plan.render_values(page)
+            else:
+                yield from plan.export_values(queryset)
+            return
+        for obj in self.iter_export_objects(queryset):
+            yield self.export_resource(obj)
+
     def export(self, queryset=None, *args, **kwargs):
         """
         Exports a resource.
@@ -712,20 +1619,33 @@ class Resource(metaclass=DeclarativeMetaclass):
             queryset = self.get_queryset()
         headers = self.get_export_headers()
         data = tablib.Dataset(headers=headers)
+        # fields may have been changed since the last export
+        self.export_plan = ExportPlan(self)
 
-        if isinstance(queryset, QuerySet):
-            # Iterate without the queryset cache, to avoid wasting memory when
-            # exporting large datasets.
-            iterable = queryset.iterator()
-        else:
-            iterable = queryset
-        for obj in iterable:
-            data.append(self.export_resource(obj))
+        for row in self.iter_export_rows(queryset):
+            data.append(row)
 
         self.after_export(queryset, data, *args, **kwargs)
 
         return data
 
+    def export_iter(self, queryset=None, *args, **kwargs):
+        """
+        Exports a resource as a generator of rows, headers are returned
+        by :meth:`~import_export.resources.Resource.get_export_headers`.
+
+        No ``tablib.Dataset`` is built, so memory usage does not grow with
+        the number of exported objects and
+        :meth:`~import_export.resources.Resource.after_export` is not called.
+        """
+        self.before_export(queryset, *args, **kwargs)
+
+        if queryset is None:
+            queryset = self.get_queryset()
+        self.export_plan = ExportPlan(self)
+
+        yield from self.iter_export_rows(queryset)
+
 
 class ModelDeclarativeMetaclass(DeclarativeMetaclass):
 
@@ -928,6 +1848,85 @@ class ModelResource(Resource, metaclass=ModelDeclarativeMetaclass):
         """
         return self._meta.model()
 
+    def get_related_export_fields(self):
+        """
+        Returns the export fields which are exported by following their
+        ``attribute`` with ``Field.get_value``, i.e. which neither have a
+        dehydrate method nor override ``get_value``.
+        """
+        field_names = {}
+        for name, field in self.fields.items():
+            field_names.setdefault(field, name)
+        return [
+            field for field in self.get_export_fields()
+            if field in field_names and field.attribute and
+            type(field).get_value is Field.get_value and
+            not hasattr(self, 'dehydrate_%s' % field_names[field])
+        ]
+
+    @staticmethod
+    def get_relation_lookup(model, attrs):
+        """
+        Returns the lookup of the forward foreign key and one-to-one
+        relations at the start of ``attrs`` and the model it leads to.
+        """
+        lookup = []
+        for attr in attrs:
+            try:
+                model_field = model._meta.get_field(attr)
+            except FieldDoesNotExist:
+                break
+            if not (model_field.concrete and (model_field.many_to_one or model_field.one_to_one)):
+                break
+            lookup.append(attr)
+            model = model_field.related_model
+        return '__'.join(lookup), model
+
+    def get_export_select_related(self):
+        """
+        Returns the foreign key and one-to-one relations followed by the
+        export fields and their ``ForeignKeyWidget``, which are selected
+        together with the exported objects.
+        """
+        lookups = []
+        for field in self.get_related_export_fields():
+            if isinstance(field.widget, widgets.ManyToManyWidget):
+                continue
+            attrs = field.attribute.split('__')
+            if isinstance(field.widget, widgets.ForeignKeyWidget):
+                attrs += field.widget.field.split('__')
+            lookup, model = self.get_relation_lookup(self._meta.model, attrs)
+            if lookup and lookup not in lookups:
+                lookups.append(lookup)
+        return lookups
+
+    def get_export_prefetch_lookups(self):
+        """
+        Adds the many-to-many relations of export fields with a
+        ``ManyToManyWidget``, and the relations followed by the ``field``
+        of the widget, to the lookups of the export fields.
+        """
+        lookups = super().get_export_prefetch_lookups()
+        for field in self.get_related_export_fields():
+            if not isinstance(field.widget, widgets.ManyToManyWidget):
+                continue
+            attrs = field.attribute.split('__')
+            lookup, model = self.get_relation_lookup(self._meta.model, attrs[:-1])
+            if lookup != '__'.join(attrs[:-1]):
+                continue
+            try:
+                model_field = model._meta.get_field(attrs[-1])
+            except FieldDoesNotExist:
+                continue
+            if not model_field.many_to_many or not model_field.concrete:
+                continue
+            widget_lookup, widget_model = self.get_relation_lookup(
+                model_field.related_model, field.widget.field.split('__'))
+            lookup = '__'.join(filter(None, [field.attribute, widget_lookup]))
+            if lookup not in lookups:
+                lookups.append(lookup)
+        return lookups
+
     def after_import(self, dataset, result, using_transactions, dry_run, **kwargs):
         """
         Reset the SQL sequences after new objects are imported
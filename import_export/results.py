@@ -32,6 +32,25 @@ class RowResult:
         self.diff = None
         self.import_type = None
         self.raw_values = {}
+        # number of the row in the dataset, starting from 1
+        self.number = None
+        # import id and fingerprint of the row, see ``use_fingerprints``
+        self.import_id = None
+        self.fingerprint = None
+
+    @property
+    def diff(self):
+        """
+        List of HTML diffs of the exported fields, rendered from the
+        ``Diff`` of the row when it is first read.
+        """
+        if self._diff is not None and not isinstance(self._diff, list):
+            self._diff = self._diff.as_html()
+        return self._diff
+
+    @diff.setter
+    def diff(self, value):
+        self._diff = value
 
 
 class InvalidRow:
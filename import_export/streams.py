@@ -0,0 +1,129 @@
+from collections import OrderedDict, deque
+from itertools import islice
+
+
+class RowStream:
+    """
+    Rows of an imported file which are read lazily, one by one, instead of
+    being loaded into a ``tablib.Dataset`` at once.
+
+    A row stream can be passed to
+    :meth:`~import_export.resources.Resource.import_data` in place of a
+    dataset. It can only be read once and its length is not known before
+    it has been read, so ``before_import`` hooks can not alter it.
+
+    :param headers: A list of column names.
+
+    :param rows: An iterable of lists of row values.
+    """
+
+    def __init__(self, headers, rows):
+        self.headers = list(headers)
+        self.rows = iter(rows)
+        self.buffer = deque()
+        #: number of rows read so far
+        self.count = 0
+
+    def __iter__(self):
+        while True:
+            if self.buffer:
+                row = self.buffer.popleft()
+            else:
+                try:
+                    row = next(self.rows)
+                except StopIteration:
+                    return
+            self.count += 1
+            yield row
+
+    def to_dict(self, row):
+        return OrderedDict(zip(self.headers, row))
+
+    @property
+    def dict(self):
+        """
+        Returns iterator of rows as dictionaries keyed by headers.
+        """
+        return (self.to_dict(row) for row in self)
+
+    def peek(self, count):
+        """
+        Returns a list of at most ``count`` following rows as dictionaries
+        without consuming them.
+        """
+        while len(self.buffer) < count:
+            try:
+                self.buffer.append(next(self.rows))
+            except StopIteration:
+                break
+        return [self.to_dict(row) for row in islice(self.buffer, count)]
+
+
+class LookaheadCache:
+    """
+    Mixin for loaders which look up the rows of ``self.dataset`` in batches
+    while it is imported, used by
+    :class:`~import_export.instance_loaders.BatchedInstanceLoader` and
+    :class:`~import_export.fingerprints.FingerprintStore`.
+
+    A batch holds the key of the current row and the keys of the following
+    rows which are not cached yet, at most ``batch_size`` of them. Rows of
+    a ``Dataset`` are read ahead one by one, rows of a :class:`RowStream`
+    are peeked at. Loaded values are kept in ``cache``, which never holds
+    more than ``cache_size`` entries.
+    """
+    batch_size = 2000
+    cache_size = 10000
+
+    def init_cache(self):
+        self.cache = OrderedDict()
+        self.max_cache_size = max(self.cache_size, self.batch_size)
+        if self.dataset is not None and not isinstance(self.dataset, RowStream):
+            # rows are turned into dictionaries one by one, ``dataset.dict``
+            # would build a list of all of them
+            headers = self.dataset.headers
+            self.lookahead = (self.get_lookahead_key(OrderedDict(zip(headers, row)))
+                              for row in self.dataset)
+        else:
+            self.lookahead = iter(())
+
+    def get_row_key(self, row):
+        """
+        Returns tuple of the key of ``row`` and the data needed to load it,
+        or ``None`` if the row has no key.
+        """
+        raise NotImplementedError
+
+    def get_lookahead_key(self, row):
+        try:
+            return self.get_row_key(row)
+        except Exception:
+            # the error is reported when the row itself is imported
+            return None
+
+    def get_next_keys(self):
+        """
+        Returns iterator of the keys of the rows following the current one,
+        see ``get_row_key``.
+        """
+        if isinstance(self.dataset, RowStream):
+            return (self.get_lookahead_key(row)
+                    for row in self.dataset.peek(self.batch_size))
+        return self.lookahead
+
+    def get_batch(self, key, data=None):
+        """
+        Returns dictionary of the data of ``key`` and of the next keys in the
+        dataset which are not cached yet, by key.
+        """
+        batch = OrderedDict([(key, data)])
+        for next_key in self.get_next_keys():
+            if next_key is not None and next_key[0] not in self.cache:
+                batch.setdefault(*next_key)
+            if len(batch) >= self.batch_size:
+                break
+        return batch
+
+    def trim_cache(self):
+        while len(self.cache) > self.max_cache_size:
+            self.cache.popitem(last=False)
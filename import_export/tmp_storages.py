@@ -1,10 +1,13 @@
+import mmap
 import os
 import tempfile
+from io import BytesIO
 from uuid import uuid4
 
 from django.core.cache import cache
 from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
+from django.utils.encoding import force_bytes
 
 
 class BaseStorage:
@@ -18,6 +21,19 @@ class BaseStorage:
     def read(self, read_mode='r'):
         raise NotImplementedError
 
+    def save_chunks(self, chunks, mode='w'):
+        """
+        Saves data given as an iterable of byte chunks, e.g. ``chunks()``
+        of an uploaded file.
+        """
+        self.save(bytes().join(chunks), mode)
+
+    def open_stream(self):
+        """
+        Returns a binary file-like object reading the saved data.
+        """
+        return BytesIO(force_bytes(self.read('rb')))
+
     def remove(self):
         raise NotImplementedError
 
@@ -40,6 +56,22 @@ class TempFolderStorage(BaseStorage):
         with self.open(mode=mode) as file:
             return file.read()
 
+    def save_chunks(self, chunks, mode='w'):
+        with self.open(mode=mode) as file:
+            for chunk in chunks:
+                file.write(chunk)
+
+    def open_stream(self):
+        return open(self.get_full_path(), 'rb')
+
+    def open_mmap(self):
+        """
+        Returns a read-only memory map of the saved file, which lets the
+        data be accessed without reading the whole file into memory.
+        """
+        with open(self.get_full_path(), 'rb') as file:
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
     def remove(self):
         os.remove(self.get_full_path())
 
@@ -81,6 +113,9 @@ class MediaStorage(BaseStorage):
         with default_storage.open(self.get_full_path(), mode=read_mode) as f:
             return f.read()
 
+    def open_stream(self):
+        return default_storage.open(self.get_full_path(), mode='rb')
+
     def remove(self):
         default_storage.delete(self.get_full_path())
 
@@ -1,3 +1,5 @@
+from itertools import islice
+
 from django.db import transaction
 
 
@@ -23,3 +25,14 @@ class atomic_if_using_transaction:
     def __exit__(self, *args):
         if self.using_transactions:
             self.context_manager.__exit__(*args)
+
+
+def chunked(iterable, size):
+    """
+    Yields lists of at most ``size`` items from ``iterable``.
+    """
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
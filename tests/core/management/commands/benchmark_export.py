@@ -0,0 +1,79 @@
+import time
+from datetime import date
+from decimal import Decimal
+
+from core.models import Author, Book
+
+from django.core.management.base import BaseCommand
+
+from import_export import fields, resources
+
+
+class BookResource(resources.ModelResource):
+    full_title = fields.Field()
+
+    class Meta:
+        model = Book
+        fields = ('id', 'name', 'author', 'author_email', 'imported', 'published',
+                  'published_time', 'price', 'full_title')
+
+    def dehydrate_full_title(self, obj):
+        return '%s by %s' % (obj.name, obj.author.name)
+
+
+def get_resource_class(columns):
+    """
+    Returns a subclass of ``BookResource`` with ``columns`` fields.
+    """
+    attrs = {}
+    attributes = ['name', 'author__name', 'author_email', 'price', 'published']
+    for i in range(columns - len(BookResource.fields)):
+        attrs['extra_%s' % i] = fields.Field(attribute=attributes[i % len(attributes)])
+    return type('WideBookResource', (BookResource, ), attrs)
+
+
+def export_per_cell(resource, obj):
+    """
+    Exports ``obj`` the way ``export_resource`` did before the export plan,
+    looking up the name and dehydrate method of the field for every cell.
+    """
+    return [resource.export_field(field, obj) for field in resource.get_export_fields()]
+
+
+class Command(BaseCommand):
+    help = "Measures the per row cost of exporting an object."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000)
+        parser.add_argument('--columns', type=int, default=40)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        resource = get_resource_class(options['columns'])()
+        author = Author(name='Ian Fleming')
+        objects = [Book(id=i, name='Book %s' % i, author=author,
+                        author_email='author%s@example.com' % i,
+                        published=date(2019, 10, i % 28 + 1), price=Decimal('%s.25' % i))
+                   for i in range(options['rows'])]
+
+        def per_cell():
+            for obj in objects:
+                export_per_cell(resource, obj)
+
+        def plan():
+            resource.export_plan = None
+            for obj in objects:
+                resource.export_resource(obj)
+
+        for name, func in (('per cell', per_cell), ('export plan', plan)):
+            seconds = self.measure(func, options['repeat'])
+            self.stdout.write('%-12s %8.2f us/row' % (name, seconds / len(objects) * 1e6))
+
+    def measure(self, func, repeat):
+        best = None
+        for i in range(repeat):
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
@@ -0,0 +1,81 @@
+import time
+
+from core.models import Book
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand
+from django.utils.encoding import force_text
+
+from import_export import resources, widgets
+
+
+class BookResource(resources.ModelResource):
+
+    class Meta:
+        model = Book
+        fields = ('id', 'name', 'author_email', 'imported', 'published',
+                  'published_time', 'price', 'categories')
+
+
+def import_obj_per_field(resource, obj, data):
+    """
+    Sets the fields of ``obj`` the way ``import_obj`` did before the import
+    plan, looking up and checking the import fields for every row.
+    """
+    errors = {}
+    for field in resource.get_import_fields():
+        if isinstance(field.widget, widgets.ManyToManyWidget):
+            continue
+        try:
+            resource.import_field(field, obj, data)
+        except ValueError as e:
+            errors[field.attribute] = ValidationError(force_text(e), code="invalid")
+    if errors:
+        raise ValidationError(errors)
+
+
+class Command(BaseCommand):
+    help = "Measures the per row cost of setting the import fields of an instance."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        resource = BookResource()
+        rows = [{
+            'id': '',
+            'name': 'Book %s' % i,
+            'author_email': 'author%s@example.com' % i,
+            'imported': '1',
+            'published': '2019-10-%02d' % (i % 28 + 1),
+            'published_time': '12:%02d' % (i % 60),
+            'price': '%s.25' % i,
+            'categories': '',
+        } for i in range(options['rows'])]
+
+        def per_field():
+            for row in rows:
+                import_obj_per_field(resource, Book(), row)
+
+        def plan():
+            for row in rows:
+                resource.import_obj(Book(), row, False)
+
+        def instances_only():
+            for row in rows:
+                Book()
+
+        baseline = self.measure(instances_only, options['repeat'])
+        for name, func in (('per field', per_field), ('import plan', plan)):
+            seconds = self.measure(func, options['repeat']) - baseline
+            self.stdout.write('%-12s %8.2f us/row' % (name, seconds / len(rows) * 1e6))
+
+    def measure(self, func, repeat):
+        best = None
+        for i in range(repeat):
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
@@ -1,16 +1,28 @@
 import os.path
+from datetime import datetime
+from unittest import mock
 from tablib import Dataset
 
 from core.admin import AuthorAdmin, BookAdmin, BookResource, CustomBookAdmin
 from core.models import Author, Book, Category, EBook, Parent
 
+from django import forms
+from django.contrib import admin
 from django.contrib.admin.models import LogEntry
 from django.contrib.auth.models import User
+from django.core import signing
+from django.core.exceptions import ImproperlyConfigured
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test.testcases import TestCase
+from django.test.testcases import TestCase, TransactionTestCase
 from django.test.utils import override_settings
+from django.utils.encoding import force_text
 from django.utils.translation import gettext_lazy as _
 
+from import_export.instance_loaders import ModelInstanceLoader, ResolvedInstanceLoader
+from import_export.jobs import SynchronousJobRunner
+from import_export.models import ImportJob
+from import_export.tmp_storages import TempFolderStorage
+
 
 class ImportExportAdminIntegrationTest(TestCase):
 
@@ -67,6 +79,155 @@ class ImportExportAdminIntegrationTest(TestCase):
                 1, 0, Book._meta.verbose_name_plural)
         )
 
+    def test_import_stream(self):
+        filename = os.path.join(
+            os.path.dirname(__file__),
+            os.path.pardir,
+            'exports',
+            'books.csv')
+        BookAdmin.stream_import = True
+        try:
+            with open(filename, "rb") as f:
+                data = {
+                    'input_format': '0',
+                    'import_file': f,
+                }
+                response = self.client.post('/admin/core/book/import/', data)
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(response.context['result'].has_errors())
+            data = response.context['confirm_form'].initial
+            response = self.client.post('/admin/core/book/process_import/', data,
+                                        follow=True)
+        finally:
+            BookAdmin.stream_import = False
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Book.objects.count(), 1)
+
+    def test_import_stream_keeps_newlines_in_quoted_values(self):
+        import_file = SimpleUploadedFile(
+            'books.csv', b'id,name,author_email\r\n,"Some\r\nbook",test@example.com\r\n')
+        BookAdmin.stream_import = True
+        try:
+            response = self.client.post('/admin/core/book/import/', {
+                'input_format': '0',
+                'import_file': import_file,
+            })
+            self.assertFalse(response.context['result'].has_errors())
+            data = response.context['confirm_form'].initial
+            self.client.post('/admin/core/book/process_import/', data, follow=True)
+        finally:
+            BookAdmin.stream_import = False
+        self.assertEqual(Book.objects.get().name, 'Some\r\nbook')
+
+    def test_import_stream_mac(self):
+        filename = os.path.join(
+            os.path.dirname(__file__),
+            os.path.pardir,
+            'exports',
+            'books-mac.csv')
+        BookAdmin.stream_import = True
+        try:
+            with open(filename, "rb") as f:
+                response = self.client.post('/admin/core/book/import/', {
+                    'input_format': '0',
+                    'import_file': f,
+                })
+            self.assertFalse(response.context['result'].has_errors())
+            self.assertEqual(response.context['result'].totals['new'], 1)
+        finally:
+            BookAdmin.stream_import = False
+
+    def test_import_reuse_dry_run(self):
+        filename = os.path.join(
+            os.path.dirname(__file__),
+            os.path.pardir,
+            'exports',
+            'books.csv')
+        BookAdmin.reuse_dry_run = True
+        try:
+            with open(filename, "rb") as f:
+                data = {
+                    'input_format': '0',
+                    'import_file': f,
+                }
+                response = self.client.post('/admin/core/book/import/', data)
+            self.assertEqual(response.status_code, 200)
+            data = response.context['confirm_form'].initial
+            self.assertTrue(data['dry_run_file_name'])
+            # the confirmed import does not read the uploaded file again
+            TempFolderStorage(name=data['import_file_name']).save(b'', 'wb')
+            response = self.client.post('/admin/core/book/process_import/', data,
+                                        follow=True)
+        finally:
+            BookAdmin.reuse_dry_run = False
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Book.objects.count(), 1)
+
+    def test_resolved_instance_loader(self):
+        class CustomInstanceLoader(ModelInstanceLoader):
+            pass
+
+        class CustomResolvedInstanceLoader(ResolvedInstanceLoader):
+            pass
+
+        book_admin = BookAdmin(Book, admin.site)
+        resource = BookResource()
+        loader = book_admin.get_resolved_instance_loader(resource, Dataset())
+        self.assertIs(type(loader), ResolvedInstanceLoader)
+        with mock.patch.object(resource._meta, 'instance_loader_class',
+                               CustomResolvedInstanceLoader):
+            loader = book_admin.get_resolved_instance_loader(resource, Dataset())
+        self.assertIs(type(loader), CustomResolvedInstanceLoader)
+        with mock.patch.object(resource._meta, 'instance_loader_class', CustomInstanceLoader):
+            with self.assertRaises(ImproperlyConfigured):
+                book_admin.get_resolved_instance_loader(resource, Dataset())
+
+    def test_dry_run_is_saved_as_json(self):
+        book = Book.objects.create(name='Some book')
+        book_admin = BookAdmin(Book, admin.site)
+        tmp_storage = book_admin.save_dry_run(['id', 'name'], [[str(book.pk), 'Some book']],
+                                              {(str(book.pk), ): str(book.pk)})
+        data = signing.loads(force_text(tmp_storage.read('rb')), salt='import_export.dry_run')
+        self.assertEqual(data['rows'], [[str(book.pk), 'Some book']])
+        dry_run = book_admin.read_dry_run(tmp_storage.name)
+        self.assertEqual(dry_run['keys'], {(str(book.pk), ): str(book.pk)})
+        tmp_storage.remove()
+
+    def test_dry_run_rows_without_json_values_are_not_saved(self):
+        book_admin = BookAdmin(Book, admin.site)
+        tmp_storage = book_admin.save_dry_run(['id', 'published'],
+                                              [['', datetime(2019, 1, 1)]], {})
+        dry_run = book_admin.read_dry_run(tmp_storage.name)
+        self.assertIsNone(dry_run['headers'])
+        self.assertIsNone(dry_run['rows'])
+        tmp_storage.remove()
+
+    def test_import_with_confirm_form_without_dry_run_file_name(self):
+        class LegacyConfirmImportForm(forms.Form):
+            import_file_name = forms.CharField(widget=forms.HiddenInput())
+            original_file_name = forms.CharField(widget=forms.HiddenInput())
+            input_format = forms.CharField(widget=forms.HiddenInput())
+
+        filename = os.path.join(
+            os.path.dirname(__file__),
+            os.path.pardir,
+            'exports',
+            'books.csv')
+        BookAdmin.get_confirm_import_form = lambda self: LegacyConfirmImportForm
+        try:
+            with open(filename, "rb") as f:
+                response = self.client.post('/admin/core/book/import/', {
+                    'input_format': '0',
+                    'import_file': f,
+                })
+            data = response.context['confirm_form'].initial
+            response = self.client.post('/admin/core/book/process_import/', data,
+                                        follow=True)
+        finally:
+            del BookAdmin.get_confirm_import_form
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Book.objects.count(), 1)
+
     @override_settings(TEMPLATE_STRING_IF_INVALID='INVALID_VARIABLE')
     def test_import_mac(self):
         # GET the import form
@@ -115,6 +276,23 @@ class ImportExportAdminIntegrationTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertTrue(response.has_header("Content-Disposition"))
         self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertFalse(response.streaming)
+
+    def test_export_streaming(self):
+        Book.objects.create(name='Čierna kniha')
+        BookAdmin.stream_export = True
+        BookAdmin.to_encoding = 'cp1250'
+        try:
+            response = self.client.post('/admin/core/book/export/',
+                                        {'file_format': '0'})
+        finally:
+            BookAdmin.stream_export = False
+            del BookAdmin.to_encoding
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content)
+        self.assertTrue(content.startswith(b'id,'))
+        self.assertIn('Čierna kniha'.encode('cp1250'), content)
 
     def test_returns_xlsx_export(self):
         response = self.client.get('/admin/core/book/export/')
@@ -221,6 +399,11 @@ class ImportExportAdminIntegrationTest(TestCase):
         # from https://mail.python.org/pipermail/python-dev/2008-January/076194.html
         def monkeypatch_method(cls):
             def decorator(func):
+                # later tests use the admin as well
+                if func.__name__ in cls.__dict__:
+                    self.addCleanup(setattr, cls, func.__name__, cls.__dict__[func.__name__])
+                else:
+                    self.addCleanup(delattr, cls, func.__name__)
                 setattr(cls, func.__name__, func)
                 return func
             return decorator
@@ -318,6 +501,75 @@ class ImportExportAdminIntegrationTest(TestCase):
         )
 
 
+class ImportJobAdminIntegrationTest(TransactionTestCase):
+    # jobs are only submitted once the transaction is committed
+
+    def setUp(self):
+        user = User.objects.create_user('admin', 'admin@example.com',
+                                        'password')
+        user.is_staff = True
+        user.is_superuser = True
+        user.save()
+        self.client.login(username='admin', password='password')
+        BookAdmin.background_import = True
+        BookAdmin.job_runner_class = SynchronousJobRunner
+
+    def tearDown(self):
+        BookAdmin.background_import = False
+        BookAdmin.job_runner_class = None
+
+    def start_import(self):
+        filename = os.path.join(
+            os.path.dirname(__file__),
+            os.path.pardir,
+            'exports',
+            'books.csv')
+        with open(filename, "rb") as f:
+            data = {
+                'input_format': '0',
+                'import_file': f,
+            }
+            response = self.client.post('/admin/core/book/import/', data)
+        data = response.context['confirm_form'].initial
+        return data, self.client.post('/admin/core/book/process_import/', data)
+
+    def test_import_in_background(self):
+        data, response = self.start_import()
+        job = ImportJob.objects.get()
+        self.assertRedirects(response, '/admin/core/book/import_job/%s/' % job.pk)
+        self.assertEqual(job.status, ImportJob.STATUS_FINISHED)
+        self.assertEqual(job.get_totals()['new'], 1)
+        self.assertEqual(Book.objects.count(), 1)
+        self.assertEqual(LogEntry.objects.get().user.username, 'admin')
+
+        response = self.client.get('/admin/core/book/import_job/%s/' % job.pk)
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'admin/import_export/import_job.html')
+        self.assertEqual(response.context['progress']['processed_rows'], 1)
+
+    def test_import_job_of_other_user(self):
+        data, response = self.start_import()
+        job = ImportJob.objects.get()
+        user = User.objects.create_user('other', 'other@example.com',
+                                        'password')
+        user.is_staff = True
+        user.is_superuser = True
+        user.save()
+        self.client.login(username='other', password='password')
+
+        response = self.client.get('/admin/core/book/import_job/%s/' % job.pk)
+        self.assertEqual(response.status_code, 404)
+
+    def test_failed_import_job_removes_file(self):
+        with mock.patch.object(BookAdmin, 'import_dataset',
+                               side_effect=ValueError('Import failed')):
+            data, response = self.start_import()
+        job = ImportJob.objects.get()
+        self.assertEqual(job.status, ImportJob.STATUS_FAILED)
+        tmp_storage = TempFolderStorage(name=data['import_file_name'])
+        self.assertFalse(os.path.exists(tmp_storage.get_full_path()))
+
+
 class ExportActionAdminIntegrationTest(TestCase):
 
     def setUp(self):
@@ -1,4 +1,9 @@
 import os
+import tracemalloc
+from io import BytesIO
+
+import openpyxl
+import tablib
 
 from django.test import TestCase
 from django.utils.encoding import force_text
@@ -29,6 +34,67 @@ class XLSXTest(TestCase):
         with open(filename, self.format.get_read_mode()) as in_stream:
             self.format.create_dataset(in_stream.read())
 
+    def test_create_row_stream(self):
+        filename = os.path.join(
+            os.path.dirname(__file__),
+            os.path.pardir,
+            'exports',
+            'books.xlsx')
+        with open(filename, self.format.get_read_mode()) as in_stream:
+            data = in_stream.read()
+        dataset = self.format.create_dataset(data)
+        stream = self.format.create_row_stream(data)
+        self.assertEqual(stream.headers, dataset.headers)
+        self.assertEqual([list(row.values()) for row in stream.dict],
+                         [list(row) for row in dataset])
+
+    def test_export_stream(self):
+        content = b''.join(self.format.export_stream(['id', 'name'],
+                                                     [[1, 'Some book']]))
+        book = openpyxl.load_workbook(BytesIO(content))
+        self.assertEqual(list(book.active.values), [('id', 'name'), (1, 'Some book')])
+        self.assertTrue(book.active['A1'].font.b)
+        self.assertFalse(book.active['A2'].font.b)
+
+
+class XLSXExportMemoryBenchmark(TestCase):
+    """
+    Compares peak memory used to export rows with ``XLSX.export_stream``
+    and with ``XLSX.export_data``.
+    """
+    headers = ['column %s' % i for i in range(10)]
+
+    def get_rows(self, count):
+        for i in range(count):
+            yield [i, 'name %s' % (i % 50), 'text'] + [i * 1.5] * 7
+
+    def measure_peak(self, func):
+        tracemalloc.start()
+        try:
+            func()
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def stream_peak(self, count):
+        return self.measure_peak(lambda: [
+            len(chunk) for chunk in base_formats.XLSX().export_stream(
+                self.headers, self.get_rows(count))
+        ])
+
+    def dataset_peak(self, count):
+        def export():
+            dataset = tablib.Dataset(*self.get_rows(count), headers=self.headers)
+            base_formats.XLSX().export_data(dataset)
+        return self.measure_peak(export)
+
+    def test_stream_uses_less_memory_than_dataset(self):
+        self.assertLess(self.stream_peak(4000), self.dataset_peak(4000))
+
+    def test_stream_memory_is_flat(self):
+        # 4x more rows must not need noticeably more memory
+        self.assertLess(self.stream_peak(4000), self.stream_peak(1000) * 1.5)
+
 
 class CSVTest(TestCase):
 
@@ -68,6 +134,32 @@ class CSVTest(TestCase):
             data = force_text(in_stream.read())
         base_formats.CSV().create_dataset(data)
 
+    def test_create_row_stream(self):
+        filename = os.path.join(
+            os.path.dirname(__file__),
+            os.path.pardir,
+            'exports',
+            'books.csv')
+        with open(filename, self.format.get_read_mode()) as in_stream:
+            data = in_stream.read()
+        dataset = self.format.create_dataset(data)
+        stream = self.format.create_row_stream(data)
+        self.assertEqual(stream.headers, dataset.headers)
+        self.assertEqual(list(stream.dict), list(dataset.dict))
+
+        with open(filename, self.format.get_read_mode()) as in_stream:
+            stream = self.format.create_row_stream(in_stream)
+            self.assertEqual(list(stream.dict), list(dataset.dict))
+
+    def test_export_stream(self):
+        dataset = tablib.Dataset(headers=['id', 'name'])
+        dataset.append([1, 'Some, book'])
+        dataset.append([2, None])
+        self.assertTrue(self.format.can_stream_export())
+        self.assertEqual(
+            ''.join(self.format.export_stream(dataset.headers, iter(dataset))),
+            self.format.export_data(dataset))
+
 
 class TSVTest(TestCase):
 
@@ -95,3 +187,10 @@ class TSVTest(TestCase):
         with open(filename, self.format.get_read_mode()) as in_stream:
             data = force_text(in_stream.read())
         base_formats.TSV().create_dataset(data)
+
+    def test_export_stream(self):
+        dataset = tablib.Dataset(headers=['id', 'name'])
+        dataset.append([1, 'Some book'])
+        self.assertEqual(
+            ''.join(self.format.export_stream(dataset.headers, iter(dataset))),
+            self.format.export_data(dataset))
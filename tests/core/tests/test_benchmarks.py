@@ -0,0 +1,22 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+
+class BenchmarkCommandsTest(SimpleTestCase):
+
+    def call_benchmark(self, name, **options):
+        out = StringIO()
+        call_command(name, repeat=1, stdout=out, **options)
+        return out.getvalue().splitlines()
+
+    def test_benchmark_import(self):
+        lines = self.call_benchmark('benchmark_import', rows=10)
+        self.assertEqual([line.split()[0] for line in lines], ['per', 'import'])
+        self.assertTrue(all(line.endswith('us/row') for line in lines))
+
+    def test_benchmark_export(self):
+        lines = self.call_benchmark('benchmark_export', rows=10, columns=12)
+        self.assertEqual([line.split()[0] for line in lines], ['per', 'export'])
+        self.assertTrue(all(line.endswith('us/row') for line in lines))
@@ -1,4 +1,6 @@
 from datetime import date
+from decimal import Decimal
+from unittest import mock
 
 from django.test import TestCase
 
@@ -73,3 +75,605 @@ class FieldTest(TestCase):
 
         self.field.save(self.obj, row)
         self.assertIsNone(self.obj.name)
+
+
+class ColumnSpecTest(TestCase):
+
+    def test_parse_price_spec(self):
+        self.assertEqual(fields.parse_price_spec('price__20__EUR'),
+                         fields.PriceSpec('EUR', Decimal('20'), None))
+        self.assertEqual(fields.parse_price_spec('price__20__price_lvl(3)__with__tax__EUR'),
+                         fields.PriceSpec('EUR', Decimal('20'), 3))
+
+    def test_parse_invalid_price_spec(self):
+        for attribute in ('price', 'price__abc__EUR', 'price__20__price_lvl(x)__a__b__EUR'):
+            with self.assertRaises(ValueError):
+                fields.parse_price_spec(attribute)
+
+    def test_parse_attribute_spec(self):
+        self.assertEqual(fields.parse_attribute_spec('attribute__color(7)'),
+                         fields.AttributeSpec(7, True))
+        self.assertEqual(fields.parse_attribute_spec('attribute__color(7)notactive'),
+                         fields.AttributeSpec(7, False))
+        with self.assertRaises(ValueError):
+            fields.parse_attribute_spec('attribute')
+
+    def test_field_spec(self):
+        field = fields.PriceField(attribute='price__20__EUR', column_name='price')
+        self.assertEqual((field.currency, field.tax_ratio, field.price_level_id),
+                         ('EUR', Decimal('20'), None))
+        field = fields.AttributeField(attribute='attribute__color(7)', column_name='color')
+        self.assertEqual((field.group_id, field.is_active), (7, True))
+
+
+class PrefetchedObj:
+
+    def __init__(self, is_parent=False, **prefetched):
+        self.is_parent = is_parent
+        self._prefetched_objects_cache = prefetched
+        # not used when the relations are prefetched
+        self.prices = self.old_prices = self.option_values = mock.Mock()
+
+
+def make_price(currency, tax_ratio, price_level_id, value):
+    return mock.Mock(currency=mock.Mock(code=currency),
+                     tax_ratio=mock.Mock(percentage=Decimal(tax_ratio)),
+                     price_level_id=price_level_id, _price_excluding_tax=Decimal(value))
+
+
+class PrefetchedIndexTest(TestCase):
+
+    def test_get_prefetched_index(self):
+        self.assertIsNone(fields.get_prefetched_index(PrefetchedObj(), 'prices', str))
+        obj = PrefetchedObj(prices=['a', 'b', 'a'])
+        key = mock.Mock(side_effect=str.upper)
+        self.assertEqual(fields.get_prefetched_index(obj, 'prices', key),
+                         {'A': ['a', 'a'], 'B': ['b']})
+        # the index is built once per object
+        fields.get_prefetched_index(obj, 'prices', key)
+        self.assertEqual(key.call_count, 3)
+
+    def test_price_from_prefetched_prices(self):
+        obj = PrefetchedObj(prices=[
+            make_price('EUR', '20.00', None, '10'),
+            make_price('EUR', '20.00', 3, '9'),
+            make_price('USD', '20.00', None, '12'),
+        ])
+        with self.assertNumQueries(0):
+            values = [fields.PriceField(attribute=attribute).get_value(obj) for attribute in (
+                'price__20__EUR', 'price__20__price_lvl(3)__with__tax__EUR',
+                'price__20__price_lvl(4)__with__tax__EUR', 'price__7__EUR')]
+        # the tax ratio of the column matches a percentage with decimal places
+        self.assertEqual(values, [Decimal('10'), Decimal('9'), None, None])
+        self.assertFalse(obj.prices.get.called)
+
+    def test_old_price_from_prefetched_prices(self):
+        price = make_price('EUR', '19.00', None, '10')
+        price.price_excluding_tax.return_value = Decimal('10')
+        obj = PrefetchedObj(old_prices=[price])
+        with self.assertNumQueries(0):
+            self.assertEqual(fields.OldPriceField(attribute='old_price__19__EUR').get_value(obj),
+                             Decimal('10'))
+            self.assertIsNone(fields.OldPriceField(attribute='old_price__19__USD').get_value(obj))
+        self.assertFalse(obj.old_prices.get.called)
+
+    def test_attribute_from_prefetched_values(self):
+        values = []
+        for group_id, name in ((7, 'Red'), (8, 'Large'), (7, 'Blue')):
+            value = mock.Mock(group_id=group_id)
+            # the name argument of Mock() names the mock itself
+            value.value.name = name
+            values.append(value)
+        obj = PrefetchedObj(option_values=values)
+        with self.assertNumQueries(0):
+            self.assertEqual(fields.AttributeField(attribute='attribute__color(7)').get_value(obj),
+                             'Red;Blue')
+            self.assertIsNone(fields.AttributeField(attribute='attribute__shape(9)').get_value(obj))
+        self.assertFalse(obj.option_values.filter.called)
+
+
+class FakeOption:
+    # stands in for AttributeOption, whose model is not installed in tests
+    next_pk = 100
+
+    def __init__(self, **kwargs):
+        self.pk = None
+        self.__dict__.update(kwargs)
+
+    def get_current_language(self):
+        return 'en'
+
+    def save(self):
+        self.pk = FakeOption.next_pk
+        FakeOption.next_pk += 1
+
+
+class AttributeLookupsTest(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(fields, 'AttributeOption')
+        self.option_model = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.option_model.side_effect = FakeOption
+        self.group = mock.Mock(pk=7)
+        self.lookups = fields.AttributeLookups()
+
+    def set_existing_options(self, *options):
+        existing = []
+        for pk, group_id, names in options:
+            option = mock.Mock(pk=pk, group_id=group_id)
+            translations = []
+            for name in names:
+                # the name argument of Mock() names the mock itself
+                translation = mock.Mock()
+                translation.name = name
+                translations.append(translation)
+            option.translations.all.return_value = translations
+            existing.append(option)
+        queryset = self.option_model.objects.filter.return_value.prefetch_related.return_value
+        queryset.order_by.return_value = existing
+        return existing
+
+    def set_bulk_insert_ids(self, can_return_ids):
+        patcher = mock.patch.object(fields, 'connections')
+        connections = patcher.start()
+        self.addCleanup(patcher.stop)
+        connections.__getitem__.return_value.features.can_return_ids_from_bulk_insert = \
+            can_return_ids
+
+    def test_options_match_names_in_any_language(self):
+        red, blue = self.set_existing_options((1, 7, ['Red', 'Rot']), (2, 7, ['Blue', 'Blau']))
+        options = self.lookups.get_or_create_options(3, self.group, ['Rot', 'Blue', 'Red'])
+        self.assertEqual(options, [red, blue, red])
+        self.assertFalse(self.option_model.called)
+        # options are loaded once per product class
+        self.lookups.get_or_create_options(3, self.group, ['Blau'])
+        self.assertEqual(self.option_model.objects.filter.call_count, 1)
+
+    def test_create_options_in_bulk(self):
+        self.set_existing_options((1, 7, ['Red']))
+        self.set_bulk_insert_ids(True)
+
+        def bulk_create(options):
+            for option in options:
+                option.save()
+
+        self.option_model.objects.bulk_create.side_effect = bulk_create
+        translation_model = self.option_model._parler_meta.root_model
+
+        options = self.lookups.get_or_create_options(3, self.group, ['Green', 'Red', 'Green'])
+        green = options[0]
+        self.assertIs(options[2], green)
+        self.assertEqual((green.product_class_id, green.group, green.name),
+                         (3, self.group, 'Green'))
+        self.option_model.objects.bulk_create.assert_called_once_with([green])
+        translation_model.assert_called_once_with(master_id=green.pk, language_code='en',
+                                                  name='Green')
+        translation_model.objects.bulk_create.assert_called_once_with(
+            [translation_model.return_value])
+        # created options are found by later rows
+        self.assertEqual(self.lookups.get_or_create_options(3, self.group, ['Green']), [green])
+        self.assertEqual(self.option_model.objects.bulk_create.call_count, 1)
+
+    def test_create_options_without_bulk_insert_ids(self):
+        self.set_existing_options()
+        self.set_bulk_insert_ids(False)
+        options = self.lookups.get_or_create_options(3, self.group, ['Green', 'Yellow'])
+        self.assertEqual([option.name for option in options], ['Green', 'Yellow'])
+        self.assertTrue(all(option.pk is not None for option in options))
+        self.assertFalse(self.option_model.objects.bulk_create.called)
+
+
+class AttributeWriterTest(TestCase):
+
+    def test_flush_syncs_values(self):
+        product = mock.Mock(pk=10)
+        group = mock.Mock(pk=7)
+        options = [mock.Mock(pk=100), mock.Mock(pk=102)]
+        with mock.patch.object(fields, 'AttributeOptionGroupValue') as value_model:
+            value_model.objects.filter.return_value.values_list.return_value = [
+                # pk, product_id, group_id, value_id
+                (1, 10, 7, 100),
+                (2, 10, 7, 101),
+                (3, 10, 7, 100),
+                (4, 10, 8, 101),
+            ]
+            writer = fields.AttributeWriter()
+            writer.add(product, group, options)
+            writer.flush()
+
+        value_model.objects.filter.assert_any_call(pk__in=[2, 3])
+        value_model.objects.filter.return_value.delete.assert_called_once_with()
+        value_model.assert_called_once_with(product_id=10, group_id=7, value_id=102)
+        value_model.objects.bulk_create.assert_called_once_with([value_model.return_value])
+
+    def test_flush_without_options_deletes_values(self):
+        with mock.patch.object(fields, 'AttributeOptionGroupValue') as value_model:
+            value_model.objects.filter.return_value.values_list.return_value = [
+                (1, 10, 7, 100),
+            ]
+            writer = fields.AttributeWriter()
+            writer.add(mock.Mock(pk=10), mock.Mock(pk=7), [])
+            writer.flush()
+
+        value_model.objects.filter.assert_any_call(pk__in=[1])
+        self.assertFalse(value_model.called)
+        self.assertFalse(value_model.objects.bulk_create.called)
+
+
+class TranslationWriterTest(TestCase):
+
+    def setUp(self):
+        self.translation_model = mock.MagicMock()
+        self.writer = fields.TranslationWriter(self.translation_model)
+
+    def set_existing_translations(self, *translations):
+        self.translation_model.objects.filter.return_value = [
+            mock.Mock(master_id=master_id, language_code=language, **values)
+            for master_id, language, values in translations
+        ]
+
+    def test_flush_merges_values_per_object_and_language(self):
+        self.set_existing_translations()
+        obj = mock.Mock(pk=1)
+        self.writer.add(obj, 'en', 'title', 'Book')
+        self.writer.add(obj, 'en', 'slug', 'book')
+        self.writer.add(obj, 'de', 'title', 'Buch')
+        self.writer.add(obj, 'en', 'title', 'Other book')
+        self.writer.flush()
+
+        self.assertEqual(self.translation_model.call_args_list, [
+            mock.call(master_id=1, language_code='en', title='Other book', slug='book'),
+            mock.call(master_id=1, language_code='de', title='Buch'),
+        ])
+        self.translation_model.objects.bulk_create.assert_called_once_with(
+            [self.translation_model.return_value] * 2)
+        self.assertFalse(self.translation_model.objects.all.called)
+
+    def test_flush_creates_and_updates_translations(self):
+        self.set_existing_translations((1, 'en', {'title': 'Old', 'slug': 'book'}),
+                                       (2, 'en', {'title': 'Same'}))
+        self.writer.add(mock.Mock(pk=1), 'en', 'title', 'New')
+        self.writer.add(mock.Mock(pk=1), 'en', 'slug', 'book')
+        self.writer.add(mock.Mock(pk=2), 'en', 'title', 'Same')
+        self.writer.add(mock.Mock(pk=3), 'en', 'title', 'Created')
+        self.writer.flush()
+
+        updated, unchanged = self.translation_model.objects.filter.return_value
+        self.assertEqual(updated.title, 'New')
+        self.translation_model.objects.all.return_value.bulk_update.assert_called_once_with(
+            [updated], ['title'])
+        self.translation_model.assert_called_once_with(master_id=3, language_code='en',
+                                                       title='Created')
+        self.translation_model.objects.bulk_create.assert_called_once_with(
+            [self.translation_model.return_value])
+
+    def test_flush_skips_unsaved_objects(self):
+        self.writer.add(mock.Mock(pk=None), 'en', 'title', 'Skipped')
+        self.writer.flush()
+        self.assertFalse(self.translation_model.objects.filter.called)
+        self.assertEqual(self.writer.entries, [])
+
+    def test_slugs_are_loaded_once_per_language(self):
+        values_list = self.translation_model.objects.filter.return_value.values_list
+        values_list.return_value = ['taken']
+        self.assertTrue(self.writer.slug_exists('en', 'taken'))
+        self.assertFalse(self.writer.slug_exists('en', 'new'))
+        self.writer.add_slug('en', 'new')
+        self.assertTrue(self.writer.slug_exists('en', 'new'))
+        self.translation_model.objects.filter.assert_called_once_with(language_code='en')
+
+
+class TranslatableFieldTest(TestCase):
+
+    def make_obj(self, translation_model):
+        obj = mock.Mock(pk=None, get_slug=None)
+        obj._meta.model.translations.field.model = translation_model
+        return obj
+
+    def test_same_slug_in_one_import(self):
+        translation_model = mock.MagicMock()
+        translation_model._meta.get_field.return_value = mock.Mock(blank=False)
+        translation_model.objects.filter.return_value.values_list.return_value = ['taken']
+        writer = fields.TranslationWriter(translation_model)
+        field = fields.TranslatableField(attribute='slug_en', column_name='slug_en')
+        field.writer = writer
+
+        first = self.make_obj(translation_model)
+        field.save(first, {'slug_en': 'new'})
+        self.assertEqual(writer.entries, [(first, 'en', 'slug', 'new')])
+
+        for slug in ('new', 'taken'):
+            with self.assertRaises(ValueError):
+                field.save(self.make_obj(translation_model), {'slug_en': slug})
+        self.assertEqual(len(writer.entries), 1)
+        translation_model.objects.filter.assert_called_once_with(language_code='en')
+
+
+class PriceLookupsTest(TestCase):
+
+    def setUp(self):
+        self.models = {}
+        for name in ('Currency', 'TaxRatio', 'PriceLevel'):
+            patcher = mock.patch.object(fields, name)
+            model = patcher.start()
+            self.addCleanup(patcher.stop)
+            model.DoesNotExist = type('DoesNotExist', (Exception, ), {})
+            self.models[name] = model
+        self.lookups = fields.PriceLookups()
+
+    def test_one_query_per_table(self):
+        eur, usd = mock.Mock(code='EUR'), mock.Mock(code='USD')
+        self.models['Currency'].objects.all.return_value = [eur, usd]
+        tax_ratio = mock.Mock(percentage=Decimal('20.00'))
+        self.models['TaxRatio'].objects.all.return_value = [tax_ratio]
+        price_level = mock.Mock(pk=3)
+        self.models['PriceLevel'].objects.all.return_value = [price_level]
+
+        for i in range(2):
+            self.assertIs(self.lookups.get_currency('EUR'), eur)
+            self.assertIs(self.lookups.get_currency('USD'), usd)
+            self.assertIs(self.lookups.get_tax_ratio(Decimal('20')), tax_ratio)
+            self.assertIs(self.lookups.get_price_level(3), price_level)
+        for model in self.models.values():
+            model.objects.all.assert_called_once_with()
+
+    def test_unknown_values(self):
+        for model in self.models.values():
+            model.objects.all.return_value = []
+        with self.assertRaises(self.models['Currency'].DoesNotExist):
+            self.lookups.get_currency('XXX')
+        with self.assertRaises(self.models['TaxRatio'].DoesNotExist):
+            self.lookups.get_tax_ratio(Decimal('7'))
+        with self.assertRaises(self.models['PriceLevel'].DoesNotExist):
+            self.lookups.get_price_level(9)
+
+
+class PriceWriterTest(TestCase):
+
+    def setUp(self):
+        self.manager = mock.Mock()
+        self.manager.model.side_effect = lambda **kwargs: mock.Mock(**kwargs)
+        self.writer = fields.PriceWriter(self.manager, ('currency', 'tax_ratio', 'price_level'))
+        self.eur, self.tax_ratio = mock.Mock(pk=1), mock.Mock(pk=2)
+
+    def set_existing_prices(self, *prices):
+        self.manager.filter.return_value = [
+            mock.Mock(content_type_id=5, object_id=object_id, currency_id=1, tax_ratio_id=2,
+                      price_level_id=price_level_id, _price_excluding_tax=value)
+            for object_id, price_level_id, value in prices
+        ]
+        return self.manager.filter.return_value
+
+    def add(self, obj, value, price_level=None):
+        self.writer.add(obj, 5, value, currency=self.eur, tax_ratio=self.tax_ratio,
+                        price_level=price_level)
+
+    def test_flush_creates_and_updates_prices(self):
+        changed, unchanged = self.set_existing_prices((10, None, Decimal('1')),
+                                                      (11, None, Decimal('2')))
+        self.add(mock.Mock(pk=10), Decimal('1.5'))
+        self.add(mock.Mock(pk=11), Decimal('2'))
+        self.add(mock.Mock(pk=12), Decimal('3'))
+        self.writer.flush()
+
+        self.assertEqual(changed._price_excluding_tax, Decimal('1.5'))
+        self.manager.bulk_update.assert_called_once_with([changed], ['_price_excluding_tax'])
+        self.manager.model.assert_called_once_with(content_type_id=5, object_id=12, currency_id=1,
+                                                   tax_ratio_id=2, price_level_id=None)
+        created, = self.manager.bulk_create.call_args[0][0]
+        self.assertEqual((created.object_id, created._price_excluding_tax), (12, Decimal('3')))
+
+    def test_flush_keys_prices_by_price_level(self):
+        default, = self.set_existing_prices((10, None, Decimal('1')))
+        obj = mock.Mock(pk=10)
+        self.add(obj, Decimal('1'))
+        self.add(obj, Decimal('0.9'), price_level=mock.Mock(pk=3))
+        self.writer.flush()
+
+        self.assertFalse(self.manager.bulk_update.called)
+        self.manager.model.assert_called_once_with(content_type_id=5, object_id=10, currency_id=1,
+                                                   tax_ratio_id=2, price_level_id=3)
+        self.assertEqual(len(self.manager.bulk_create.call_args[0][0]), 1)
+
+    def test_flush_skips_unsaved_objects(self):
+        self.add(mock.Mock(pk=None), Decimal('1'))
+        self.writer.flush()
+        self.assertFalse(self.manager.filter.called)
+        self.assertFalse(self.manager.bulk_create.called)
+        self.assertEqual(self.writer.entries, [])
+
+
+class PriceFieldTest(TestCase):
+
+    def test_pending_value_until_flush(self):
+        field = fields.PriceField(attribute='price__20__EUR', column_name='price')
+        field.lookups = mock.Mock()
+        field.lookups.get_content_type_id.return_value = 5
+        field.writer = mock.Mock()
+        obj = mock.Mock(spec=['pk', 'prices'], pk=10)
+        obj.prices = mock.Mock()
+        obj.prices.get.return_value._price_excluding_tax = Decimal('1')
+
+        field.save(obj, {'price': '2.5'})
+        # skip_row sees the value which is written with the batch
+        self.assertEqual(field.get_value(obj), Decimal('2.5'))
+        self.assertEqual(field.get_value(mock.Mock(spec=['pk', 'prices'], pk=10, prices=obj.prices)), Decimal('1'))
+        field.flush()
+        field.writer.flush.assert_called_once_with()
+        self.assertEqual(field.get_value(obj), Decimal('1'))
+
+
+class TreePlacementTest(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(fields, 'Product')
+        self.product_model = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.placement = fields.TreePlacement()
+
+    def test_get_parent_id(self):
+        translation_model = self.product_model.translations.field.model
+        slugs = translation_model.objects.filter.return_value.order_by.return_value.values_list
+        slugs.return_value = [('shoes', 1), ('shoes', 2), ('hats', 3)]
+        translated = self.product_model.objects.translated
+        translated.return_value.first.side_effect = [mock.Mock(pk=4), None]
+
+        self.assertEqual(self.placement.get_parent_id('shoes'), 1)
+        self.assertEqual(self.placement.get_parent_id('hats'), 3)
+        # products created by the import are looked up once
+        self.assertEqual(self.placement.get_parent_id('new'), 4)
+        self.assertEqual(self.placement.get_parent_id('new'), 4)
+        self.assertIsNone(self.placement.get_parent_id('missing'))
+        translation_model.objects.filter.assert_called_once_with(
+            language_code=self.placement.language)
+        self.assertEqual(translated.call_count, 2)
+
+    def set_nodes(self, *nodes):
+        self.nodes = {pk: mock.Mock(pk=pk, depth=len(path) // 4, path=path, numchild=0)
+                      for pk, path in nodes}
+        self.product_model.objects.in_bulk.side_effect = lambda pks: {
+            pk: self.nodes[pk] for pk in pks if pk in self.nodes}
+        self.product_model.objects.get.side_effect = lambda pk: self.nodes[pk]
+
+    def test_apply_skips_children_of_their_parent(self):
+        self.set_nodes((1, '0001'), (2, '00010001'), (3, '0002'), (4, '00020001'))
+        self.placement.add(mock.Mock(pk=2), 1)
+        self.placement.add(mock.Mock(pk=4), 1)
+        self.placement.add(mock.Mock(pk=3), 1)
+        with mock.patch.object(self.placement, 'move') as move:
+            self.placement.apply()
+        nodes = self.nodes
+        self.assertEqual(move.call_args_list, [mock.call(nodes[4], nodes[1]),
+                                               mock.call(nodes[3], nodes[1])])
+        self.product_model.objects.in_bulk.assert_called_once_with([1, 2, 4, 3])
+        self.assertFalse(self.placement.moves)
+
+    def test_apply_loads_nodes_once_per_parent(self):
+        self.set_nodes((1, '0001'), (2, '0002'), (3, '0003'), (4, '0004'), (5, '0005'))
+        self.placement.add(mock.Mock(pk=2), 1)
+        self.placement.add(mock.Mock(pk=3), 5)
+        self.placement.add(mock.Mock(pk=4), 1)
+        with mock.patch.object(self.placement, 'move'):
+            self.placement.apply()
+        self.assertEqual(self.product_model.objects.in_bulk.call_args_list,
+                         [mock.call([1, 2, 4]), mock.call([5, 3])])
+
+    def test_apply_reloads_nodes_moved_with_their_ancestor(self):
+        self.set_nodes((1, '0001'), (2, '0002'), (3, '00020001'))
+        self.placement.add(mock.Mock(pk=2), 1)
+        self.placement.add(mock.Mock(pk=3), 1)
+        with mock.patch.object(self.placement, 'move'):
+            self.placement.apply()
+        self.product_model.objects.get.assert_called_once_with(pk=3)
+
+    def test_move_counts_children_of_parent(self):
+        self.set_nodes((1, '0001'), (2, '0002'), (3, '0003'))
+        self.placement.add(mock.Mock(pk=2), 1)
+        self.placement.add(mock.Mock(pk=3), 1)
+        self.placement.apply()
+        self.nodes[2].move.assert_called_once_with(self.nodes[1], 'last-child')
+        self.nodes[3].move.assert_called_once_with(self.nodes[1], 'last-child')
+        self.assertEqual(self.nodes[1].numchild, 2)
+
+    def test_apply_fixes_tree_and_retries_failed_moves(self):
+        self.set_nodes((1, '0001'), (2, '0002'), (3, '0003'))
+        self.placement.add(mock.Mock(pk=2), 1)
+        self.placement.add(mock.Mock(pk=3), 1)
+        with mock.patch.object(self.placement, 'move',
+                               side_effect=[AttributeError, None, None]) as move:
+            self.placement.apply()
+        self.product_model.fix_tree.assert_called_once_with()
+        nodes = self.nodes
+        self.assertEqual(move.call_args_list, [mock.call(nodes[2], nodes[1]),
+                                               mock.call(nodes[3], nodes[1]),
+                                               mock.call(nodes[2], nodes[1])])
+
+
+class ParentFieldTest(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(fields, 'Product')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.field = fields.ParentField(attribute='parent', column_name='parent')
+        self.resource = mock.Mock(import_cache={})
+        self.obj = mock.Mock(pk=2, id=2, is_parent=False)
+        self.obj.is_root.return_value = False
+
+    def save(self, use_bulk):
+        self.resource._meta.use_bulk = use_bulk
+        self.field.before_import(self.resource)
+        placement = self.field.placement
+        with mock.patch.object(placement, 'get_parent_id', return_value=1), \
+                mock.patch.object(placement, 'apply') as apply:
+            self.field.save(self.obj, {'parent': 'shoes'})
+        return placement, apply
+
+    def test_moves_are_applied_right_away(self):
+        placement, apply = self.save(use_bulk=False)
+        apply.assert_called_once_with()
+        self.obj.refresh_from_db.assert_called_once_with(fields=['path', 'depth', 'numchild'])
+
+    def test_moves_are_applied_by_flush_in_bulk_mode(self):
+        placement, apply = self.save(use_bulk=True)
+        self.assertFalse(apply.called)
+        self.assertEqual(placement.moves, {2: 1})
+
+
+class CarouselImageWriterTest(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(fields, 'CarouselImages')
+        self.image_model = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(fields, 'ContentType')
+        content_type = patcher.start()
+        self.addCleanup(patcher.stop)
+        content_type.objects.get_for_model.return_value.id = 5
+        self.image_model.side_effect = lambda **kwargs: kwargs['image']
+
+    def flush(self, existing, images):
+        queryset = self.image_model.objects.filter.return_value.order_by.return_value
+        queryset.values_list.return_value = [
+            (pk, 5, 1, image) for pk, image in existing]
+        writer = fields.CarouselImageWriter()
+        writer.add(mock.Mock(pk=1), images)
+        writer.flush()
+
+    def assertDeleted(self, pks):
+        if pks:
+            self.image_model.objects.filter.assert_any_call(pk__in=pks)
+        else:
+            self.assertFalse(self.image_model.objects.filter.return_value.delete.called)
+
+    def assertCreated(self, images):
+        if images:
+            self.image_model.objects.bulk_create.assert_called_once_with(images)
+        else:
+            self.assertFalse(self.image_model.objects.bulk_create.called)
+
+    def test_unchanged_images_are_kept(self):
+        self.flush([(10, 'a.jpg'), (11, 'b.jpg')], ['a.jpg', 'b.jpg'])
+        self.assertDeleted([])
+        self.assertCreated([])
+
+    def test_added_and_removed_images(self):
+        self.flush([(10, 'a.jpg'), (11, 'b.jpg'), (12, 'c.jpg')], ['a.jpg', 'c.jpg', 'd.jpg'])
+        self.assertDeleted([11])
+        self.assertCreated(['d.jpg'])
+
+    def test_duplicates_are_deleted(self):
+        self.flush([(10, 'a.jpg'), (11, 'a.jpg'), (12, 'b.jpg')], ['a.jpg', 'b.jpg', 'a.jpg'])
+        self.assertDeleted([11])
+        self.assertCreated([])
+
+    def test_empty_cell_deletes_all_images(self):
+        self.flush([(10, 'a.jpg'), (11, 'b.jpg')], [])
+        self.assertDeleted([10, 11])
+        self.assertCreated([])
+
+    def test_reordered_images_are_created_in_order(self):
+        self.flush([(10, 'a.jpg'), (11, 'b.jpg'), (12, 'c.jpg')], ['b.jpg', 'a.jpg', 'c.jpg'])
+        self.assertDeleted([10, 12])
+        self.assertCreated(['a.jpg', 'c.jpg'])
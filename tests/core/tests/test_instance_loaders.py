@@ -1,10 +1,11 @@
 import tablib
 
-from core.models import Book
+from core.models import Author, Book
 
 from django.test import TestCase
 
 from import_export import instance_loaders, resources
+from import_export.streams import RowStream
 
 
 class CachedInstanceLoaderTest(TestCase):
@@ -28,3 +29,164 @@ class CachedInstanceLoaderTest(TestCase):
     def test_get_instance(self):
         obj = self.instance_loader.get_instance(self.dataset.dict[0])
         self.assertEqual(obj, self.book)
+
+    def test_clear_cache_of_rows(self):
+        self.dataset.append([str(self.book2.pk), 'Some other book', ''])
+        instance_loader = instance_loaders.CachedInstanceLoader(self.resource, self.dataset)
+        rows = self.dataset.dict
+        other = instance_loader.get_instance(rows[1])
+        Book.objects.filter(pk=self.book.pk).update(name='Changed')
+        with self.assertNumQueries(1):
+            instance_loader.clear_cache(rows[:1])
+        self.assertEqual(instance_loader.get_instance(rows[0]).name, 'Changed')
+        # instances of other rows are not loaded again
+        self.assertIs(instance_loader.get_instance(rows[1]), other)
+
+
+class BatchedInstanceLoaderTest(TestCase):
+
+    def setUp(self):
+        class BookResource(resources.ModelResource):
+            class Meta:
+                model = Book
+                import_id_fields = ['name', 'author_email']
+
+        self.resource = BookResource()
+        self.book = Book.objects.create(name="Some book",
+                                        author_email='test@example.com')
+        self.book2 = Book.objects.create(name="Some book",
+                                         author_email='other@example.com')
+        self.dataset = tablib.Dataset(headers=['id', 'name', 'author_email'])
+        self.dataset.append(['', 'Some book', 'test@example.com'])
+        self.dataset.append(['', 'Some book', 'other@example.com'])
+        self.dataset.append(['', 'Some book', 'missing@example.com'])
+        self.instance_loader = instance_loaders.BatchedInstanceLoader(
+            self.resource, self.dataset)
+
+    def test_get_instance(self):
+        rows = self.dataset.dict
+        with self.assertNumQueries(1):
+            self.assertEqual(self.instance_loader.get_instance(rows[0]), self.book)
+            self.assertEqual(self.instance_loader.get_instance(rows[1]), self.book2)
+            self.assertIsNone(self.instance_loader.get_instance(rows[2]))
+
+    def test_get_instance_in_batches(self):
+        self.instance_loader.batch_size = 2
+        rows = self.dataset.dict
+        with self.assertNumQueries(2):
+            for row in rows:
+                self.instance_loader.get_instance(row)
+
+    def test_cache_is_bounded(self):
+        self.instance_loader.batch_size = 1
+        self.instance_loader.max_cache_size = 1
+        # the last row has no instance and is not kept in the cache
+        for row in self.dataset.dict[:2]:
+            self.instance_loader.get_instance(row)
+        self.assertEqual(len(self.instance_loader.cache), 1)
+
+    def test_clear_cache_of_rows(self):
+        rows = self.dataset.dict
+        for row in rows:
+            self.instance_loader.get_instance(row)
+        self.instance_loader.clear_cache(rows[:1])
+        self.assertEqual(list(self.instance_loader.cache),
+                         [('Some book', 'other@example.com')])
+
+    def test_get_instance_from_row_stream(self):
+        stream = RowStream(self.dataset.headers, iter(self.dataset))
+        instance_loader = instance_loaders.BatchedInstanceLoader(
+            self.resource, stream)
+        instance_loader.batch_size = 2
+        with self.assertNumQueries(2):
+            instances = [instance_loader.get_instance(row) for row in stream.dict]
+        self.assertEqual(instances, [self.book, self.book2, None])
+
+    def test_get_instance_by_foreign_key(self):
+        class BookResource(resources.ModelResource):
+            class Meta:
+                model = Book
+                import_id_fields = ['name', 'author']
+
+        author = Author.objects.create(name='Author')
+        book = Book.objects.create(name='Some book', author=author)
+        dataset = tablib.Dataset(headers=['id', 'name', 'author'])
+        dataset.append(['', 'Some book', str(author.pk)])
+        dataset.append(['', 'Some book', str(Author.objects.create(name='Other').pk)])
+        instance_loader = instance_loaders.BatchedInstanceLoader(BookResource(), dataset)
+        rows = dataset.dict
+        self.assertEqual(instance_loader.get_instance(rows[0]), book)
+        self.assertIsNone(instance_loader.get_instance(rows[1]))
+
+    def test_get_instance_by_numeric_cell(self):
+        # e.g. a name read from a number cell of a spreadsheet
+        book = Book.objects.create(name='123', author_email='test@example.com')
+        dataset = tablib.Dataset(headers=['id', 'name', 'author_email'])
+        dataset.append(['', 123, 'test@example.com'])
+        instance_loader = instance_loaders.BatchedInstanceLoader(self.resource, dataset)
+        self.assertEqual(instance_loader.get_instance(dataset.dict[0]), book)
+
+    def test_repeated_key_is_looked_up_again(self):
+        self.resource._meta.instance_loader_class = instance_loaders.BatchedInstanceLoader
+        dataset = tablib.Dataset(headers=['id', 'name', 'author_email'])
+        dataset.append(['', 'New book', 'new@example.com'])
+        dataset.append(['', 'New book', 'new@example.com'])
+        result = self.resource.import_data(dataset, raise_errors=True)
+        self.assertEqual([row.import_type for row in result.rows], ['new', 'update'])
+        self.assertEqual(Book.objects.filter(name='New book').count(), 1)
+
+
+class ResolvedInstanceLoaderTest(TestCase):
+
+    def setUp(self):
+        class BookResource(resources.ModelResource):
+            class Meta:
+                model = Book
+                import_id_fields = ['name', 'author_email']
+
+        self.resource = BookResource()
+        self.book = Book.objects.create(name="Some book",
+                                        author_email='test@example.com')
+        self.dataset = tablib.Dataset(headers=['id', 'name', 'author_email'])
+        self.dataset.append(['', 'Some book', 'test@example.com'])
+        self.dataset.append(['', 'Some book', 'missing@example.com'])
+
+    def test_found_keys(self):
+        instance_loader = instance_loaders.ResolvedInstanceLoader(
+            self.resource, self.dataset)
+        for row in self.dataset.dict:
+            instance_loader.get_instance(row)
+        self.assertEqual(instance_loader.found_keys,
+                         {('Some book', 'test@example.com'): str(self.book.pk)})
+
+    def test_get_instance_by_resolved_keys(self):
+        resolved_keys = {('Some book', 'test@example.com'): self.book.pk}
+        # the key is not looked up again, the primary key is used
+        Book.objects.filter(pk=self.book.pk).update(author_email='changed@example.com')
+        instance_loader = instance_loaders.ResolvedInstanceLoader(
+            self.resource, self.dataset, resolved_keys)
+        rows = self.dataset.dict
+        with self.assertNumQueries(1):
+            self.assertEqual(instance_loader.get_instance(rows[0]), self.book)
+            self.assertIsNone(instance_loader.get_instance(rows[1]))
+
+    def test_repeated_new_key_is_looked_up_again(self):
+        resolved_keys = {('Some book', 'test@example.com'): self.book.pk}
+        self.dataset.append(['', 'Some book', 'missing@example.com'])
+        instance_loader = instance_loaders.ResolvedInstanceLoader(
+            self.resource, self.dataset, resolved_keys)
+        rows = self.dataset.dict
+        self.assertIsNone(instance_loader.get_instance(rows[1]))
+        book = Book.objects.create(name='Some book', author_email='missing@example.com')
+        self.assertEqual(instance_loader.get_instance(rows[2]), book)
+
+    def test_new_keys_are_looked_up_again(self):
+        resolved_keys = {('Some book', 'test@example.com'): self.book.pk}
+        # created after the dry run
+        book = Book.objects.create(name='Some book', author_email='missing@example.com')
+        instance_loader = instance_loaders.ResolvedInstanceLoader(
+            self.resource, self.dataset, resolved_keys)
+        rows = self.dataset.dict
+        with self.assertNumQueries(1):
+            self.assertEqual(instance_loader.get_instance(rows[0]), self.book)
+            self.assertEqual(instance_loader.get_instance(rows[1]), book)
@@ -0,0 +1,54 @@
+from core.models import Book
+
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase
+
+from import_export.jobs import SynchronousJobRunner
+from import_export.models import ImportJob
+from import_export.results import Result, RowResult
+
+
+class ImportJobTest(TestCase):
+
+    def setUp(self):
+        self.job = ImportJob.objects.create(
+            content_type=ContentType.objects.get_for_model(Book),
+            file_name='books.csv')
+        self.result = Result()
+        self.result.total_rows = 3
+        self.result.totals[RowResult.IMPORT_TYPE_NEW] = 2
+        self.result.totals[RowResult.IMPORT_TYPE_UPDATE] = 1
+
+    def test_run(self):
+        SynchronousJobRunner().submit(self.job, lambda: self.result)
+        job = ImportJob.objects.get(pk=self.job.pk)
+        self.assertEqual(job.status, ImportJob.STATUS_FINISHED)
+        self.assertTrue(job.is_done())
+        self.assertEqual(job.processed_rows, 3)
+        self.assertEqual(job.total_rows, 3)
+        self.assertEqual(job.get_totals()[RowResult.IMPORT_TYPE_NEW], 2)
+        self.assertIsNotNone(job.finished)
+
+    def test_run_failed(self):
+        def fail():
+            raise ValueError("Broken file")
+
+        SynchronousJobRunner().submit(self.job, fail)
+        job = ImportJob.objects.get(pk=self.job.pk)
+        self.assertEqual(job.status, ImportJob.STATUS_FAILED)
+        self.assertIn("Broken file", job.error)
+
+    def test_progress(self):
+        self.job.progress_interval = 3
+
+        def import_data():
+            self.job.update_progress(self.result, 3)
+            self.assertEqual(self.job.get_progress()['processed_rows'], 3)
+            return self.result
+
+        SynchronousJobRunner().submit(self.job, import_data)
+        self.assertEqual(self.job.get_progress(), {
+            'processed_rows': 3,
+            'total_rows': 3,
+            'totals': self.job.get_totals(),
+        })
@@ -0,0 +1,182 @@
+import multiprocessing
+import threading
+import time
+from unittest import mock, skipUnless
+
+import tablib
+from core.models import Book, Category, Profile
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.test import TestCase, TransactionTestCase
+
+from import_export import resources
+from import_export.parallel import ParallelImport
+from import_export.results import Error, Result, RowResult
+
+
+class BookResource(resources.ModelResource):
+
+    class Meta:
+        model = Book
+        fields = ('id', 'name', 'author_email')
+
+
+class ParallelImportTest(TestCase):
+
+    def setUp(self):
+        self.resource = BookResource()
+        self.parallel_import = ParallelImport(self.resource, 2)
+
+    def test_partition_keeps_rows_of_instance_together(self):
+        dataset = tablib.Dataset(headers=['id', 'name'])
+        for i in range(10):
+            dataset.append([i % 3 + 1, 'Book %s' % i])
+        partitions = self.parallel_import.partition(dataset)
+        self.assertEqual(sum(len(part) for part, row_numbers in partitions), 10)
+        for part, row_numbers in partitions:
+            self.assertEqual(len(part), len(row_numbers))
+            for row, number in zip(part.dict, row_numbers):
+                self.assertEqual(row, dataset.dict[number - 1])
+        parts_by_id = {}
+        for index, (part, row_numbers) in enumerate(partitions):
+            for row in part.dict:
+                parts_by_id.setdefault(row['id'], set()).add(index)
+        self.assertTrue(all(len(parts) == 1 for parts in parts_by_id.values()))
+
+    def test_partition_spreads_rows_without_id(self):
+        dataset = tablib.Dataset(headers=['id', 'name'])
+        for i in range(4):
+            dataset.append(['', 'Book %s' % i])
+        partitions = self.parallel_import.partition(dataset)
+        self.assertEqual([row_numbers for part, row_numbers in partitions],
+                         [[2, 4], [1, 3]])
+
+    def make_result(self, import_types):
+        result = Result()
+        result.add_dataset_headers(['name'])
+        for number, import_type in enumerate(import_types, 1):
+            row_result = RowResult()
+            row_result.number = number
+            row_result.import_type = import_type
+            row = {'name': 'row %s' % number}
+            if import_type == RowResult.IMPORT_TYPE_ERROR:
+                row_result.errors.append(Error(ValueError('error %s' % number)))
+                result.append_failed_row(row, row_result.errors[0])
+            elif import_type == RowResult.IMPORT_TYPE_INVALID:
+                row_result.validation_error = ValidationError('invalid %s' % number)
+                result.append_invalid_row(number, row, row_result.validation_error)
+                result.append_failed_row(row, row_result.validation_error)
+            result.increment_row_result_total(row_result)
+            result.append_row_result(row_result)
+        return result
+
+    def test_merge(self):
+        first = self.make_result([RowResult.IMPORT_TYPE_NEW, RowResult.IMPORT_TYPE_ERROR])
+        second = self.make_result([RowResult.IMPORT_TYPE_INVALID, RowResult.IMPORT_TYPE_UPDATE])
+        result = Result()
+        result.add_dataset_headers(['name'])
+        self.parallel_import.merge(result, [(first, [2, 4]), (second, [1, 3])])
+
+        self.assertEqual([row.number for row in result.rows], [1, 2, 3, 4])
+        self.assertEqual([row.import_type for row in result.rows],
+                         [RowResult.IMPORT_TYPE_INVALID, RowResult.IMPORT_TYPE_NEW,
+                          RowResult.IMPORT_TYPE_UPDATE, RowResult.IMPORT_TYPE_ERROR])
+        self.assertEqual(result.row_errors()[0][0], 4)
+        self.assertEqual([row.number for row in result.invalid_rows], [1])
+        self.assertEqual(list(result.failed_dataset['Error']),
+                         ["['invalid 1']", 'error 2'])
+        self.assertEqual(result.totals[RowResult.IMPORT_TYPE_NEW], 1)
+        self.assertEqual(result.totals[RowResult.IMPORT_TYPE_ERROR], 1)
+
+    def test_receive_from_exited_worker(self):
+        conn, worker_conn = multiprocessing.Pipe()
+        worker_conn.close()
+        result, error = self.parallel_import.receive(conn)
+        self.assertIsNone(result)
+        self.assertIsInstance(error.error, RuntimeError)
+
+    def test_only_stalled_workers_are_terminated(self):
+        self.parallel_import.timeout = 0.5
+        conn, worker_conn = multiprocessing.Pipe()
+        stalled_conn, stalled_worker_conn = multiprocessing.Pipe()
+
+        def import_slowly():
+            # takes longer than the timeout but reports progress
+            for i in range(5):
+                time.sleep(0.2)
+                worker_conn.send(None)
+            worker_conn.send(('result', None))
+
+        thread = threading.Thread(target=import_slowly)
+        thread.start()
+        slow, stalled = mock.Mock(), mock.Mock()
+        outcomes = self.parallel_import.receive_outcomes([(slow, conn), (stalled, stalled_conn)])
+        thread.join()
+        self.assertEqual(outcomes[0], ('result', None))
+        self.assertFalse(slow.terminate.called)
+        stalled.terminate.assert_called_once_with()
+        self.assertIsInstance(outcomes[1][1].error, TimeoutError)
+
+    def test_import_inside_transaction(self):
+        dataset = tablib.Dataset(['', 'Some book'], headers=['id', 'name'])
+        with self.assertRaises(ImproperlyConfigured):
+            self.resource.import_data(dataset, workers=2)
+
+
+@skipUnless(
+    'postgresql' in settings.DATABASES['default']['ENGINE'],
+    'Run only against Postgres')
+class ParallelImportPostgresTest(TransactionTestCase):
+
+    def test_import_data(self):
+        books = [Book.objects.create(name='Book %s' % i) for i in range(6)]
+        dataset = tablib.Dataset(headers=['id', 'name'])
+        for book in books:
+            dataset.append([book.pk, 'New %s' % book.name])
+        dataset.append(['', 'Another book'])
+        result = BookResource().import_data(dataset, workers=3)
+        self.assertFalse(result.has_errors())
+        self.assertEqual([row.number for row in result.rows], list(range(1, 8)))
+        self.assertEqual(result.totals[RowResult.IMPORT_TYPE_UPDATE], 6)
+        self.assertEqual(result.totals[RowResult.IMPORT_TYPE_NEW], 1)
+        self.assertEqual(Book.objects.filter(name__startswith='New ').count(), 6)
+
+    def test_error_rolls_back_all_workers(self):
+        class ProfileResource(resources.ModelResource):
+            class Meta:
+                model = Profile
+                fields = ('id', 'user')
+
+        dataset = tablib.Dataset(headers=['id', 'user'])
+        for i in range(4):
+            dataset.append(['', User.objects.create(username='user%s' % i).pk])
+        # 'user' is a required field, the database will raise an error.
+        dataset.append(['', ''])
+        result = ProfileResource().import_data(dataset, workers=2, use_transactions=True)
+        self.assertTrue(result.has_errors())
+        self.assertEqual(result.row_errors()[0][0], 5)
+        self.assertFalse(Profile.objects.exists())
+
+    def test_workers_waiting_for_each_other_are_aborted(self):
+        class QuickParallelImport(ParallelImport):
+            timeout = 1
+
+        class SharedCategoryBookResource(BookResource):
+            def get_parallel_import_class(self):
+                return QuickParallelImport
+
+            def after_save_instance(self, instance, using_transactions, dry_run):
+                # the second worker waits for the category created by the
+                # first one until its transaction ends
+                instance.categories.add(Category.objects.get_or_create(name='Shared')[0])
+
+        dataset = tablib.Dataset(headers=['id', 'name'])
+        dataset.append(['', 'Some book'])
+        dataset.append(['', 'Other book'])
+        result = SharedCategoryBookResource().import_data(dataset, workers=2)
+        self.assertTrue(result.has_errors())
+        self.assertIsInstance(result.base_errors[0].error, TimeoutError)
+        self.assertFalse(Book.objects.exists())
+        self.assertFalse(Category.objects.exists())
@@ -1,10 +1,11 @@
 import json
 import tablib
+import tracemalloc
 from collections import OrderedDict
 from copy import deepcopy
 from datetime import date
 from decimal import Decimal
-from unittest import skip, skipUnless
+from unittest import mock, skip, skipUnless
 
 from django.conf import settings
 from django.contrib.auth.models import User
@@ -16,8 +17,11 @@ from django.utils.encoding import force_text
 from django.utils.html import strip_tags
 
 from import_export import fields, resources, results, widgets
+from import_export.fingerprints import FingerprintStore
 from import_export.instance_loaders import ModelInstanceLoader
-from import_export.resources import Diff
+from import_export.models import RowFingerprint
+from import_export.resources import Diff, ExportPlan, InstanceSnapshot
+from import_export.streams import RowStream
 
 from ..models import (
     Author,
@@ -275,6 +279,11 @@ class ModelResourceTest(TestCase):
         dataset = self.resource.export(Book.objects.all())
         self.assertEqual(len(dataset), 1)
 
+    def test_export_iter(self):
+        rows = list(self.resource.export_iter())
+        dataset = self.resource.export()
+        self.assertEqual(rows, [list(row) for row in dataset])
+
     def test_export_iterable(self):
         dataset = self.resource.export(list(Book.objects.all()))
         self.assertEqual(len(dataset), 1)
@@ -290,6 +299,14 @@ class ModelResourceTest(TestCase):
                          'other </ins><span>book</span>')
         self.assertFalse(html[headers.index('author_email')])
 
+    def test_get_diff_of_unchanged_fields(self):
+        diff = Diff(self.resource, self.book, False)
+        diff.compare_with(self.resource, self.book)
+        html = diff.as_html()
+        headers = self.resource.get_export_headers()
+        self.assertEqual(html[headers.index('name')], '<span>Some book</span>')
+        self.assertFalse(html[headers.index('author_email')])
+
     @skip("See: https://github.com/django-import-export/django-import-export/issues/311")
     def test_get_diff_with_callable_related_manager(self):
         resource = AuthorResource()
@@ -318,6 +335,32 @@ class ModelResourceTest(TestCase):
         self.assertEqual(instance.author_email, 'test@example.com')
         self.assertEqual(instance.price, Decimal("10.25"))
 
+    def test_import_data_without_diff(self):
+        with mock.patch.object(Diff, 'as_html') as as_html:
+            result = self.resource.import_data(self.dataset, raise_errors=True,
+                                               collect_diff=False)
+        self.assertIsNone(result.rows[0].diff)
+        self.assertFalse(as_html.called)
+
+    def test_import_data_diff_is_lazy(self):
+        with mock.patch.object(Diff, 'as_html', return_value=['html']) as as_html:
+            result = self.resource.import_data(self.dataset, raise_errors=True)
+            self.assertFalse(as_html.called)
+            self.assertEqual(result.rows[0].diff, ['html'])
+            self.assertEqual(result.rows[0].diff, ['html'])
+        self.assertEqual(as_html.call_count, 1)
+
+    def test_import_data_from_row_stream(self):
+        stream = RowStream(self.dataset.headers, iter(self.dataset))
+        result = self.resource.import_data(stream, raise_errors=True)
+
+        self.assertFalse(result.has_errors())
+        self.assertEqual(result.total_rows, 1)
+        self.assertEqual(result.rows[0].import_type,
+                         results.RowResult.IMPORT_TYPE_UPDATE)
+        instance = Book.objects.get(pk=self.book.pk)
+        self.assertEqual(instance.author_email, 'test@example.com')
+
     def test_import_data_raises_field_specific_validation_errors(self):
         resource = AuthorResource()
         dataset = tablib.Dataset(headers=['id', 'name', 'birthday'])
@@ -711,6 +754,29 @@ class ModelResourceTest(TestCase):
             resource.import_data(self.dataset, raise_errors=True)
         self.assertEqual("This is an invalid dataset", cm.exception.args[0])
 
+    def test_before_import_error_does_not_skip_rows(self):
+        class B(BookResource):
+            def before_import(self, dataset, using_transactions, dry_run, **kwargs):
+                raise Exception('This is an invalid dataset')
+
+        result = B().import_data(self.dataset)
+        self.assertEqual(len(result.base_errors), 1)
+        self.assertEqual(len(result.rows), len(self.dataset))
+
+    def test_field_before_import_raises_error(self):
+        class B(BookResource):
+            malformed = fields.PriceField(attribute='price__abc__EUR', column_name='malformed')
+
+        books = Book.objects.count()
+        result = B().import_data(self.dataset)
+        self.assertTrue(result.has_errors())
+        self.assertIsInstance(result.base_errors[0].error, ValueError)
+        self.assertEqual(result.rows, [])
+        self.assertEqual(Book.objects.count(), books)
+
+        with self.assertRaises(ValueError):
+            B().import_data(self.dataset, raise_errors=True)
+
     def test_after_import_raises_error(self):
         class B(BookResource):
             def after_import(self, dataset, result, using_transactions, dry_run, **kwargs):
@@ -948,6 +1014,76 @@ class ModelResourceTransactionTest(TransactionTestCase):
         self.assertTrue(result.has_errors())
 
 
+class SavepointBatchImportTest(TransactionTestCase):
+
+    def setUp(self):
+        class BatchProfileResource(resources.ModelResource):
+            class Meta:
+                model = Profile
+                fields = ('id', 'user', 'is_private')
+                savepoint_batch_size = 10
+
+        self.resource = BatchProfileResource()
+        self.users = [User.objects.create(username='user%s' % i) for i in range(3)]
+
+    @skipUnlessDBFeature('supports_transactions')
+    def test_rows_are_imported_in_one_batch(self):
+        dataset = tablib.Dataset(headers=['id', 'user'])
+        for user in self.users:
+            dataset.append([None, user.pk])
+        with mock.patch.object(self.resource, 'import_row',
+                               wraps=self.resource.import_row) as import_row:
+            with mock.patch.object(self.resource, 'import_batch',
+                                   wraps=self.resource.import_batch) as import_batch:
+                result = self.resource.import_data(dataset, use_transactions=True)
+        self.assertFalse(result.has_errors())
+        self.assertEqual(import_batch.call_count, 1)
+        self.assertEqual(import_row.call_count, 3)
+        self.assertEqual(Profile.objects.count(), 3)
+
+    @skipUnlessDBFeature('supports_transactions')
+    def test_failed_batch_is_replayed_row_by_row(self):
+        # 'user' is a required field, the database raises an error for the
+        # second row
+        dataset = tablib.Dataset(headers=['id', 'user'])
+        dataset.append([None, self.users[0].pk])
+        dataset.append([None, None])
+        dataset.append([None, self.users[1].pk])
+        saved_users = []
+
+        def after_import(*args, **kwargs):
+            # the import is rolled back as a whole once it has errors
+            saved_users.extend(Profile.objects.values_list('user', flat=True))
+
+        with mock.patch.object(self.resource, 'after_import', side_effect=after_import):
+            result = self.resource.import_data(dataset, use_transactions=True,
+                                               collect_failed_rows=True)
+        self.assertTrue(result.has_errors())
+        self.assertEqual([row.import_type for row in result.rows],
+                         [results.RowResult.IMPORT_TYPE_NEW,
+                          results.RowResult.IMPORT_TYPE_ERROR,
+                          results.RowResult.IMPORT_TYPE_NEW])
+        self.assertEqual(len(result.failed_dataset), 1)
+        self.assertEqual(sorted(saved_users), [self.users[0].pk, self.users[1].pk])
+
+    @skipUnlessDBFeature('supports_transactions')
+    def test_failed_batch_resets_import_cache(self):
+        dataset = tablib.Dataset(headers=['id', 'user'])
+        dataset.append([None, self.users[0].pk])
+        dataset.append([None, None])
+        caches = []
+
+        def before_import(resource):
+            caches.append(resource.import_cache)
+            resource.import_cache['stale'] = True
+
+        field = self.resource.fields['user']
+        with mock.patch.object(field, 'before_import', side_effect=before_import):
+            self.resource.import_data(dataset, use_transactions=True)
+        self.assertEqual(len(caches), 2)
+        self.assertIsNot(caches[0], caches[1])
+
+
 class ModelResourceFactoryTest(TestCase):
 
     def test_create(self):
@@ -1147,3 +1283,650 @@ class ManyRelatedManagerDiffTest(TestCase):
         diff = result.rows[0].diff
         self.assertEqual(diff[export_headers.index("categories")],
                          expected_value)
+
+
+class ImportPlanTest(TestCase):
+
+    def setUp(self):
+        self.resource = BookResource()
+
+    def test_fields_are_grouped(self):
+        plan = self.resource.get_import_plan()
+        self.assertEqual(plan.fields, self.resource.get_import_fields())
+        self.assertEqual(plan.m2m_fields, [self.resource.fields['categories']])
+        setters = dict(plan.instance_fields)
+        self.assertNotIn(self.resource.fields['categories'], setters)
+        self.assertIsNotNone(setters[self.resource.fields['name']])
+        # the primary key is left to Field.save()
+        self.assertIsNone(setters[self.resource.fields['id']])
+        self.assertEqual(plan.custom_fields, [])
+
+    def test_plan_is_cached(self):
+        plan = self.resource.get_import_plan()
+        self.assertIs(self.resource.get_import_plan(), plan)
+        dataset = tablib.Dataset(['', 'Some book'], headers=['id', 'name'])
+        self.resource.import_data(dataset, raise_errors=True)
+        self.assertIsNot(self.resource.get_import_plan(), plan)
+
+    def test_setter_cleans_value(self):
+        book = Book()
+        self.resource.import_obj(book, {'name': 'Some book', 'price': '10.25'}, False)
+        self.assertEqual(book.name, 'Some book')
+        self.assertEqual(book.price, Decimal('10.25'))
+
+    def test_setter_uses_default(self):
+        resource = WithDefaultResource()
+        obj = WithDefault()
+        resource.import_obj(obj, {'name': ''}, False)
+        self.assertEqual(obj.name, 'foo_bar')
+
+    def test_overridden_clean_is_called(self):
+        class UpperField(fields.Field):
+            def clean(self, data):
+                return super().clean(data).upper()
+
+        class B(BookResource):
+            name = UpperField(attribute='name', column_name='name')
+
+        resource = B()
+        self.assertIsNone(dict(resource.get_import_plan().instance_fields)[resource.fields['name']])
+        book = Book()
+        resource.import_obj(book, {'name': 'Some book'}, False)
+        self.assertEqual(book.name, 'SOME BOOK')
+
+    def test_overridden_import_field_is_called(self):
+        class B(BookResource):
+            def import_field(self, field, obj, data, is_m2m=False):
+                if field.attribute == 'name':
+                    obj.name = 'Imported'
+                else:
+                    super().import_field(field, obj, data, is_m2m)
+
+        resource = B()
+        self.assertTrue(all(setter is None for field, setter
+                            in resource.get_import_plan().instance_fields))
+        book = Book()
+        resource.import_obj(book, {'name': 'Some book'}, False)
+        self.assertEqual(book.name, 'Imported')
+
+
+class ExportPlanTest(TestCase):
+
+    def setUp(self):
+        class B(BookResource):
+            author_name = fields.Field(attribute='author__name')
+            full_title = fields.Field()
+
+            def dehydrate_full_title(self, obj):
+                return '%s by %s' % (obj.name, obj.author.name if obj.author else '')
+
+        self.resource = B()
+        self.author = Author.objects.create(name='Ian Fleming')
+        Book.objects.create(name='Moonraker', author=self.author, price=Decimal('1.50'))
+        Book.objects.create(name='Some book')
+
+    def test_export(self):
+        with mock.patch.object(self.resource, 'get_field_name') as get_field_name:
+            dataset = self.resource.export(Book.objects.order_by('pk'))
+        self.assertFalse(get_field_name.called)
+        self.assertEqual(dataset.dict[0]['author_name'], 'Ian Fleming')
+        self.assertEqual(dataset.dict[0]['full_title'], 'Moonraker by Ian Fleming')
+        self.assertEqual(dataset.dict[0]['price'], Decimal('1.50'))
+        self.assertEqual(dataset.dict[1]['author_name'], '')
+        self.assertEqual(dataset.dict[1]['full_title'], 'Some book by ')
+
+    def test_plan_matches_export_field(self):
+        book = Book.objects.get(name='Moonraker')
+        plan = ExportPlan(self.resource)
+        self.assertEqual(plan.export(book),
+                         [self.resource.export_field(field, book)
+                          for field in self.resource.get_export_fields()])
+
+    def test_plan_is_compiled_for_every_export(self):
+        self.resource.export()
+        plan = self.resource.get_export_plan()
+        list(self.resource.export_iter())
+        self.assertIsNot(self.resource.get_export_plan(), plan)
+
+    def test_overridden_export_field_is_called(self):
+        class B(BookResource):
+            def export_field(self, field, obj):
+                return 'x'
+
+        dataset = B().export(Book.objects.all())
+        self.assertEqual(set(dataset[0]), {'x'})
+
+
+class ExportValuesTest(TestCase):
+
+    def setUp(self):
+        class B(resources.ModelResource):
+            author_name = fields.Field(attribute='author__name')
+
+            class Meta:
+                model = Book
+                fields = ('id', 'name', 'author', 'author_email', 'imported',
+                          'published', 'price', 'author_name')
+
+        self.resource = B()
+        author = Author.objects.create(name='Ian Fleming')
+        Book.objects.create(name='Moonraker', author=author, price=Decimal('1.50'),
+                            published=date(1955, 4, 5))
+        Book.objects.create(name='Some book')
+
+    def test_export_values(self):
+        queryset = Book.objects.order_by('pk')
+        plan = ExportPlan(self.resource)
+        self.assertEqual(plan.value_paths, ['author__name', 'id', 'name', 'author__pk',
+                                            'author_email', 'imported', 'published',
+                                            'price'])
+        expected = [plan.export(obj) for obj in queryset]
+        with mock.patch.object(Book, 'from_db') as from_db:
+            with self.assertNumQueries(1):
+                dataset = self.resource.export(queryset)
+        self.assertFalse(from_db.called)
+        self.assertEqual([list(row) for row in dataset], expected)
+        self.assertEqual(dataset.dict[1]['author'], '')
+        self.assertEqual(dataset.dict[1]['author_name'], '')
+
+    def test_export_values_in_keyset_pages(self):
+        class B(self.resource.__class__):
+            class Meta:
+                export_chunk_size = 1
+                export_keyset_pagination = True
+
+        resource = B()
+        queryset = Book.objects.order_by('-pk')
+        expected = [ExportPlan(resource).export(obj) for obj in queryset]
+        with mock.patch.object(Book, 'from_db') as from_db:
+            # a query for each of the two pages and one for the last,
+            # empty page
+            with self.assertNumQueries(3):
+                dataset = resource.export(queryset)
+        self.assertFalse(from_db.called)
+        self.assertEqual([list(row) for row in dataset], expected)
+
+    def test_fields_exported_from_objects(self):
+        class WithDehydrate(BookResource):
+            def dehydrate_name(self, obj):
+                return obj.name.upper()
+
+        self.assertIsNone(ExportPlan(WithDehydrate()).value_paths)
+        # many-to-many fields are rendered from the related objects
+        self.assertIsNone(ExportPlan(BookResource()).value_paths)
+        dataset = WithDehydrate().export(Book.objects.order_by('pk'))
+        self.assertEqual(dataset.dict[0]['name'], 'MOONRAKER')
+
+    def test_nullable_widget_field_is_exported_from_objects(self):
+        class PersonResource(resources.ModelResource):
+            role = fields.Field(attribute='role',
+                                widget=widgets.ForeignKeyWidget(Role, field='user__username'))
+
+            class Meta:
+                model = Person
+                fields = ('id', 'role')
+
+        self.assertIsNone(ExportPlan(PersonResource()).value_paths)
+
+    def test_distinct_queryset_is_exported_from_objects(self):
+        plan = ExportPlan(self.resource)
+        self.assertTrue(plan.can_export_values(Book.objects.all()))
+        self.assertFalse(plan.can_export_values(Book.objects.distinct()))
+        self.assertFalse(plan.can_export_values(Book.objects.values('name')))
+        self.assertFalse(plan.can_export_values(list(Book.objects.all())))
+
+
+class InstanceSnapshotTest(TestCase):
+
+    def setUp(self):
+        self.resource = BookResource()
+        self.book = Book.objects.create(name="Some book")
+        self.categories = [Category.objects.create(name='Cat %s' % i)
+                           for i in range(20)]
+        self.book.categories.add(*self.categories)
+
+    def test_is_changed(self):
+        snapshot = InstanceSnapshot(self.resource, self.book)
+        name = self.resource.fields['name']
+        categories = self.resource.fields['categories']
+        self.assertFalse(snapshot.is_changed(name, self.book))
+        self.assertEqual(snapshot.get_value(categories),
+                         {category.pk for category in self.categories})
+
+        self.book.name = "Other book"
+        self.book.categories.remove(self.categories[0])
+        self.assertTrue(snapshot.is_changed(name, self.book))
+        self.assertTrue(snapshot.is_changed(categories, self.book))
+
+    def test_without_m2m(self):
+        snapshot = InstanceSnapshot(self.resource, self.book, m2m=False)
+        self.assertFalse(snapshot.has_value(self.resource.fields['categories']))
+
+    def test_snapshot_allocates_less_than_deepcopy(self):
+        book = Book.objects.prefetch_related('categories').get(pk=self.book.pk)
+
+        def measure_peak(func):
+            tracemalloc.start()
+            try:
+                func()
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        with self.assertNumQueries(0):
+            snapshot_peak = measure_peak(lambda: InstanceSnapshot(self.resource, book))
+        self.assertLess(snapshot_peak, measure_peak(lambda: deepcopy(book)))
+
+    def test_skip_row_gets_snapshot(self):
+        originals = []
+
+        class B(BookResource):
+            def skip_row(self, instance, original):
+                originals.append(original)
+                return super().skip_row(instance, original)
+
+        dataset = tablib.Dataset(headers=['id', 'name'])
+        dataset.append([self.book.pk, 'Some book'])
+        B().import_data(dataset, raise_errors=True)
+        self.assertIsInstance(originals[0], InstanceSnapshot)
+        self.assertEqual(originals[0].get_value(B.fields['name']), 'Some book')
+
+
+class FingerprintImportTest(TestCase):
+
+    def setUp(self):
+        class B(BookResource):
+            class Meta:
+                model = Book
+                exclude = ('imported', )
+                use_fingerprints = True
+
+        self.resource = B()
+        self.book = Book.objects.create(name="Some book")
+        self.dataset = tablib.Dataset(headers=['id', 'name', 'author_email'])
+        self.dataset.append([self.book.pk, 'Some book', 'test@example.com'])
+
+    def test_import_stores_fingerprint(self):
+        result = self.resource.import_data(self.dataset, raise_errors=True)
+        self.assertEqual(result.rows[0].import_type, results.RowResult.IMPORT_TYPE_UPDATE)
+        fingerprint = RowFingerprint.objects.get()
+        self.assertEqual(fingerprint.import_id,
+                         self.resource.get_row_import_id(self.dataset.dict[0]))
+        self.assertEqual(fingerprint.fingerprint,
+                         self.resource.get_row_fingerprint(self.dataset.dict[0]))
+
+    def test_import_id_renders_foreign_keys(self):
+        class AuthorBookResource(resources.ModelResource):
+            class Meta:
+                model = Book
+                fields = ('author', 'name')
+                import_id_fields = ('author', )
+
+        resource = AuthorBookResource()
+        # authors with the same name are told apart by their primary keys
+        first, second = Author.objects.create(name='Ann'), Author.objects.create(name='Ann')
+        import_ids = {resource.get_row_import_id({'author': author.pk, 'name': 'Book'})
+                      for author in (first, second)}
+        self.assertEqual(len(import_ids), 2)
+        self.assertEqual(resource.get_row_import_id({'author': str(first.pk), 'name': 'Book'}),
+                         resource.get_row_import_id({'author': first.pk, 'name': 'Other'}))
+
+    def test_unchanged_row_is_skipped_without_loading_instance(self):
+        self.resource.import_data(self.dataset, raise_errors=True)
+        with mock.patch.object(self.resource, 'get_or_init_instance') as get_instance:
+            result = self.resource.import_data(self.dataset, raise_errors=True)
+        self.assertFalse(get_instance.called)
+        self.assertEqual(result.rows[0].import_type, results.RowResult.IMPORT_TYPE_SKIP)
+
+    def test_changed_row_is_imported(self):
+        self.resource.import_data(self.dataset, raise_errors=True)
+        dataset = tablib.Dataset(headers=['id', 'name', 'author_email'])
+        dataset.append([self.book.pk, 'Some book', 'other@example.com'])
+        result = self.resource.import_data(dataset, raise_errors=True)
+        self.assertEqual(result.rows[0].import_type, results.RowResult.IMPORT_TYPE_UPDATE)
+        self.assertEqual(Book.objects.get().author_email, 'other@example.com')
+        self.assertEqual(RowFingerprint.objects.get().fingerprint,
+                         self.resource.get_row_fingerprint(dataset.dict[0]))
+
+    def test_dry_run_does_not_store_fingerprint(self):
+        self.resource.import_data(self.dataset, dry_run=True, raise_errors=True)
+        self.assertFalse(RowFingerprint.objects.exists())
+
+    def test_failed_import_does_not_store_fingerprints(self):
+        self.dataset.append(['invalid id', 'Other book', ''])
+        result = self.resource.import_data(self.dataset, use_transactions=False)
+        self.assertTrue(result.has_errors())
+        self.assertFalse(RowFingerprint.objects.exists())
+
+    def test_fingerprints_are_not_written_before_import_has_finished(self):
+        for i in range(3):
+            self.dataset.append(['', 'New book %s' % i, ''])
+        self.dataset.append(['invalid id', 'Other book', ''])
+        with mock.patch.object(FingerprintStore, 'batch_size', 2):
+            result = self.resource.import_data(self.dataset, use_transactions=False)
+        self.assertTrue(result.has_errors())
+        self.assertEqual(Book.objects.count(), 4)
+        self.assertFalse(RowFingerprint.objects.exists())
+
+    def test_failed_after_import_does_not_store_fingerprints(self):
+        with mock.patch.object(self.resource, 'after_import',
+                               side_effect=ValueError('after import failed')):
+            result = self.resource.import_data(self.dataset, use_transactions=False)
+        self.assertTrue(result.has_errors())
+        self.assertFalse(RowFingerprint.objects.exists())
+
+    def test_failed_bulk_write_does_not_store_fingerprints(self):
+        class B(self.resource.__class__):
+            class Meta:
+                use_bulk = True
+
+            def bulk_update(self, *args, **kwargs):
+                raise DatabaseError('bulk failed')
+
+        result = B().import_data(self.dataset, use_transactions=False)
+        self.assertTrue(result.has_errors())
+        self.assertFalse(RowFingerprint.objects.exists())
+
+    def test_fingerprints_are_loaded_in_batches(self):
+        dataset = tablib.Dataset(headers=['id', 'name'])
+        for i in range(5):
+            dataset.append([Book.objects.create(name="Book %s" % i).pk, "Book %s" % i])
+        store = FingerprintStore(self.resource, dataset)
+        with self.assertNumQueries(1):
+            for row in dataset.dict:
+                self.assertIsNone(store.get(self.resource.get_row_import_id(row)))
+
+
+class BulkImportTest(TestCase):
+
+    def setUp(self):
+        class BulkBookResource(BookResource):
+            class Meta:
+                model = Book
+                exclude = ('imported', )
+                use_bulk = True
+                batch_size = 2
+
+        self.resource = BulkBookResource()
+        self.book = Book.objects.create(name="Some book")
+
+    def test_import_data_creates_and_updates_in_bulk(self):
+        dataset = tablib.Dataset(headers=['id', 'name', 'author_email'])
+        dataset.append([self.book.pk, 'Some book', 'test@example.com'])
+        for i in range(3):
+            dataset.append(['', 'New book %s' % i, ''])
+
+        result = self.resource.import_data(dataset, raise_errors=True)
+
+        self.assertFalse(result.has_errors())
+        self.assertEqual(result.totals[results.RowResult.IMPORT_TYPE_NEW], 3)
+        self.assertEqual(result.totals[results.RowResult.IMPORT_TYPE_UPDATE], 1)
+        self.assertEqual(Book.objects.count(), 4)
+        self.assertEqual(Book.objects.get(pk=self.book.pk).author_email,
+                         'test@example.com')
+        self.assertEqual(self.resource.create_instances, [])
+        self.assertEqual(self.resource.update_instances, [])
+
+    def test_bulk_update_keeps_columns_changed_during_batch(self):
+        class B(resources.ModelResource):
+            class Meta:
+                model = Book
+                fields = ('id', 'name')
+                use_bulk = True
+
+            def after_import_instance(self, instance, new, **kwargs):
+                # e.g. treebeard changing numchild of a loaded node
+                Book.objects.filter(pk=instance.pk).update(author_email='changed@example.com')
+
+        resource = B()
+        self.assertEqual(resource.get_bulk_update_fields(), ['name'])
+        dataset = tablib.Dataset(headers=['id', 'name'])
+        dataset.append([self.book.pk, 'New name'])
+        result = resource.import_data(dataset, raise_errors=True)
+
+        self.assertEqual(result.rows[0].import_type, results.RowResult.IMPORT_TYPE_UPDATE)
+        book = Book.objects.get(pk=self.book.pk)
+        self.assertEqual(book.name, 'New name')
+        self.assertEqual(book.author_email, 'changed@example.com')
+
+    def test_import_data_saves_m2m_after_bulk_write(self):
+        cat1 = Category.objects.create(name='Cat 1')
+        dataset = tablib.Dataset(headers=['id', 'name', 'categories'])
+        dataset.append([self.book.pk, 'Some book', str(cat1.pk)])
+
+        result = self.resource.import_data(dataset, raise_errors=True)
+
+        self.assertFalse(result.has_errors())
+        self.assertEqual(list(self.book.categories.all()), [cat1])
+
+    def test_import_data_delete_in_bulk(self):
+        class B(self.resource.__class__):
+            def for_delete(self, row, instance):
+                return True
+
+        dataset = tablib.Dataset(headers=['id', 'name'])
+        dataset.append([self.book.pk, 'Some book'])
+        result = B().import_data(dataset, raise_errors=True)
+
+        self.assertFalse(result.has_errors())
+        self.assertEqual(result.rows[0].import_type,
+                         results.RowResult.IMPORT_TYPE_DELETE)
+        self.assertFalse(Book.objects.filter(pk=self.book.pk).exists())
+
+    def test_import_data_bulk_error_is_reported(self):
+        class B(self.resource.__class__):
+            def bulk_create(self, *args, **kwargs):
+                raise DatabaseError('bulk failed')
+
+        dataset = tablib.Dataset(headers=['id', 'name'])
+        dataset.append(['', 'New book'])
+        result = B().import_data(dataset, raise_errors=False)
+
+        self.assertTrue(result.has_errors())
+        self.assertEqual(str(result.base_errors[0].error), 'bulk failed')
+
+    def test_import_data_bulk_error_marks_rows_as_errors(self):
+        class B(self.resource.__class__):
+            def bulk_create(self, *args, **kwargs):
+                raise DatabaseError('bulk failed')
+
+        dataset = tablib.Dataset(headers=['id', 'name'])
+        dataset.append(['', 'New book'])
+        dataset.append([self.book.pk, 'Some book'])
+        result = B().import_data(dataset, raise_errors=False)
+
+        self.assertEqual([row.import_type for row in result.rows],
+                         [results.RowResult.IMPORT_TYPE_ERROR] * 2)
+        self.assertEqual(str(result.rows[0].errors[0].error), 'bulk failed')
+        self.assertEqual(result.totals[results.RowResult.IMPORT_TYPE_NEW], 0)
+        self.assertEqual(result.totals[results.RowResult.IMPORT_TYPE_UPDATE], 0)
+        self.assertEqual(result.totals[results.RowResult.IMPORT_TYPE_ERROR], 2)
+
+    def test_import_data_new_rows_have_primary_keys(self):
+        cat1 = Category.objects.create(name='Cat 1')
+        collected = []
+        flushed = []
+
+        class CollectingField(fields.Field):
+            def save(self, obj, data, is_m2m=False):
+                collected.append(obj)
+
+            def flush(self):
+                flushed.extend(obj.pk for obj in collected)
+                del collected[:]
+
+        class B(self.resource.__class__):
+            collecting = CollectingField(attribute='author_email', column_name='author_email')
+
+        dataset = tablib.Dataset(headers=['id', 'name', 'author_email', 'categories'])
+        dataset.append(['', 'New book', 'test@example.com', str(cat1.pk)])
+        result = B().import_data(dataset, raise_errors=True)
+
+        book = Book.objects.get(name='New book')
+        self.assertEqual(result.rows[0].import_type, results.RowResult.IMPORT_TYPE_NEW)
+        self.assertEqual(result.rows[0].object_id, book.pk)
+        self.assertEqual(list(book.categories.all()), [cat1])
+        self.assertEqual(flushed, [book.pk])
+
+    def test_import_data_unsaved_rows_are_errors(self):
+        class B(self.resource.__class__):
+            def bulk_create(self, *args, **kwargs):
+                self.create_instances = []
+
+        dataset = tablib.Dataset(headers=['id', 'name'])
+        dataset.append(['', 'New book'])
+        dataset.append([self.book.pk, 'Other name'])
+        result = B().import_data(dataset, raise_errors=False, use_transactions=False)
+
+        self.assertEqual([row.import_type for row in result.rows],
+                         [results.RowResult.IMPORT_TYPE_ERROR,
+                          results.RowResult.IMPORT_TYPE_UPDATE])
+        self.assertIn('New book', str(result.rows[0].errors[0].error))
+        self.assertEqual(result.totals[results.RowResult.IMPORT_TYPE_NEW], 0)
+        self.assertEqual(result.totals[results.RowResult.IMPORT_TYPE_ERROR], 1)
+
+        with self.assertRaises(ValueError):
+            B().import_data(dataset, raise_errors=True)
+
+    def test_import_data_calls_field_hooks(self):
+        calls = []
+
+        class HookField(fields.Field):
+            def before_import(self, resource):
+                calls.append(('before_import', resource.import_cache))
+
+            def flush(self):
+                calls.append(('flush', ))
+
+            def after_import(self):
+                calls.append(('after_import', ))
+
+        class B(self.resource.__class__):
+            hooked = HookField(attribute='author_email', column_name='author_email')
+
+        dataset = tablib.Dataset(headers=['id', 'name', 'author_email'])
+        dataset.append(['', 'New book', 'test@example.com'])
+        B().import_data(dataset, raise_errors=True)
+
+        self.assertEqual(calls, [('before_import', {}), ('flush', ), ('after_import', )])
+
+    def test_failing_field_after_import_does_not_skip_other_hooks(self):
+        calls = []
+
+        class FailingField(fields.Field):
+            def after_import(self):
+                raise ValueError('after import failed')
+
+        class HookField(fields.Field):
+            def after_import(self):
+                calls.append('field')
+
+        class B(self.resource.__class__):
+            failing = FailingField(attribute='author_email', column_name='failing')
+            hooked = HookField(attribute='author_email', column_name='hooked')
+
+            def after_import(self, *args, **kwargs):
+                calls.append('resource')
+
+        dataset = tablib.Dataset(headers=['id', 'name'])
+        dataset.append(['', 'New book'])
+        result = B().import_data(dataset)
+
+        self.assertEqual(calls, ['field', 'resource'])
+        self.assertEqual([str(error.error) for error in result.base_errors],
+                         ['after import failed'])
+
+
+class ExportPrefetchTest(TestCase):
+
+    def setUp(self):
+        cat = Category.objects.create(name='Cat 1')
+        for i in range(3):
+            Book.objects.create(name='Book %s' % i).categories.add(cat)
+
+    def test_export_prefetches_field_lookups_per_chunk(self):
+        class PrefetchedField(fields.Field):
+            prefetch_lookups = ('categories', )
+
+        class B(resources.ModelResource):
+            categories = PrefetchedField(
+                attribute='categories',
+                widget=widgets.ManyToManyWidget(Category, field='name'))
+
+            class Meta:
+                model = Book
+                fields = ('name', 'categories')
+                export_chunk_size = 2
+
+        resource = B()
+        self.assertEqual(resource.get_export_prefetch_lookups(), ['categories'])
+        # one query for books and one prefetch query for each chunk
+        with self.assertNumQueries(3):
+            dataset = resource.export(Book.objects.order_by('pk'))
+        self.assertEqual(dataset.dict[0]['categories'], 'Cat 1')
+
+    def test_export_plans_related_lookups(self):
+        class B(resources.ModelResource):
+            author_name = fields.Field(attribute='author__name')
+            author = fields.Field(attribute='author',
+                                  widget=widgets.ForeignKeyWidget(Author, field='name'))
+            full_title = fields.Field(attribute='author__birthday')
+
+            class Meta:
+                model = Book
+                fields = ('name', 'author', 'author_name', 'categories', 'full_title')
+
+            def dehydrate_full_title(self, obj):
+                return obj.name
+
+        author = Author.objects.create(name='Ian Fleming')
+        Book.objects.update(author=author)
+        resource = B()
+        self.assertEqual(resource.get_export_select_related(), ['author'])
+        self.assertEqual(resource.get_export_prefetch_lookups(), ['categories'])
+        # books are selected together with their authors, categories are
+        # prefetched once for all books
+        with self.assertNumQueries(2):
+            dataset = resource.export(Book.objects.order_by('pk'))
+        self.assertEqual(dataset.dict[0]['author'], 'Ian Fleming')
+        self.assertEqual(dataset.dict[0]['author_name'], 'Ian Fleming')
+        self.assertEqual(dataset.dict[0]['categories'], str(Category.objects.get().pk))
+
+    def test_export_keyset_pages(self):
+        class PrefetchedField(fields.Field):
+            prefetch_lookups = ('categories', )
+
+        class B(resources.ModelResource):
+            categories = PrefetchedField(
+                attribute='categories',
+                widget=widgets.ManyToManyWidget(Category, field='name'))
+
+            class Meta:
+                model = Book
+                fields = ('name', 'categories')
+                export_chunk_size = 2
+                export_keyset_pagination = True
+
+        Book.objects.create(name='Book 3')
+        resource = B()
+        # a query for books and a prefetch query for each of the pages of
+        # two books, and a query for the last, empty page
+        with self.assertNumQueries(5):
+            dataset = resource.export(Book.objects.all())
+        self.assertEqual(dataset['name'], ['Book 0', 'Book 1', 'Book 2', 'Book 3'])
+        self.assertEqual(dataset['categories'], ['Cat 1', 'Cat 1', 'Cat 1', ''])
+
+        with self.assertNumQueries(5):
+            dataset = resource.export(Book.objects.order_by('-pk'))
+        self.assertEqual(dataset['name'], ['Book 3', 'Book 2', 'Book 1', 'Book 0'])
+
+        with self.assertNumQueries(4):
+            dataset = resource.export(Book.objects.filter(name__lt='Book 3'))
+        self.assertEqual(dataset['name'], ['Book 0', 'Book 1', 'Book 2'])
+
+    def test_can_paginate_by_pk(self):
+        self.assertTrue(resources.Resource.can_paginate_by_pk(Book.objects.all()))
+        self.assertTrue(resources.Resource.can_paginate_by_pk(Book.objects.order_by('-id')))
+        self.assertFalse(resources.Resource.can_paginate_by_pk(Book.objects.order_by('name')))
+        self.assertFalse(resources.Resource.can_paginate_by_pk(Book.objects.all()[:2]))
+        self.assertFalse(resources.Resource.can_paginate_by_pk(Book.objects.values('name')))
@@ -0,0 +1,21 @@
+from django.test import TestCase
+
+from import_export.streams import RowStream
+
+
+class RowStreamTest(TestCase):
+
+    def setUp(self):
+        self.stream = RowStream(['id', 'name'], iter([[1, 'Foo'], [2, 'Bar']]))
+
+    def test_dict(self):
+        self.assertEqual([dict(row) for row in self.stream.dict],
+                         [{'id': 1, 'name': 'Foo'}, {'id': 2, 'name': 'Bar'}])
+        self.assertEqual(self.stream.count, 2)
+        self.assertEqual(list(self.stream.dict), [])
+
+    def test_peek(self):
+        self.assertEqual([row['id'] for row in self.stream.peek(1)], [1])
+        self.assertEqual([row['id'] for row in self.stream.peek(5)], [1, 2])
+        self.assertEqual(self.stream.count, 0)
+        self.assertEqual([row['id'] for row in self.stream.dict], [1, 2])
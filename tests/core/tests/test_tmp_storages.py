@@ -64,3 +64,32 @@ id,name,author,author_email,imported,published,price,categories
         tmp_storage = MediaStorage(name=name)
         self.assertEqual(self.test_string.decode(),
                          tmp_storage.read(read_mode='r'))
+
+    def test_temp_folder_storage_save_chunks(self):
+        tmp_storage = TempFolderStorage()
+        tmp_storage.save_chunks(iter([self.test_string[:10], self.test_string[10:]]))
+
+        tmp_storage = TempFolderStorage(name=tmp_storage.name)
+        with tmp_storage.open_stream() as in_stream:
+            self.assertEqual(self.test_string, in_stream.read())
+        tmp_storage_mmap = tmp_storage.open_mmap()
+        with tmp_storage_mmap:
+            self.assertEqual(self.test_string, tmp_storage_mmap[:])
+        tmp_storage.remove()
+
+    def test_cache_storage_save_chunks(self):
+        tmp_storage = CacheStorage()
+        tmp_storage.save_chunks(iter([self.test_string[:10], self.test_string[10:]]))
+
+        tmp_storage = CacheStorage(name=tmp_storage.name)
+        self.assertEqual(self.test_string, tmp_storage.open_stream().read())
+        tmp_storage.remove()
+
+    def test_media_storage_save_chunks(self):
+        tmp_storage = MediaStorage()
+        tmp_storage.save_chunks(iter([self.test_string[:10], self.test_string[10:]]))
+
+        tmp_storage = MediaStorage(name=tmp_storage.name)
+        with tmp_storage.open_stream() as in_stream:
+            self.assertEqual(self.test_string, in_stream.read())
+        tmp_storage.remove()